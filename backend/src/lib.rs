@@ -1,6 +1,6 @@
-use std::fs::File;
-use std::io::{Read, Write, Seek, SeekFrom};
-use std::path::Path;
+use std::collections::HashMap;
+use std::fs::{self, File};
+use std::io::{self, BufReader, BufWriter, Read, Write, Seek, SeekFrom};
 use serde::{Serialize, Deserialize};
 use serde_json::Value;
 use byteorder::{LittleEndian, ReadBytesExt, WriteBytesExt};
@@ -12,18 +12,42 @@ pub struct GGUFMetadata {
     pub value_type: String,
 }
 
+/// Zero-filled string entry the frontend reserves for in-place edits; never surfaced as metadata.
+pub const PADDING_KEY: &str = "gguf_modifier.padding";
+/// Entries a header-only stub records about the tensor data it omits. Kept across saves so the
+/// edited stub can be replayed onto its model, but never exported, imported or searched.
+pub const STUB_PREFIX: &str = "gguf_modifier.stub.";
+pub const ALIGNMENT_KEY: &str = "general.alignment";
+pub const DEFAULT_ALIGNMENT: u64 = 32;
+
 pub struct GGUFFile {
     path: String,
+    /// Entries in file order, which is the order they are written back in
     metadata: Vec<GGUFMetadata>,
+    /// Position of each key in `metadata`, so edits find a key without scanning
+    index: HashMap<String, usize>,
+}
+
+/// One staged change for `GGUFFile::apply_edits`: a value and type to set, or None to remove.
+pub type Edit = (String, Option<(Value, String)>);
+
+/// Where the sections after the KV block live in an existing file.
+struct Layout {
+    tensor_count: u64,
+    kv_end: u64,
+    tensor_info_end: u64,
+    data_offset: u64,
 }
 
 impl GGUFFile {
     pub fn new(path: &str) -> Result<Self, std::io::Error> {
         let mut file = File::open(path)?;
         let metadata = Self::read_metadata(&mut file)?;
+        let index = index_of(&metadata);
         Ok(Self {
             path: path.to_string(),
             metadata,
+            index,
         })
     }
 
@@ -47,20 +71,11 @@ impl GGUFFile {
             let key = String::from_utf8_lossy(&key).to_string();
             
             let value_type = file.read_u32::<LittleEndian>()?;
-            let value = match value_type {
-                0 => Value::Null,
-                1 => Value::Bool(file.read_u8()? != 0),
-                2 => Value::Number(file.read_i64::<LittleEndian>()?.into()),
-                3 => Value::Number(file.read_f64::<LittleEndian>()?.into()),
-                4 => {
-                    let str_length = file.read_u64::<LittleEndian>()? as usize;
-                    let mut str_value = vec![0u8; str_length];
-                    file.read_exact(&mut str_value)?;
-                    Value::String(String::from_utf8_lossy(&str_value).to_string())
-                },
-                _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unknown value type")),
-            };
-            
+            let value = Self::read_value(file, value_type)?;
+
+            if key == PADDING_KEY {
+                continue;
+            }
             metadata.push(GGUFMetadata {
                 key,
                 value,
@@ -71,82 +86,413 @@ impl GGUFFile {
         Ok(metadata)
     }
 
-    pub fn modify_metadata(&mut self, key: &str, value: Value, value_type: &str) -> Result<(), std::io::Error> {
-        if let Some(metadata) = self.metadata.iter_mut().find(|m| m.key == key) {
-            metadata.value = value;
-            metadata.value_type = value_type.to_string();
-        } else {
-            self.metadata.push(GGUFMetadata {
-                key: key.to_string(),
-                value,
-                value_type: value_type.to_string(),
-            });
+    fn read_value<R: Read>(file: &mut R, value_type: u32) -> Result<Value, std::io::Error> {
+        Ok(match value_type {
+            0 => Value::Null,
+            1 => Value::Bool(file.read_u8()? != 0),
+            2 => Value::Number(file.read_i64::<LittleEndian>()?.into()),
+            3 => float_value(file.read_f64::<LittleEndian>()?),
+            4 => {
+                let str_length = file.read_u64::<LittleEndian>()? as usize;
+                let mut str_value = vec![0u8; str_length];
+                file.read_exact(&mut str_value)?;
+                Value::String(String::from_utf8_lossy(&str_value).to_string())
+            },
+            5 => {
+                let element_type = file.read_u32::<LittleEndian>()?;
+                if element_type == 5 {
+                    return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Nested arrays are not supported"));
+                }
+                let count = file.read_u64::<LittleEndian>()?;
+                let mut elements = Vec::new();
+                for _ in 0..count {
+                    elements.push(Self::read_value(file, element_type)?);
+                }
+                Value::Array(elements)
+            },
+            _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unknown value type")),
+        })
+    }
+
+    fn read_layout(file: &mut File) -> Result<Layout, std::io::Error> {
+        let metadata = Self::read_metadata(file)?;
+        let kv_end = file.stream_position()?;
+        file.seek(SeekFrom::Start(8))?;
+        let tensor_count = file.read_u64::<LittleEndian>()?;
+
+        file.seek(SeekFrom::Start(kv_end))?;
+        for _ in 0..tensor_count {
+            let name_length = file.read_u64::<LittleEndian>()?;
+            file.seek(SeekFrom::Current(name_length as i64))?;
+            let n_dims = file.read_u32::<LittleEndian>()?;
+            // dims, then the ggml type and the data offset
+            file.seek(SeekFrom::Current(n_dims as i64 * 8 + 4 + 8))?;
         }
+        let tensor_info_end = file.stream_position()?;
+
+        let alignment = metadata.iter()
+            .find(|m| m.key == ALIGNMENT_KEY)
+            .and_then(|m| m.value.as_u64())
+            .filter(|&a| a > 0)
+            .unwrap_or(DEFAULT_ALIGNMENT);
+        let data_offset = if tensor_count == 0 {
+            tensor_info_end
+        } else {
+            align_offset(tensor_info_end, alignment)
+        };
+
+        Ok(Layout { tensor_count, kv_end, tensor_info_end, data_offset })
+    }
+
+    pub fn modify_metadata(&mut self, key: &str, value: Value, value_type: &str) -> Result<(), std::io::Error> {
+        self.set(key, value, value_type);
         self.save()
     }
 
     pub fn remove_metadata(&mut self, key: &str) -> Result<(), std::io::Error> {
-        self.metadata.retain(|m| m.key != key);
+        if let Some(i) = self.index.remove(key) {
+            self.metadata.remove(i);
+            for metadata in &self.metadata[i..] {
+                if let Some(position) = self.index.get_mut(&metadata.key) {
+                    *position -= 1;
+                }
+            }
+        }
+        self.save()
+    }
+
+    /// Apply a batch of edits in order and save once: each edit is a hash lookup, and
+    /// removals are swept out in a single pass, so the batch costs O(entries + edits).
+    pub fn apply_edits<I: IntoIterator<Item = Edit>>(&mut self, edits: I) -> Result<(), std::io::Error> {
+        let mut removed = vec![false; self.metadata.len()];
+        for (key, edit) in edits {
+            match edit {
+                Some((value, value_type)) => {
+                    self.set(&key, value, &value_type);
+                    removed.resize(self.metadata.len(), false);
+                }
+                None => {
+                    if let Some(i) = self.index.remove(&key) {
+                        removed[i] = true;
+                    }
+                }
+            }
+        }
+        if removed.iter().any(|&gone| gone) {
+            let mut gone = removed.into_iter();
+            self.metadata.retain(|_| !gone.next().unwrap_or(false));
+            self.index = index_of(&self.metadata);
+        }
         self.save()
     }
 
+    pub fn get_metadata(&self, key: &str) -> Option<&GGUFMetadata> {
+        self.index.get(key).map(|&i| &self.metadata[i])
+    }
+
+    fn set(&mut self, key: &str, value: Value, value_type: &str) {
+        match self.index.get(key) {
+            Some(&i) => {
+                let metadata = &mut self.metadata[i];
+                metadata.value = value;
+                metadata.value_type = value_type.to_string();
+            }
+            None => {
+                self.index.insert(key.to_string(), self.metadata.len());
+                self.metadata.push(GGUFMetadata {
+                    key: key.to_string(),
+                    value,
+                    value_type: value_type.to_string(),
+                });
+            }
+        }
+    }
+
+    /// Rewrite the header and KV section, streaming the tensor info and data of the
+    /// existing file into a temp file that is then renamed over the original.
     pub fn save(&self) -> Result<(), std::io::Error> {
-        let mut file = File::create(&self.path)?;
-        
+        // Only a missing file is saved from scratch; any other error would drop the tensor data
+        let existing = match File::open(&self.path) {
+            Ok(mut file) => {
+                let layout = Self::read_layout(&mut file)?;
+                Some((file, layout))
+            }
+            Err(e) if e.kind() == io::ErrorKind::NotFound => None,
+            Err(e) => return Err(e),
+        };
+        let tensor_count = existing.as_ref().map_or(0, |(_, layout)| layout.tensor_count);
+
+        let mut header = Vec::new();
+        self.write_header(&mut header, tensor_count)?;
+
+        let temp_path = format!("{}.tmp", self.path);
+        let result = (|| {
+            let mut temp = File::create(&temp_path)?;
+            temp.write_all(&header)?;
+            if let Some((mut src, layout)) = existing {
+                // io::copy between files uses copy_file_range/sendfile where the OS has them
+                src.seek(SeekFrom::Start(layout.kv_end))?;
+                io::copy(&mut (&mut src).take(layout.tensor_info_end - layout.kv_end), &mut temp)?;
+                if layout.tensor_count > 0 {
+                    let position = header.len() as u64 + layout.tensor_info_end - layout.kv_end;
+                    let alignment = self.get_metadata(ALIGNMENT_KEY)
+                        .and_then(|m| m.value.as_u64())
+                        .filter(|&a| a > 0)
+                        .unwrap_or(DEFAULT_ALIGNMENT);
+                    let padding = align_offset(position, alignment) - position;
+                    temp.write_all(&vec![0u8; padding as usize])?;
+                }
+                src.seek(SeekFrom::Start(layout.data_offset))?;
+                io::copy(&mut src, &mut temp)?;
+            }
+            temp.sync_all()?;
+            fs::rename(&temp_path, &self.path)
+        })();
+        if result.is_err() {
+            let _ = fs::remove_file(&temp_path);
+        }
+        result
+    }
+
+    fn write_header<W: Write>(&self, file: &mut W, tensor_count: u64) -> Result<(), std::io::Error> {
         file.write_all(b"GGUF")?;
         file.write_u32::<LittleEndian>(1)?;
-        file.write_u64::<LittleEndian>(0)?;
+        file.write_u64::<LittleEndian>(tensor_count)?;
         file.write_u64::<LittleEndian>(self.metadata.len() as u64)?;
         
         for metadata in &self.metadata {
             file.write_u64::<LittleEndian>(metadata.key.len() as u64)?;
             file.write_all(metadata.key.as_bytes())?;
             
-            match metadata.value {
-                Value::Null => {
-                    file.write_u32::<LittleEndian>(0)?;
-                },
-                Value::Bool(b) => {
-                    file.write_u32::<LittleEndian>(1)?;
-                    file.write_u8(b as u8)?;
-                },
-                Value::Number(n) => {
-                    if n.is_i64() {
-                        file.write_u32::<LittleEndian>(2)?;
-                        file.write_i64::<LittleEndian>(n.as_i64().unwrap())?;
-                    } else {
-                        file.write_u32::<LittleEndian>(3)?;
-                        file.write_f64::<LittleEndian>(n.as_f64().unwrap())?;
-                    }
-                },
-                Value::String(s) => {
-                    file.write_u32::<LittleEndian>(4)?;
-                    file.write_u64::<LittleEndian>(s.len() as u64)?;
-                    file.write_all(s.as_bytes())?;
-                },
-                _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unsupported value type")),
-            }
+            let value_type = if metadata.value_type == "3" && non_finite(&metadata.value).is_some() {
+                3
+            } else {
+                value_type_of(&metadata.value)?
+            };
+            file.write_u32::<LittleEndian>(value_type)?;
+            write_value(file, &metadata.value, value_type)?;
         }
         
         Ok(())
     }
 
+    /// Write the metadata as a JSON list, or one entry per line for `.ndjson`/`.jsonl`
+    /// paths, serializing entry by entry straight into a buffered file.
     pub fn export_metadata(&self, export_path: &str) -> Result<(), std::io::Error> {
-        let json = serde_json::to_string_pretty(&self.metadata)?;
-        let mut file = File::create(export_path)?;
-        file.write_all(json.as_bytes())?;
-        Ok(())
+        let ndjson = is_ndjson(export_path);
+        let mut out = BufWriter::new(File::create(export_path)?);
+        if !ndjson {
+            out.write_all(b"[")?;
+        }
+        for (i, metadata) in self.metadata.iter().filter(|m| !is_stub_key(&m.key)).enumerate() {
+            if ndjson {
+                serde_json::to_writer(&mut out, metadata)?;
+                out.write_all(b"\n")?;
+            } else {
+                out.write_all(if i == 0 { b"\n  " } else { b",\n  " })?;
+                serde_json::to_writer(&mut out, metadata)?;
+            }
+        }
+        if !ndjson {
+            let empty = self.metadata.iter().all(|m| is_stub_key(&m.key));
+            out.write_all(if empty { b"]\n" } else { b"\n]\n" })?;
+        }
+        out.flush()
     }
 
+    /// Make the metadata match an export, parsing it from a buffered reader and only
+    /// touching keys whose values differ. Keys absent from the export are removed; the
+    /// file is not rewritten when nothing changed.
     pub fn import_metadata(&mut self, import_path: &str) -> Result<(), std::io::Error> {
-        let mut file = File::open(import_path)?;
-        let mut contents = String::new();
-        file.read_to_string(&mut contents)?;
-        self.metadata = serde_json::from_str(&contents)?;
-        self.save()
+        let reader = BufReader::new(File::open(import_path)?);
+        let imported: Vec<GGUFMetadata> = if is_ndjson(import_path) {
+            serde_json::Deserializer::from_reader(reader)
+                .into_iter::<GGUFMetadata>()
+                .collect::<Result<_, _>>()?
+        } else {
+            serde_json::from_reader(reader)?
+        };
+
+        let positions = &mut self.index;
+        // A stub's own entries are not part of an export and must survive the import
+        let mut seen: Vec<bool> = self.metadata.iter().map(|m| is_stub_key(&m.key)).collect();
+        let mut changed = false;
+        for entry in imported.into_iter().filter(|m| !is_stub_key(&m.key)) {
+            match positions.get(&entry.key) {
+                Some(&i) => {
+                    seen[i] = true;
+                    let current = &mut self.metadata[i];
+                    if current.value != entry.value {
+                        *current = entry;
+                        changed = true;
+                    }
+                }
+                None => {
+                    positions.insert(entry.key.clone(), self.metadata.len());
+                    seen.push(true);
+                    self.metadata.push(entry);
+                    changed = true;
+                }
+            }
+        }
+        if seen.iter().any(|&kept| !kept) {
+            let mut kept = seen.into_iter();
+            self.metadata.retain(|_| kept.next().unwrap_or(true));
+            self.index = index_of(&self.metadata);
+            changed = true;
+        }
+        if changed {
+            self.save()?;
+        }
+        Ok(())
     }
 
     pub fn search_metadata(&self, search_key: &str) -> Vec<&GGUFMetadata> {
-        self.metadata.iter().filter(|m| m.key.contains(search_key)).collect()
+        self.metadata.iter().filter(|m| !is_stub_key(&m.key) && m.key.contains(search_key)).collect()
+    }
+
+    /// Search a file without loading it: only values of matching keys are decoded, the
+    /// rest are skipped over by their length prefixes.
+    pub fn search_file(path: &str, search_key: &str) -> Result<Vec<GGUFMetadata>, std::io::Error> {
+        let mut reader = BufReader::new(File::open(path)?);
+        let mut magic = [0u8; 4];
+        reader.read_exact(&mut magic)?;
+        if &magic != b"GGUF" {
+            return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Not a valid GGUF file"));
+        }
+        let _version = reader.read_u32::<LittleEndian>()?;
+        let _tensor_count = reader.read_u64::<LittleEndian>()?;
+        let metadata_count = reader.read_u64::<LittleEndian>()?;
+
+        let mut results = Vec::new();
+        for _ in 0..metadata_count {
+            let key_length = reader.read_u64::<LittleEndian>()? as usize;
+            let mut key = vec![0u8; key_length];
+            reader.read_exact(&mut key)?;
+            let key = String::from_utf8_lossy(&key).to_string();
+            let value_type = reader.read_u32::<LittleEndian>()?;
+            if key == PADDING_KEY || is_stub_key(&key) || !key.contains(search_key) {
+                Self::skip_value(&mut reader, value_type)?;
+                continue;
+            }
+            let value = Self::read_value(&mut reader, value_type)?;
+            results.push(GGUFMetadata { key, value, value_type: value_type.to_string() });
+        }
+        Ok(results)
+    }
+
+    fn skip_value(reader: &mut BufReader<File>, value_type: u32) -> Result<(), std::io::Error> {
+        match value_type {
+            0 => {}
+            1 => reader.seek_relative(1)?,
+            2 | 3 => reader.seek_relative(8)?,
+            4 => {
+                let length = reader.read_u64::<LittleEndian>()?;
+                reader.seek_relative(length as i64)?;
+            }
+            5 => {
+                let element_type = reader.read_u32::<LittleEndian>()?;
+                let count = reader.read_u64::<LittleEndian>()?;
+                match element_type {
+                    0 => {}
+                    1 => reader.seek_relative(count as i64)?,
+                    2 | 3 => reader.seek_relative(count as i64 * 8)?,
+                    4 => {
+                        for _ in 0..count {
+                            let length = reader.read_u64::<LittleEndian>()?;
+                            reader.seek_relative(length as i64)?;
+                        }
+                    }
+                    _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unsupported array element type")),
+                }
+            }
+            _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unknown value type")),
+        }
+        Ok(())
+    }
+}
+
+fn index_of(metadata: &[GGUFMetadata]) -> HashMap<String, usize> {
+    metadata.iter().enumerate().map(|(i, m)| (m.key.clone(), i)).collect()
+}
+
+fn is_stub_key(key: &str) -> bool {
+    key.starts_with(STUB_PREFIX)
+}
+
+fn is_ndjson(path: &str) -> bool {
+    let path = path.to_ascii_lowercase();
+    path.ends_with(".ndjson") || path.ends_with(".jsonl")
+}
+
+fn align_offset(offset: u64, alignment: u64) -> u64 {
+    offset + (alignment - offset % alignment) % alignment
+}
+
+/// A float as JSON; serde_json numbers cannot hold NaN or infinities, so those are
+/// kept as their string form ("NaN", "inf", "-inf") and written back as f64.
+fn float_value(f: f64) -> Value {
+    serde_json::Number::from_f64(f).map(Value::Number).unwrap_or_else(|| Value::String(f.to_string()))
+}
+
+fn non_finite(value: &Value) -> Option<f64> {
+    value.as_str().and_then(|s| s.parse::<f64>().ok()).filter(|f| !f.is_finite())
+}
+
+fn value_type_of(value: &Value) -> Result<u32, std::io::Error> {
+    match value {
+        Value::Null => Ok(0),
+        Value::Bool(_) => Ok(1),
+        Value::Number(n) if n.is_i64() => Ok(2),
+        Value::Number(_) => Ok(3),
+        Value::String(_) => Ok(4),
+        Value::Array(_) => Ok(5),
+        _ => Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unsupported value type")),
+    }
+}
+
+/// Element type of an array: ints widen to floats, anything else must match the first element.
+fn array_element_type(elements: &[Value]) -> Result<u32, std::io::Error> {
+    let mut element_type = match elements.first() {
+        Some(first) => value_type_of(first)?,
+        None => return Ok(0),
+    };
+    // Non-finite floats read as strings, so a float array can mix numbers and such strings
+    let floats = || elements.iter().all(|e| !e.is_string() || non_finite(e).is_some());
+    for element in elements {
+        match (element_type, value_type_of(element)?) {
+            (a, b) if a == b => {},
+            (2, 3) | (3, 2) => element_type = 3,
+            (2 | 3, 4) | (4, 2 | 3) if floats() => element_type = 3,
+            _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Mixed array element types")),
+        }
+    }
+    if element_type == 5 {
+        return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Nested arrays are not supported"));
+    }
+    Ok(element_type)
+}
+
+fn write_value<W: Write>(file: &mut W, value: &Value, value_type: u32) -> Result<(), std::io::Error> {
+    match (value_type, value) {
+        (0, _) => {},
+        (1, Value::Bool(b)) => file.write_u8(*b as u8)?,
+        (2, Value::Number(n)) => file.write_i64::<LittleEndian>(n.as_i64().unwrap())?,
+        (3, Value::Number(n)) => file.write_f64::<LittleEndian>(n.as_f64().unwrap())?,
+        (3, value) if non_finite(value).is_some() => file.write_f64::<LittleEndian>(non_finite(value).unwrap())?,
+        (4, Value::String(s)) => {
+            file.write_u64::<LittleEndian>(s.len() as u64)?;
+            file.write_all(s.as_bytes())?;
+        },
+        (5, Value::Array(elements)) => {
+            let element_type = array_element_type(elements)?;
+            file.write_u32::<LittleEndian>(element_type)?;
+            file.write_u64::<LittleEndian>(elements.len() as u64)?;
+            for element in elements {
+                write_value(file, element, element_type)?;
+            }
+        },
+        _ => return Err(std::io::Error::new(std::io::ErrorKind::InvalidData, "Unsupported value type")),
     }
+    Ok(())
 }
@@ -1,6 +1,11 @@
+use std::collections::HashMap;
 use std::env;
+use std::fs;
+use std::io::{self, BufRead, Write};
 use std::process;
-use gguf_metadata_modifier::{GGUFFile, GGUFMetadata};
+use std::time::SystemTime;
+use gguf_metadata_modifier::GGUFFile;
+use serde::{Serialize, Deserialize};
 use serde_json::Value;
 
 fn print_usage() {
@@ -13,6 +18,139 @@ fn print_usage() {
     println!("  export <file> <export_path>         Export metadata to JSON");
     println!("  import <file> <import_path>         Import metadata from JSON");
     println!("  search <file> <search_key>          Search metadata by key");
+    println!("  serve                               Answer JSON-lines requests on stdin");
+}
+
+fn parse_value(value: &str, value_type: &str) -> Result<Value, String> {
+    let invalid = || format!("Invalid {} value: {}", value_type, value);
+    match value_type {
+        "string" => Ok(Value::String(value.to_string())),
+        "int" => value.parse::<i64>().map(Value::from).map_err(|_| invalid()),
+        "float" => value.parse::<f64>().ok()
+            .and_then(serde_json::Number::from_f64)
+            .map(Value::Number)
+            .ok_or_else(invalid),
+        "bool" => value.parse::<bool>().map(Value::Bool).map_err(|_| invalid()),
+        _ => Err("Invalid value type. Supported types are: string, int, float, bool".to_string()),
+    }
+}
+
+#[derive(Deserialize)]
+struct Request {
+    id: Value,
+    args: Vec<String>,
+}
+
+#[derive(Serialize)]
+struct Response {
+    id: Value,
+    ok: bool,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    result: Option<Value>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    error: Option<String>,
+}
+
+/// Parsed files kept open between requests, reused while their size and mtime match.
+struct FileCache {
+    files: HashMap<String, (u64, Option<SystemTime>, GGUFFile)>,
+}
+
+impl FileCache {
+    fn stamp(path: &str) -> io::Result<(u64, Option<SystemTime>)> {
+        let meta = fs::metadata(path)?;
+        Ok((meta.len(), meta.modified().ok()))
+    }
+
+    fn open(&mut self, path: &str) -> io::Result<&mut GGUFFile> {
+        let stamp = Self::stamp(path)?;
+        let fresh = matches!(self.files.get(path), Some((len, modified, _)) if (*len, *modified) == stamp);
+        if !fresh {
+            self.files.insert(path.to_string(), (stamp.0, stamp.1, GGUFFile::new(path)?));
+        }
+        Ok(&mut self.files.get_mut(path).unwrap().2)
+    }
+
+    fn refresh(&mut self, path: &str) {
+        match Self::stamp(path) {
+            Ok((len, modified)) => {
+                if let Some(entry) = self.files.get_mut(path) {
+                    entry.0 = len;
+                    entry.1 = modified;
+                }
+            }
+            Err(_) => {
+                self.files.remove(path);
+            }
+        }
+    }
+}
+
+fn handle_request(args: &[String], cache: &mut FileCache) -> Result<Value, String> {
+    let arity = match args.first().map(String::as_str) {
+        Some("modify") => 5,
+        Some("remove") | Some("export") | Some("import") | Some("search") => 3,
+        Some(command) => return Err(format!("Unknown command: {}", command)),
+        None => return Err("Missing command".to_string()),
+    };
+    if args.len() != arity {
+        return Err(format!("Invalid number of arguments for {} command", args[0]));
+    }
+    let file_path = &args[1];
+    let gguf = cache.open(file_path).map_err(|e| format!("Error opening GGUF file: {}", e))?;
+
+    let result = match args[0].as_str() {
+        "modify" => {
+            let value = parse_value(&args[3], &args[4])?;
+            gguf.modify_metadata(&args[2], value, &args[4])
+                .map_err(|e| format!("Error modifying metadata: {}", e))?;
+            Value::from("Metadata modified successfully")
+        }
+        "remove" => {
+            gguf.remove_metadata(&args[2]).map_err(|e| format!("Error removing metadata: {}", e))?;
+            Value::from("Metadata removed successfully")
+        }
+        "export" => {
+            gguf.export_metadata(&args[2]).map_err(|e| format!("Error exporting metadata: {}", e))?;
+            Value::from("Metadata exported successfully")
+        }
+        "import" => {
+            gguf.import_metadata(&args[2]).map_err(|e| format!("Error importing metadata: {}", e))?;
+            Value::from("Metadata imported successfully")
+        }
+        _ => {
+            return serde_json::to_value(gguf.search_metadata(&args[2])).map_err(|e| e.to_string());
+        }
+    };
+    cache.refresh(file_path);
+    Ok(result)
+}
+
+/// Worker mode: one JSON request per stdin line, one JSON response per stdout line.
+fn serve() {
+    let mut cache = FileCache { files: HashMap::new() };
+    let stdin = io::stdin();
+    let stdout = io::stdout();
+    for line in stdin.lock().lines() {
+        let line = match line {
+            Ok(line) => line,
+            Err(_) => break,
+        };
+        if line.trim().is_empty() {
+            continue;
+        }
+        let response = match serde_json::from_str::<Request>(&line) {
+            Ok(request) => match handle_request(&request.args, &mut cache) {
+                Ok(result) => Response { id: request.id, ok: true, result: Some(result), error: None },
+                Err(error) => Response { id: request.id, ok: false, result: None, error: Some(error) },
+            },
+            Err(e) => Response { id: Value::Null, ok: false, result: None, error: Some(format!("Invalid request: {}", e)) },
+        };
+        let mut out = stdout.lock();
+        if serde_json::to_writer(&mut out, &response).is_err() || writeln!(out).and_then(|_| out.flush()).is_err() {
+            break;
+        }
+    }
 }
 
 fn main() {
@@ -26,6 +164,7 @@ fn main() {
     let command = &args[1];
 
     match command.as_str() {
+        "serve" => serve(),
         "modify" => {
             if args.len() != 6 {
                 println!("Invalid number of arguments for modify command");
@@ -45,13 +184,10 @@ fn main() {
                 }
             };
 
-            let value = match value_type {
-                "string" => Value::String(value.to_string()),
-                "int" => Value::Number(value.parse().unwrap()),
-                "float" => Value::Number(serde_json::Number::from_f64(value.parse().unwrap()).unwrap()),
-                "bool" => Value::Bool(value.parse().unwrap()),
-                _ => {
-                    println!("Invalid value type. Supported types are: string, int, float, bool");
+            let value = match parse_value(value, value_type) {
+                Ok(value) => value,
+                Err(e) => {
+                    println!("{}", e);
                     process::exit(1);
                 }
             };
@@ -144,15 +280,13 @@ fn main() {
             let file_path = &args[2];
             let search_key = &args[3];
 
-            let gguf = match GGUFFile::new(file_path) {
-                Ok(file) => file,
+            let results = match GGUFFile::search_file(file_path, search_key) {
+                Ok(results) => results,
                 Err(e) => {
                     println!("Error opening GGUF file: {}", e);
                     process::exit(1);
                 }
             };
-
-            let results = gguf.search_metadata(search_key);
             if results.is_empty() {
                 println!("No matching metadata found");
             } else {
@@ -0,0 +1,320 @@
+"""Benchmark the CLI and the backend binary against synthetic GGUF files.
+
+    python -m benchmarks.run --out results.json
+    python -m benchmarks.run --kv-count 20000 --tensor-count 8 --compare baseline.json
+
+Every measured run happens in a fresh child process on a fresh copy of the model,
+so peak RSS and the I/O counters cover exactly one operation.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+from .synthetic import SyntheticSpec, generate
+
+OPERATIONS = ("open", "search", "modify", "batch-apply", "export", "import")
+TARGETS = ("cli", "backend")
+BATCH_EDITS = 10
+SCHEMA_VERSION = 1
+
+# /proc/self/io counters: bytes and read/write syscalls, including reaped children
+_IO_FIELDS = {
+    "rchar": "bytes_read",
+    "wchar": "bytes_written",
+    "syscr": "read_syscalls",
+    "syscw": "write_syscalls",
+}
+
+
+def batch_config() -> Dict[str, Any]:
+    """Modify, add and remove BATCH_EDITS keys each."""
+    return {
+        "metadata_to_modify": [
+            {"key": f"synthetic.kv.{i * 4:06d}", "value": f"modified {i}", "type": "string"}
+            for i in range(BATCH_EDITS)
+        ],
+        "metadata_to_add": [
+            {"key": f"benchmark.added.{i}", "value": str(i), "type": "int"} for i in range(BATCH_EDITS)
+        ],
+        "metadata_to_remove": [f"synthetic.kv.{i * 4 + 1:06d}" for i in range(BATCH_EDITS)],
+    }
+
+
+def _proc_io() -> Dict[str, int]:
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(":") for line in f.read().splitlines())
+    except OSError:
+        return {}
+    return {name: int(counters[field]) for field, name in _IO_FIELDS.items() if field in counters}
+
+
+def _cli_operation(job: Dict[str, Any]) -> Callable[[], bool]:
+    from frontend.cli import CLI
+    from frontend.config import Config
+
+    cli = CLI(Config(job["config"]))
+    path = job["model"]
+    operation = job["operation"]
+    if operation == "open":
+        return lambda: cli.search_metadata(path, "benchmark.no_such_key") == []
+    if operation == "search":
+        return lambda: bool(cli.search_metadata(path, "tokenizer"))
+    if operation == "modify":
+        return lambda: cli.process_file_with_config(path, {
+            "metadata_to_modify": [{"key": "general.name", "value": "renamed", "type": "string"}],
+        })
+    if operation == "batch-apply":
+        return lambda: cli.process_file_with_config(path, batch_config())
+    if operation == "export":
+        return lambda: cli.export_metadata(path, job["export"])
+    if operation == "import":
+        return lambda: cli.import_metadata(path, job["import"])
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def _backend_operation(job: Dict[str, Any]) -> Callable[[], bool]:
+    binary = job["backend"]
+    path = job["model"]
+    operation = job["operation"]
+    if operation == "open":
+        commands = [["search", path, "benchmark.no_such_key"]]
+    elif operation == "search":
+        commands = [["search", path, "tokenizer"]]
+    elif operation == "modify":
+        commands = [["modify", path, "general.name", "renamed", "string"]]
+    elif operation == "batch-apply":
+        # The backend has no batch command, so a batch is one invocation per edit
+        config = batch_config()
+        commands = [
+            ["modify", path, item["key"], item["value"], item["type"]]
+            for item in config["metadata_to_modify"] + config["metadata_to_add"]
+        ] + [["remove", path, key] for key in config["metadata_to_remove"]]
+    elif operation == "export":
+        commands = [["export", path, job["export"]]]
+    elif operation == "import":
+        commands = [["import", path, job["import"]]]
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def run() -> bool:
+        for command in commands:
+            subprocess.run([binary] + command, capture_output=True, text=True, check=True)
+        return True
+    return run
+
+
+def measure(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one operation in this process and report its cost."""
+    run = _cli_operation(job) if job["target"] == "cli" else _backend_operation(job)
+    before = _proc_io()
+    start = time.perf_counter()
+    try:
+        ok, error = bool(run()), None
+    except subprocess.CalledProcessError as e:
+        ok, error = False, (e.stderr or "").strip() or str(e)
+    except (OSError, ValueError) as e:
+        ok, error = False, str(e)
+    seconds = time.perf_counter() - start
+    after = _proc_io()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result = {
+        "ok": ok,
+        "seconds": seconds,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_kib": own.ru_maxrss,
+        "children_peak_rss_kib": children.ru_maxrss,
+        "page_faults": own.ru_minflt + own.ru_majflt + children.ru_minflt + children.ru_majflt,
+        "file_size": os.path.getsize(job["model"]),
+    }
+    result.update({name: after[name] - before[name] for name in after if name in before})
+    if error:
+        result["error"] = error
+    return result
+
+
+def _measure_in_child(job: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    job_path = os.path.join(workdir, "job.json")
+    result_path = os.path.join(workdir, "result.json")
+    with open(job_path, 'w') as f:
+        json.dump(dict(job, result=result_path), f)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--measure", job_path],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    if completed.returncode != 0:
+        return {"ok": False, "error": (completed.stderr.strip().splitlines() or ["child failed"])[-1]}
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def _prepare_import(base: str, import_path: str) -> None:
+    """An NDJSON export of base with one value changed, so importing it forces a write."""
+    from frontend.jsonio import export_metadata
+
+    export_metadata(base, import_path)
+    with open(import_path) as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        entry = json.loads(line)
+        if entry["key"] == "general.name":
+            lines[i] = json.dumps(dict(entry, value="imported")) + "\n"
+    with open(import_path, 'w') as f:
+        f.writelines(lines)
+
+
+def _find_backend(binary: str) -> Optional[str]:
+    if os.path.isfile(binary) and os.access(binary, os.X_OK):
+        return os.path.abspath(binary)
+    return shutil.which(binary)
+
+
+def run_suite(spec: SyntheticSpec, operations: List[str], targets: List[str], repeat: int,
+              backend: str, workdir: str) -> Dict[str, Any]:
+    base = os.path.join(workdir, "base.gguf")
+    model = os.path.join(workdir, "model.gguf")
+    config = os.path.join(workdir, "config.json")
+    import_path = os.path.join(workdir, "import.ndjson")
+    file_size = generate(base, spec)
+    _prepare_import(base, import_path)
+    with open(config, 'w') as f:
+        # Measure parsing, not the metadata cache
+        json.dump({"cache_enabled": False}, f)
+    backend_path = _find_backend(backend)
+
+    report: Dict[str, Any] = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": backend_path,
+        "spec": spec.to_dict(),
+        "file_size": file_size,
+        "results": [],
+    }
+    for target in targets:
+        for operation in operations:
+            entry: Dict[str, Any] = {"operation": operation, "target": target, "runs": []}
+            if target == "backend" and backend_path is None:
+                entry["skipped"] = f"backend binary not found: {backend}"
+                report["results"].append(entry)
+                continue
+            for _ in range(repeat):
+                shutil.copyfile(base, model)
+                job = {
+                    "operation": operation, "target": target, "model": model, "config": config,
+                    "export": os.path.join(workdir, "export.json"), "import": import_path,
+                    "backend": backend_path,
+                }
+                entry["runs"].append(_measure_in_child(job, workdir))
+            seconds = [run["seconds"] for run in entry["runs"] if run.get("ok")]
+            if seconds:
+                entry["median_seconds"] = statistics.median(seconds)
+            report["results"].append(entry)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Operations whose median time grew by more than threshold (a ratio) over the baseline."""
+    previous = {
+        (entry["operation"], entry["target"]): entry["median_seconds"]
+        for entry in baseline.get("results", []) if "median_seconds" in entry
+    }
+    regressions = []
+    for entry in report["results"]:
+        old = previous.get((entry["operation"], entry["target"]))
+        new = entry.get("median_seconds")
+        if old and new and new > old * threshold:
+            regressions.append(f"{entry['target']} {entry['operation']}: {old:.4f}s -> {new:.4f}s")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title=f"Benchmarks ({report['file_size'] / 1e6:.1f} MB model)")
+    for column in ("Target", "Operation", "Median (s)", "Read (MB)", "Written (MB)", "Syscalls", "Peak RSS (MB)"):
+        table.add_column(column, justify="left" if column in ("Target", "Operation") else "right")
+    for entry in report["results"]:
+        runs = [run for run in entry["runs"] if run.get("ok")]
+        if not runs:
+            table.add_row(entry["target"], entry["operation"], entry.get("skipped", "failed"), "", "", "", "")
+            continue
+        last = runs[-1]
+        table.add_row(
+            entry["target"], entry["operation"], f"{entry['median_seconds']:.4f}",
+            f"{last.get('bytes_read', 0) / 1e6:.2f}", f"{last.get('bytes_written', 0) / 1e6:.2f}",
+            str(last.get("read_syscalls", 0) + last.get("write_syscalls", 0)),
+            f"{max(last['peak_rss_kib'], last['children_peak_rss_kib']) / 1024:.1f}",
+        )
+    Console().print(table)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = SyntheticSpec()
+    parser = argparse.ArgumentParser(description="Benchmark GGUF metadata operations")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help="Comma-separated operations to run")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Comma-separated targets: cli, backend")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation")
+    parser.add_argument("--backend", default="gguf_metadata_modifier", help="Backend binary name or path")
+    parser.add_argument("--workdir", help="Directory for generated files (default: a temporary one)")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Fail when a median exceeds the baseline by this ratio")
+    for name in ("kv_count", "string_length", "array_length", "tensor_count", "tensor_bytes", "alignment", "seed"):
+        parser.add_argument("--" + name.replace("_", "-"), type=int, default=getattr(defaults, name))
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        with open(args.measure) as f:
+            job = json.load(f)
+        with open(job["result"], 'w') as f:
+            json.dump(measure(job), f)
+        return 0
+
+    operations = [op for op in args.ops.split(",") if op]
+    targets = [target for target in args.targets.split(",") if target]
+    unknown = set(operations) - set(OPERATIONS) | set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown operations or targets: {', '.join(sorted(unknown))}")
+    spec = SyntheticSpec(**{name: getattr(args, name) for name in defaults.to_dict()})
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        report = run_suite(spec, operations, targets, args.repeat, args.backend, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run_suite(spec, operations, targets, args.repeat, args.backend, workdir)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
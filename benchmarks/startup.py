@@ -0,0 +1,121 @@
+"""Benchmark CLI cold start: how long one-shot commands take in a fresh interpreter.
+
+    python -m benchmarks.startup --out startup.json
+    python -m benchmarks.startup --repeat 20 --compare baseline.json
+
+Every run is a new process, as when a shell pipeline calls `GE -s` once per model.
+HOME points at the work directory, so the user's configuration is never read or created.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from .run import compare
+from .synthetic import SyntheticSpec, generate
+
+SCHEMA_VERSION = 1
+# A small model: startup, not parsing, should dominate
+SPEC = SyntheticSpec(kv_count=50, array_length=100, tensor_count=2, tensor_bytes=4096)
+
+
+def commands(model: str) -> Dict[str, List[str]]:
+    """Command lines to time, from the bare interpreter up to a full search."""
+    cli = [sys.executable, "-m", "frontend.main"]
+    return {
+        "interpreter": [sys.executable, "-c", "pass"],
+        "import": [sys.executable, "-c", "import frontend.main"],
+        "search": cli + ["-s", "general.name", model],
+        "search-plain": cli + ["--plain", "-s", "general.name", model],
+        "search-json-plain": cli + ["--plain", "--json", "-s", "general.*", model],
+    }
+
+
+def _time(command: List[str], env: Dict[str, str], root: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=root, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        return {"ok": False, "error": (completed.stderr.strip().splitlines() or ["failed"])[-1]}
+    return {"ok": True, "seconds": seconds}
+
+
+def run_startup(names: List[str], repeat: int, workdir: str) -> Dict[str, Any]:
+    model = os.path.join(workdir, "model.gguf")
+    generate(model, SPEC)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, HOME=workdir)
+    table = commands(model)
+
+    report: Dict[str, Any] = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for name in names:
+        # One untimed run writes bytecode and the default config, which later runs reuse
+        _time(table[name], env, root)
+        entry: Dict[str, Any] = {"operation": name, "target": "startup",
+                                 "runs": [_time(table[name], env, root) for _ in range(repeat)]}
+        seconds = [run["seconds"] for run in entry["runs"] if run["ok"]]
+        if seconds:
+            entry["median_seconds"] = statistics.median(seconds)
+            entry["min_seconds"] = min(seconds)
+        report["results"].append(entry)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    baseline = next((entry.get("median_seconds") for entry in report["results"]
+                     if entry["operation"] == "interpreter"), None)
+    for entry in report["results"]:
+        if "median_seconds" not in entry:
+            error = next((run.get("error") for run in entry["runs"] if not run["ok"]), "failed")
+            print(f"{entry['operation']:<20} {error}")
+            continue
+        extra = f"  (+{(entry['median_seconds'] - baseline) * 1e3:.1f} ms over the interpreter)" \
+            if baseline and entry["operation"] != "interpreter" else ""
+        print(f"{entry['operation']:<20} {entry['median_seconds'] * 1e3:8.1f} ms{extra}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark CLI cold start")
+    parser.add_argument("--out", help="Write the JSON report here (default: print a summary)")
+    parser.add_argument("--commands", default=",".join(commands("")), help="Comma-separated commands to time")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per command")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Fail when a median exceeds the baseline by this ratio")
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.commands.split(",") if name]
+    unknown = set(names) - set(commands(""))
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+    with tempfile.TemporaryDirectory() as workdir:
+        report = run_startup(names, args.repeat, workdir)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print_report(report)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
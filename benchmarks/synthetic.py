@@ -0,0 +1,94 @@
+import random
+import struct
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+from frontend.reader import (
+    ALIGNMENT_KEY, VALUE_TYPE_ARRAY, VALUE_TYPE_BOOL, VALUE_TYPE_FLOAT, VALUE_TYPE_INT, VALUE_TYPE_STRING,
+    align_offset,
+)
+from frontend.writer import encode_header
+
+# Tensor payload is written by repeating one random block of this size
+PAYLOAD_BLOCK_SIZE = 1 << 20
+_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 _-."
+
+
+@dataclass
+class SyntheticSpec:
+    """Shape of a generated model. The same spec and seed always produce the same bytes."""
+    kv_count: int = 1000
+    string_length: int = 32
+    array_length: int = 32000
+    tensor_count: int = 64
+    tensor_bytes: int = 1 << 20
+    alignment: int = 32
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choices(_ALPHABET, k=length))
+
+
+def synthetic_entries(spec: SyntheticSpec) -> List[Tuple[str, int, Any]]:
+    """General keys, kv_count scalar keys cycling through the value types, and tokenizer arrays."""
+    rng = random.Random(spec.seed)
+    entries: List[Tuple[str, int, Any]] = [
+        ("general.architecture", VALUE_TYPE_STRING, "synthetic"),
+        ("general.name", VALUE_TYPE_STRING, f"synthetic-{spec.seed}"),
+        (ALIGNMENT_KEY, VALUE_TYPE_INT, spec.alignment),
+    ]
+    for i in range(spec.kv_count):
+        kind = i % 4
+        if kind == 0:
+            entries.append((f"synthetic.kv.{i:06d}", VALUE_TYPE_STRING, _text(rng, spec.string_length)))
+        elif kind == 1:
+            entries.append((f"synthetic.kv.{i:06d}", VALUE_TYPE_INT, rng.randrange(-2**31, 2**31)))
+        elif kind == 2:
+            entries.append((f"synthetic.kv.{i:06d}", VALUE_TYPE_FLOAT, rng.random()))
+        else:
+            entries.append((f"synthetic.kv.{i:06d}", VALUE_TYPE_BOOL, rng.random() < 0.5))
+    if spec.array_length:
+        entries += [
+            ("tokenizer.ggml.tokens", VALUE_TYPE_ARRAY,
+             [_text(rng, 1 + i % spec.string_length) if spec.string_length else "" for i in range(spec.array_length)]),
+            ("tokenizer.ggml.scores", VALUE_TYPE_ARRAY, [rng.random() for _ in range(spec.array_length)]),
+            ("tokenizer.ggml.token_type", VALUE_TYPE_ARRAY, [i % 6 for i in range(spec.array_length)]),
+        ]
+    return entries
+
+
+def _tensor_info(spec: SyntheticSpec) -> Tuple[bytes, int]:
+    """Encoded tensor-info table for tensor_count 1-D F32 tensors, and the aligned stride between them."""
+    elements = spec.tensor_bytes // 4
+    stride = align_offset(elements * 4, spec.alignment)
+    info = bytearray()
+    for i in range(spec.tensor_count):
+        name = f"blk.{i}.weight".encode('utf-8')
+        info += struct.pack("<Q", len(name)) + name
+        info += struct.pack("<IQIQ", 1, elements, 0, i * stride)
+    return bytes(info), stride
+
+
+def generate(path: str, spec: SyntheticSpec) -> int:
+    """Write a synthetic GGUF file at path; returns its size in bytes."""
+    rng = random.Random(spec.seed + 1)
+    info, stride = _tensor_info(spec)
+    header = encode_header(synthetic_entries(spec), version=3, tensor_count=spec.tensor_count) + info
+    block = rng.randbytes(PAYLOAD_BLOCK_SIZE)
+    tensor_size = spec.tensor_bytes // 4 * 4
+    with open(path, 'wb') as f:
+        f.write(header)
+        if spec.tensor_count:
+            f.write(b"\0" * (align_offset(len(header), spec.alignment) - len(header)))
+        for i in range(spec.tensor_count):
+            remaining = tensor_size
+            while remaining:
+                chunk = block[:remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+            if i + 1 < spec.tensor_count:
+                f.write(b"\0" * (stride - tensor_size))
+        return f.tell()
@@ -1,6 +1,31 @@
-from .main import main
-from .cli import CLI
-from .config import Config
-from .utils import validate_gguf_file, load_default_config, save_config
+import importlib
 
-__all__ = ['main', 'CLI', 'Config', 'validate_gguf_file', 'load_default_config', 'save_config']
+# Exports are imported on first access, so running one command only loads what it uses
+_EXPORTS = {
+    'main': '.main',
+    'CLI': '.cli',
+    'AsyncCLI': '.async_cli',
+    'Config': '.config',
+    'GGUFReader': '.reader',
+    'read_metadata': '.reader',
+    'MetadataTransaction': '.writer',
+    'validate_gguf_file': '.utils',
+    'load_default_config': '.utils',
+    'save_config': '.utils',
+    'Profiler': '.profiling',
+}
+
+__all__ = ['main', 'CLI', 'AsyncCLI', 'Config', 'GGUFReader', 'read_metadata', 'MetadataTransaction', 'validate_gguf_file', 'load_default_config', 'save_config', 'Profiler']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
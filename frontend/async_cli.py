@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from .cache import file_identity
+from .checksum import TensorChecksum, check_unchanged, patched_in_place, tensor_checksum
+from .config import Config, UserConfig
+from .reader import read_metadata, summarize_value
+from .shards import ShardSet, tensor_summary
+from .bulk import apply_user_config
+from .overlay import Overlay
+from .query import search_metadata
+from . import jsonio, profiling
+
+_DEFAULT = object()
+
+
+def _with_overlay(func: Callable[..., Any], overlay_dir: Optional[str], file_path: str, *args: Any) -> Any:
+    # Built on the worker thread so reading the sidecar never blocks the loop
+    return func(file_path, *args, overlay=Overlay(file_path, overlay_dir))
+
+
+def _read_metadata(file_path: str, overlay: Optional[Overlay] = None) -> list:
+    metadata = read_metadata(file_path)
+    return overlay.apply(metadata) if overlay is not None else metadata
+
+
+def _record_edit(file_path: str, key: str, value: Any = None, value_type: Any = None,
+                 overlay: Optional[Overlay] = None) -> str:
+    if value_type is None:
+        overlay.remove(key)
+    else:
+        overlay.set(key, value, value_type)
+    overlay.save()
+    return overlay.path
+
+
+def _compact(file_path: str, slack: int, overlay: Optional[Overlay] = None) -> bool:
+    return bool(overlay.edits) and overlay.compact(slack)
+
+
+def _apply_to_shards(file_path: str, user_config: Dict[str, Any], slack: int, verify: bool) -> Optional[str]:
+    shards = ShardSet.open(file_path)
+    if shards is None:
+        return None
+    rewritten = shards.apply(user_config, slack, verify)
+    return f"Updated {len(rewritten)} of {len(shards.paths)} shards of {file_path}"
+
+
+def _checksum_before(file_path: str) -> Optional[Tuple[Tuple[int, int, int, int], TensorChecksum]]:
+    try:
+        return file_identity(file_path), tensor_checksum(file_path)
+    except (OSError, ValueError) as e:
+        # Unreadable files are left for the edit itself to report
+        logging.warning(f"Tensor data not verified: {e}")
+        return None
+
+
+def _check_after(file_path: str, identity: Tuple[int, int, int, int], before: TensorChecksum) -> None:
+    if not patched_in_place(file_path, identity, before):
+        check_unchanged(before, tensor_checksum(file_path))
+
+
+class AsyncCLI:
+    """Non-blocking counterpart of CLI for event-loop callers.
+
+    Backend commands run through asyncio subprocesses; everything the frontend does
+    in-process runs on worker threads. At most `concurrency` calls run at once, each
+    bounded by `timeout` seconds (the config's timeout unless overridden per call).
+    A backend child that times out or whose call is cancelled is killed. Threads
+    cannot be killed, so an in-process call that times out releases its caller but
+    finishes in the background, holding its slot until it does.
+
+    Edits go through the same paths as CLI: a shard edits its whole set, and the
+    backend's edits are checked against the tensor data when verification is on.
+
+    Unlike CLI, methods return results and raise on failure instead of printing. In
+    overlay mode, edits are recorded in the model's sidecar and reads merge it.
+    """
+
+    def __init__(self, config: Config, concurrency: Optional[int] = None):
+        self.config = config
+        self.rust_binary = "gguf_metadata_modifier"
+        self.timeout = config.get_timeout()
+        self._semaphore = asyncio.Semaphore(concurrency or os.cpu_count() or 4)
+        self._children: Set[asyncio.subprocess.Process] = set()
+        self._threads: Set[asyncio.Future] = set()
+
+    async def __aenter__(self) -> "AsyncCLI":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Kill any backend children still running and wait for in-process calls that outlived their callers."""
+        for proc in list(self._children):
+            await self._kill(proc)
+        if self._threads:
+            await asyncio.wait(list(self._threads))
+
+    def _timeout(self, timeout: Any) -> Optional[float]:
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        return timeout if timeout and timeout > 0 else None
+
+    async def _kill(self, proc: asyncio.subprocess.Process) -> None:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        # Reap it even if our caller is being cancelled
+        await asyncio.shield(proc.wait())
+        self._children.discard(proc)
+
+    async def _run_rust_command(self, *args: str, timeout: Any = _DEFAULT) -> str:
+        timeout = self._timeout(timeout)
+        async with self._semaphore:
+            profiling.count("backend_calls")
+            with profiling.span("backend.spawn", command=args[0]):
+                proc = await asyncio.create_subprocess_exec(
+                    self.rust_binary, *args,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                )
+                self._children.add(proc)
+                try:
+                    stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    await self._kill(proc)
+                    raise TimeoutError(f"Rust command {args[0]} did not finish within {timeout}s")
+                except BaseException:
+                    # Cancelled: don't leave the child running
+                    await self._kill(proc)
+                    raise
+                self._children.discard(proc)
+        if proc.returncode != 0:
+            error = stderr.decode('utf-8', 'replace').strip()
+            logging.error(f"Error executing Rust command: {error}")
+            raise RuntimeError(f"Rust command failed: {error}")
+        return stdout.decode('utf-8', 'replace').strip()
+
+    def _thread_done(self, future: asyncio.Future) -> None:
+        self._threads.discard(future)
+        self._semaphore.release()
+        if not future.cancelled():
+            # Retrieved so a caller that gave up does not leave an unretrieved exception behind
+            future.exception()
+
+    async def _run_local(self, func: Callable[..., Any], *args: Any, timeout: Any = _DEFAULT) -> Any:
+        timeout = self._timeout(timeout)
+        await self._semaphore.acquire()
+        # The slot is released when the thread finishes, not when the caller stops waiting
+        future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        self._threads.add(future)
+        future.add_done_callback(self._thread_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{func.__name__} did not finish within {timeout}s")
+
+    async def _run_file_op(self, func: Callable[..., Any], file_path: str, *args: Any,
+                           timeout: Any = _DEFAULT) -> Any:
+        """Run func(file_path, *args) on a thread, passing overlay= in overlay mode."""
+        if self.config.is_overlay_mode():
+            return await self._run_local(_with_overlay, func, self.config.get_overlay_dir(), file_path, *args,
+                                         timeout=timeout)
+        return await self._run_local(func, file_path, *args, timeout=timeout)
+
+    async def _edit(self, file_path: str, user_config: Dict[str, Any], *args: str, timeout: Any = _DEFAULT) -> str:
+        """Apply user_config to file_path's shard set, or run the backend command args on file_path."""
+        verify = self.config.is_tensor_verification_enabled()
+        applied = await self._run_local(_apply_to_shards, file_path, user_config, self.config.get_header_slack(),
+                                        verify, timeout=timeout)
+        if applied is not None:
+            return applied
+        before = await self._run_local(_checksum_before, file_path, timeout=timeout) if verify else None
+        result = await self._run_rust_command(args[0], file_path, *args[1:], timeout=timeout)
+        if before is not None:
+            await self._run_local(_check_after, file_path, *before, timeout=timeout)
+        return result
+
+    async def modify_metadata(self, file_path: str, key: str, value: str, value_type: str,
+                              timeout: Any = _DEFAULT) -> str:
+        if self.config.is_overlay_mode():
+            return await self._run_file_op(_record_edit, file_path, key, value, value_type, timeout=timeout)
+        return await self._edit(file_path, {"metadata_to_modify": [{"key": key, "value": value, "type": value_type}]},
+                                "modify", key, value, value_type, timeout=timeout)
+
+    async def remove_metadata(self, file_path: str, key: str, timeout: Any = _DEFAULT) -> str:
+        if self.config.is_overlay_mode():
+            return await self._run_file_op(_record_edit, file_path, key, timeout=timeout)
+        return await self._edit(file_path, {"metadata_to_remove": [key]}, "remove", key, timeout=timeout)
+
+    async def compact(self, file_path: str, timeout: Any = _DEFAULT) -> bool:
+        """Fold the file's overlay into it; returns True if the file was rewritten."""
+        return await self._run_local(_with_overlay, _compact, self.config.get_overlay_dir(), file_path,
+                                     self.config.get_header_slack(), timeout=timeout)
+
+    async def read_metadata(self, file_path: str, timeout: Any = _DEFAULT) -> list:
+        """All metadata, with array values summarized."""
+        metadata = await self._run_file_op(_read_metadata, file_path, timeout=timeout)
+        return [dict(item, value=summarize_value(item['value'])) for item in metadata]
+
+    async def search_metadata(self, file_path: str, search_key: str, timeout: Any = _DEFAULT) -> list:
+        """Entries matching search_key: a query, or a plain word to find in keys."""
+        return await self._run_file_op(search_metadata, file_path, search_key, timeout=timeout)
+
+    async def export_metadata(self, file_path: str, export_path: str, timeout: Any = _DEFAULT) -> int:
+        return await self._run_file_op(jsonio.export_metadata, file_path, export_path, timeout=timeout)
+
+    async def import_metadata(self, file_path: str, import_path: str, timeout: Any = _DEFAULT) -> Tuple[int, int]:
+        return await self._run_file_op(jsonio.import_metadata, file_path, import_path,
+                                       self.config.get_header_slack(), timeout=timeout)
+
+    async def tensor_summary(self, file_path: str, timeout: Any = _DEFAULT) -> dict:
+        return await self._run_local(tensor_summary, file_path, timeout=timeout)
+
+    async def process_file_with_config(self, file_path: str, user_config, timeout: Any = _DEFAULT) -> bool:
+        """Apply a user config in one pass; returns True if the file was rewritten."""
+        if isinstance(user_config, UserConfig):
+            user_config = asdict(user_config)
+        return await self._run_file_op(apply_user_config, file_path, user_config,
+                                       self.config.get_header_slack(), timeout=timeout)
@@ -0,0 +1,257 @@
+import glob
+import json
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from .cache import file_identity
+from .checksum import check_unchanged, patched_in_place, tensor_checksum
+from .query import search_metadata
+from . import jsonio, output, profiling, stub
+from .writer import MetadataTransaction
+from .overlay import Overlay
+from .plan import Plan, compile_plan, estimate, merge_edits
+from .shards import ShardSet
+from .output import console
+
+
+@dataclass
+class FileResult:
+    path: str
+    ok: bool
+    size: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+
+
+def _scan_directory(directory: str) -> Iterator[str]:
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_directory(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith('.gguf'):
+                yield entry.path
+
+
+def discover_gguf_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories (recursively) and glob patterns into a sorted, de-duplicated list of .gguf files."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(_scan_directory(path))
+        elif glob.has_magic(path):
+            for match in glob.iglob(path, recursive=True):
+                if os.path.isdir(match):
+                    found.update(_scan_directory(match))
+                elif match.lower().endswith('.gguf'):
+                    found.add(match)
+        elif os.path.isfile(path):
+            found.add(path)
+    return sorted(found)
+
+
+def apply_user_config(file_path: str, user_config: Dict[str, Any], slack: int = 0,
+                      overlay: Optional[Overlay] = None, plan: Optional[Plan] = None,
+                      before_write: Optional[Callable[[], None]] = None) -> bool:
+    """Apply a user config to one file in a single pass; returns True if the file was rewritten.
+
+    Edits that would not change anything are skipped. With an overlay the edits are
+    saved to it and the file is left alone. A shard of a split model applies the config
+    to its whole set (see ShardSet.apply). before_write, if given, is called just before
+    anything is written.
+    """
+    before_write = before_write or (lambda: None)
+    plan = plan or compile_plan(user_config)
+    if plan.errors:
+        raise ValueError("Invalid config: " + "; ".join(plan.errors))
+    if overlay is None:
+        shards = ShardSet.open(file_path)
+        if shards is not None:
+            before_write()
+            return bool(shards.apply(user_config, slack, plan=plan))
+    transaction = MetadataTransaction(file_path)
+    if overlay is None:
+        plan.apply(transaction, plan.resolve(transaction.entries))
+        if transaction.dirty:
+            before_write()
+        return transaction.commit(slack=slack)
+    effective = plan.resolve(merge_edits(transaction.entries, overlay.edits))
+    if effective:
+        plan.apply(overlay, effective)
+        before_write()
+        overlay.save()
+    return False
+
+
+def _run_operation(operation: str, file_path: str, payload: Dict[str, Any]) -> Any:
+    overlay = Overlay(file_path, payload.get('overlay_dir')) if payload.get('overlay') else None
+    if operation == "apply" and overlay is None:
+        shards = ShardSet.open(file_path)
+        if shards is not None:
+            _stop_timeout()
+            rewritten = shards.apply(payload['user_config'], payload.get('slack', 0), payload.get('verify', False),
+                                     payload.get('plan'))
+            return f"rewritten {len(rewritten)} of {len(shards.paths)} shards" if rewritten else "unchanged"
+    if operation == "apply":
+        before = None
+        if payload.get('verify') and overlay is None:
+            identity = file_identity(file_path)
+            before = tensor_checksum(file_path)
+        if apply_user_config(file_path, payload['user_config'], payload.get('slack', 0), overlay, payload.get('plan'),
+                             before_write=_stop_timeout):
+            if before is not None and not patched_in_place(file_path, identity, before):
+                check_unchanged(before, tensor_checksum(file_path))
+            return "rewritten"
+        return "recorded in overlay" if overlay is not None else "unchanged"
+    if operation == "search":
+        return search_metadata(file_path, payload['search_key'], overlay)
+    if operation == "export":
+        name = os.path.splitext(os.path.basename(file_path))[0] + ".json"
+        export_path = os.path.join(payload['export_dir'], name)
+        jsonio.export_metadata(file_path, export_path, overlay)
+        return export_path
+    if operation == "plan":
+        plan = payload.get('plan') or compile_plan(payload['user_config'])
+        return estimate(file_path, plan, payload.get('slack', 0), overlay)
+    if operation == "checksum":
+        return tensor_checksum(file_path).root
+    if operation == "stub":
+        stub_path = os.path.join(payload['stub_dir'], os.path.basename(file_path))
+        stub.extract_stub(file_path, stub_path)
+        return stub_path
+    if operation == "compact":
+        overlay = Overlay(file_path, payload.get('overlay_dir'))
+        if not overlay.edits:
+            return "unchanged"
+        _stop_timeout()
+        return "compacted" if overlay.compact(payload.get('slack', 0)) else "unchanged"
+    raise ValueError(f"Unknown bulk operation: {operation}")
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError("Operation timed out")
+
+
+def _stop_timeout() -> None:
+    # The timeout covers reading and planning; once an operation starts writing the model
+    # it runs to completion, so an attempt that timed out never changed the file
+    if hasattr(signal, 'setitimer'):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def process_one(operation: str, file_path: str, payload: Dict[str, Any],
+                timeout: Optional[float], retry_attempts: int) -> FileResult:
+    """Run one operation on one file, retrying I/O errors and timeouts. Runs inside a pool worker."""
+    if payload.get('profile'):
+        # Spans recorded in the worker travel back to the parent with the result
+        with profiling.profiling() as profiler:
+            with profiling.span("bulk.file", file=file_path, operation=operation):
+                result = _process_one(operation, file_path, payload, timeout, retry_attempts)
+        result.profile = profiler.to_json()
+        return result
+    return _process_one(operation, file_path, payload, timeout, retry_attempts)
+
+
+def _process_one(operation: str, file_path: str, payload: Dict[str, Any],
+                 timeout: Optional[float], retry_attempts: int) -> FileResult:
+    start = time.perf_counter()
+    result = FileResult(path=file_path, ok=False)
+    use_alarm = bool(timeout) and hasattr(signal, 'setitimer')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+    try:
+        for attempt in range(1, max(1, retry_attempts) + 1):
+            result.attempts = attempt
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                try:
+                    result.size = os.path.getsize(file_path)
+                    result.result = _run_operation(operation, file_path, payload)
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                result.ok = True
+                result.error = None
+                break
+            except (ValueError, RuntimeError) as e:
+                # Invalid files (or tensor data changed by an edit) won't get better on retry
+                result.error = str(e)
+                break
+            except (OSError, TimeoutError) as e:
+                result.error = str(e) or type(e).__name__
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def run_bulk(files: List[str], operation: str, payload: Dict[str, Any], workers: Optional[int] = None,
+             max_batch_size: int = 100, timeout: Optional[float] = None, retry_attempts: int = 1) -> List[FileResult]:
+    """Run operation over files on a process pool, submitting at most max_batch_size files at a time."""
+    results: List[FileResult] = []
+    batch_size = max(1, max_batch_size)
+    profiler = profiling.get_profiler()
+    if profiler is not None:
+        payload = dict(payload, profile=True)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(files), batch_size):
+            batch = files[start:start + batch_size]
+            futures = [
+                executor.submit(process_one, operation, path, payload, timeout, retry_attempts)
+                for path in batch
+            ]
+            for path, future in zip(batch, futures):
+                try:
+                    result = future.result()
+                    if profiler is not None and result.profile:
+                        profiler.merge(result.profile)
+                        result.profile = None
+                    results.append(result)
+                except Exception as e:
+                    results.append(FileResult(path=path, ok=False, error=str(e) or type(e).__name__))
+    return results
+
+
+def print_summary(results: List[FileResult], elapsed: float, show_results: bool = False) -> None:
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    total_bytes = sum(r.size for r in succeeded)
+    elapsed = max(elapsed, 1e-9)
+
+    summary = output.table("Bulk run summary")
+    summary.add_column("Files", justify="right")
+    summary.add_column("Succeeded", justify="right", style="green")
+    summary.add_column("Failed", justify="right", style="red")
+    summary.add_column("Elapsed (s)", justify="right")
+    summary.add_column("Files/s", justify="right")
+    summary.add_column("MB/s", justify="right")
+    summary.add_row(
+        str(len(results)), str(len(succeeded)), str(len(failed)), f"{elapsed:.2f}",
+        f"{len(succeeded) / elapsed:.1f}", f"{total_bytes / 1e6 / elapsed:.1f}",
+    )
+    console.print(summary)
+
+    if show_results and succeeded:
+        table = output.table("Results")
+        table.add_column("File")
+        table.add_column("Result")
+        for r in succeeded:
+            table.add_row(r.path, r.result if isinstance(r.result, str) else json.dumps(r.result))
+        console.print(table)
+
+    if failed:
+        table = output.table("Failures", style="red")
+        table.add_column("File")
+        table.add_column("Attempts", justify="right")
+        table.add_column("Error")
+        for r in failed:
+            table.add_row(r.path, str(r.attempts), r.error or "")
+        console.print(table)
@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .reader import read_metadata, summarize_value
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def file_identity(file_path: str) -> Tuple[int, int, int, int]:
+    """(device, inode, size, mtime_ns) of file_path; changes whenever the file is replaced or written."""
+    st = os.stat(file_path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class MetadataCache:
+    """On-disk cache of parsed metadata keyed by file identity, evicted LRU by total size.
+
+    Array values are cached as {"element_type", "length"} summaries; read the file itself
+    for their elements.
+    """
+
+    def __init__(self, cache_path: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(cache_path, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,"
+            " last_used REAL, nbytes INTEGER, data BLOB,"
+            " PRIMARY KEY (dev, ino))"
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def get(self, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        dev, ino, size, mtime_ns = file_identity(file_path)
+        row = self._db.execute(
+            "SELECT data FROM entries WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+            (dev, ino, size, mtime_ns),
+        ).fetchone()
+        if row is None:
+            return None
+        with self._db:
+            self._db.execute("UPDATE entries SET last_used = ? WHERE dev = ? AND ino = ?", (time.time(), dev, ino))
+        return json.loads(row[0])
+
+    def put(self, file_path: str, metadata: List[Dict[str, Any]],
+            identity: Optional[Tuple[int, int, int, int]] = None) -> None:
+        dev, ino, size, mtime_ns = identity or file_identity(file_path)
+        data = json.dumps(
+            [dict(item, value=summarize_value(item['value'])) for item in metadata], separators=(',', ':')
+        ).encode('utf-8')
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (dev, ino, size, mtime_ns, time.time(), len(data), data),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = 0
+        stale = []
+        for dev, ino, nbytes in self._db.execute("SELECT dev, ino, nbytes FROM entries ORDER BY last_used DESC"):
+            total += nbytes
+            if total > self.max_bytes:
+                stale.append((dev, ino))
+        self._db.executemany("DELETE FROM entries WHERE dev = ? AND ino = ?", stale)
+
+    def invalidate(self, file_path: str) -> None:
+        try:
+            dev, ino, _, _ = file_identity(file_path)
+        except OSError:
+            return
+        with self._db:
+            self._db.execute("DELETE FROM entries WHERE dev = ? AND ino = ?", (dev, ino))
+
+    def load(self, file_path: str) -> List[Dict[str, Any]]:
+        """Return the file's metadata, parsing and caching it on a miss."""
+        metadata = self.get(file_path)
+        if metadata is None:
+            identity = file_identity(file_path)
+            metadata = read_metadata(file_path)
+            self.put(file_path, metadata, identity)
+            metadata = [dict(item, value=summarize_value(item['value'])) for item in metadata]
+        return metadata
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from .cache import file_identity
+from .reader import GGUFReader
+from . import profiling
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+DIGEST_SIZE = 32
+
+# Prefixes keep leaf and interior hashes from ever colliding
+_LEAF = b"\x00"
+_NODE = b"\x01"
+
+
+@dataclass
+class TensorChecksum:
+    """Digest of a file's tensor data region: sha256 per fixed-size chunk, combined in a Merkle tree.
+
+    The header, metadata and tensor-info table are not covered, so metadata edits never
+    change it.
+    """
+    root: str
+    chunk_size: int
+    data_offset: int
+    data_size: int
+    chunks: List[bytes]
+
+    def diff(self, other: "TensorChecksum") -> List[int]:
+        """Indices of chunks that differ between two checksums taken with the same chunk size."""
+        if self.chunk_size != other.chunk_size:
+            raise ValueError("Checksums use different chunk sizes")
+        length = max(len(self.chunks), len(other.chunks))
+        return [i for i in range(length)
+                if i >= len(self.chunks) or i >= len(other.chunks) or self.chunks[i] != other.chunks[i]]
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """Fold leaf digests pairwise up to a single root; an odd node is carried up unchanged."""
+    if not leaves:
+        return hashlib.sha256(_LEAF).digest()
+    level = leaves
+    while len(level) > 1:
+        parents = [hashlib.sha256(_NODE + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0]
+
+
+def _hash_chunk(view: memoryview, start: int, end: int) -> bytes:
+    # hashlib releases the GIL for large buffers, so chunks hash in parallel on threads
+    digest = hashlib.sha256(_LEAF)
+    digest.update(view[start:end])
+    return digest.digest()
+
+
+class ChecksumCache:
+    """Per-chunk digests of tensor data keyed by file identity, stored in SQLite."""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._db = sqlite3.connect(cache_path, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checksums ("
+            " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, chunk_size INTEGER,"
+            " data_offset INTEGER, chunks BLOB,"
+            " PRIMARY KEY (dev, ino, chunk_size))"
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def get(self, identity: Tuple[int, int, int, int], chunk_size: int) -> Optional[TensorChecksum]:
+        dev, ino, size, mtime_ns = identity
+        row = self._db.execute(
+            "SELECT data_offset, chunks FROM checksums"
+            " WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND chunk_size = ?",
+            (dev, ino, size, mtime_ns, chunk_size),
+        ).fetchone()
+        if row is None:
+            return None
+        data_offset, blob = row
+        chunks = [blob[i:i + DIGEST_SIZE] for i in range(0, len(blob), DIGEST_SIZE)]
+        return TensorChecksum(merkle_root(chunks).hex(), chunk_size, data_offset, size - data_offset, chunks)
+
+    def put(self, identity: Tuple[int, int, int, int], checksum: TensorChecksum) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*identity, checksum.chunk_size, checksum.data_offset, b"".join(checksum.chunks)),
+            )
+
+
+def tensor_checksum(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                    cache: Optional[ChecksumCache] = None) -> TensorChecksum:
+    """Checksum of file_path's tensor data, hashed in parallel over the mapping (or taken from cache).
+
+    A header-only stub has no data to hash; the checksum recorded when it was extracted is returned.
+    """
+    with profiling.span("checksum", file=file_path):
+        identity = file_identity(file_path)
+        if cache is not None:
+            cached = cache.get(identity, chunk_size)
+            if cached is not None:
+                profiling.count("checksum_cache_hits")
+                return cached
+        with GGUFReader(file_path) as reader:
+            stub = reader.stub
+            if stub:
+                if stub["chunk_size"] != chunk_size:
+                    raise ValueError(f"{file_path}: The stub records a checksum of {stub['chunk_size']}-byte chunks")
+                return TensorChecksum(stub["checksum"], chunk_size, reader.data_offset, stub["data_size"], [])
+            start, end = reader.data_offset, reader.size
+            bounds = [(offset, min(offset + chunk_size, end)) for offset in range(start, end, chunk_size)]
+            view = reader.buffer
+            if len(bounds) > 1 and workers != 1:
+                with ThreadPoolExecutor(max_workers=workers or min(32, os.cpu_count() or 1)) as executor:
+                    chunks = list(executor.map(lambda b: _hash_chunk(view, *b), bounds))
+            else:
+                chunks = [_hash_chunk(view, *b) for b in bounds]
+        profiling.count("bytes_hashed", end - start)
+        checksum = TensorChecksum(merkle_root(chunks).hex(), chunk_size, start, end - start, chunks)
+        # Only cache what was hashed if the file did not change underneath us
+        if cache is not None and file_identity(file_path) == identity:
+            cache.put(identity, checksum)
+        return checksum
+
+
+def check_unchanged(before: TensorChecksum, after: TensorChecksum) -> None:
+    """Raise RuntimeError if two checksums of the same file's tensor data differ."""
+    if after.root != before.root:
+        changed = before.diff(after)
+        raise RuntimeError(f"Tensor data changed during the edit ({len(changed)} chunk(s) differ, "
+                           f"first at byte {before.data_offset + changed[0] * before.chunk_size})")
+
+
+def patched_in_place(file_path: str, identity: Tuple[int, int, int, int], checksum: TensorChecksum) -> bool:
+    """Whether file_path, which had identity when checksum was taken, has since had only its header written.
+
+    Edits either patch the header in place or rename a rewritten file over the old one, so
+    a file that kept its inode and size and whose data still starts where it did has the
+    same tensor data, without hashing it again.
+    """
+    if file_identity(file_path)[:3] != identity[:3]:
+        return False
+    with GGUFReader(file_path) as reader:
+        return reader.data_offset == checksum.data_offset
+
+
+def verify_tensor_data(file_path: str, root: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       cache: Optional[ChecksumCache] = None) -> bool:
+    """True if file_path's tensor data still has the given checksum root."""
+    return tensor_checksum(file_path, chunk_size, cache=cache).root == root.lower()
@@ -1,29 +1,212 @@
 import subprocess
 import json
 import logging
-from rich.console import Console
-from rich.progress import Progress
-from .config import Config
+import re
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Optional
+from .config import Config, UserConfig
+from .reader import json_default
+from . import output, profiling
+from .query import search_metadata
+from .output import console
 
-console = Console()
+if TYPE_CHECKING:
+    from .checksum import TensorChecksum
+    from .overlay import Overlay
+
+# Everything a command needs beyond reading metadata (writer, caches, checksums, stubs,
+# overlays, plans, shards) is imported by the command, so `-s` does not pay for it.
 
 class CLI:
     def __init__(self, config: Config):
         self.config = config
         self.rust_binary = "gguf_metadata_modifier"
+        self._pool = None
+        self._cache = None
+        self._checksums = None
+
+    @property
+    def metadata_cache(self):
+        if self._cache is None and self.config.is_cache_enabled():
+            import sqlite3
+            from .cache import MetadataCache
+
+            try:
+                self._cache = MetadataCache(self.config.get_cache_path(), self.config.get_cache_max_bytes())
+            except sqlite3.Error as e:
+                logging.warning(f"Metadata cache unavailable: {e}")
+        return self._cache
+
+    @property
+    def checksum_cache(self):
+        if self._checksums is None and self.config.is_cache_enabled():
+            import sqlite3
+            from .checksum import ChecksumCache
+
+            try:
+                self._checksums = ChecksumCache(self.config.get_checksum_path())
+            except sqlite3.Error as e:
+                logging.warning(f"Checksum cache unavailable: {e}")
+        return self._checksums
+
+    def _checksum(self, file_path: str) -> "TensorChecksum":
+        import sqlite3
+        from .checksum import tensor_checksum
+
+        try:
+            return tensor_checksum(file_path, cache=self.checksum_cache)
+        except sqlite3.Error as e:
+            logging.warning(f"Checksum cache unavailable: {e}")
+            return tensor_checksum(file_path)
+
+    @contextmanager
+    def _verifying(self, file_path: str):
+        """Raise RuntimeError if the wrapped edit changed file_path's tensor data.
+
+        A header patched in place leaves the data as it was: it is not hashed again, and the
+        checksum is cached under the file's new identity for the next edit.
+        """
+        from .cache import file_identity
+
+        before = None
+        if self.config.is_tensor_verification_enabled():
+            try:
+                identity = file_identity(file_path)
+                before = self._checksum(file_path)
+            except (OSError, ValueError) as e:
+                # Unreadable files are left for the edit itself to report
+                logging.warning(f"Tensor data not verified: {e}")
+        yield
+        if before is not None:
+            from .checksum import check_unchanged, patched_in_place
+
+            if patched_in_place(file_path, identity, before):
+                self._remember_checksum(file_identity(file_path), before)
+            else:
+                check_unchanged(before, self._checksum(file_path))
+
+    def _remember_checksum(self, identity, checksum) -> None:
+        cache = self.checksum_cache
+        if cache is not None:
+            import sqlite3
+
+            try:
+                cache.put(identity, checksum)
+            except sqlite3.Error as e:
+                logging.warning(f"Checksum cache unavailable: {e}")
+
+    def _overlay(self, file_path: str):
+        """The file's sidecar overlay in overlay mode, else None."""
+        if not self.config.is_overlay_mode():
+            return None
+        from .overlay import Overlay
+
+        return Overlay(file_path, self.config.get_overlay_dir())
+
+    def _apply_to_shards(self, file_path: str, user_config) -> Optional[bool]:
+        """Apply user_config across the split model file_path belongs to; None if it is not a shard.
+
+        In overlay mode every shard keeps its own sidecar, so shards are handled as plain files.
+        """
+        from .shards import SHARD_PATTERN, ShardSet
+
+        if self.config.is_overlay_mode() or SHARD_PATTERN.match(file_path) is None:
+            return None
+        try:
+            shards = ShardSet.open(file_path)
+            for path in shards.paths:
+                self._invalidate(path)
+            rewritten = shards.apply(user_config, self.config.get_header_slack(),
+                                     self.config.is_tensor_verification_enabled())
+        except (OSError, ValueError, RuntimeError) as e:
+            console.print(f"[red]Failed to update shards: {e}")
+            return False
+        console.print(f"[green]Updated {len(rewritten)} of {len(shards.paths)} shards of {file_path}")
+        return True
+
+    def _read_through_cache(self, read):
+        """read(cache) with the metadata cache, or read(None) when it is disabled or fails."""
+        cache = self.metadata_cache
+        if cache is not None:
+            import sqlite3
+
+            try:
+                return read(cache)
+            except sqlite3.Error as e:
+                logging.warning(f"Metadata cache unavailable: {e}")
+        return read(None)
+
+    def _invalidate(self, file_path: str) -> None:
+        cache = self.metadata_cache
+        if cache is not None:
+            import sqlite3
+
+            try:
+                cache.invalidate(file_path)
+            except sqlite3.Error as e:
+                logging.warning(f"Metadata cache unavailable: {e}")
 
     def _run_rust_command(self, *args):
+        if self.config.get_backend_workers() > 0:
+            return self._run_pooled_command(*args)
         cmd = [self.rust_binary] + list(args)
+        profiling.count("backend_calls")
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with profiling.span("backend.spawn", command=args[0]):
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                        timeout=self.config.get_timeout() or None)
             return result.stdout.strip()
         except subprocess.CalledProcessError as e:
             logging.error(f"Error executing Rust command: {e.stderr}")
             raise RuntimeError(f"Rust command failed: {e.stderr}")
+        except subprocess.TimeoutExpired as e:
+            # subprocess.run has already killed the child
+            logging.error(f"Rust command timed out after {e.timeout}s")
+            raise RuntimeError(f"Rust command timed out after {e.timeout}s")
+
+    def _run_pooled_command(self, *args):
+        if self._pool is None:
+            from .workers import WorkerPool
+
+            self._pool = WorkerPool(
+                self.rust_binary,
+                size=self.config.get_backend_workers(),
+                timeout=self.config.get_timeout() or None,
+                retry_attempts=self.config.get_retry_attempts(),
+            )
+        profiling.count("backend_calls")
+        try:
+            with profiling.span("backend.request", command=args[0]):
+                result = self._pool.request(*args)
+        except RuntimeError as e:
+            logging.error(f"Error executing Rust command: {e}")
+            raise RuntimeError(f"Rust command failed: {e}")
+        return result if isinstance(result, str) else json.dumps(result)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+        if self._checksums is not None:
+            self._checksums.close()
+            self._checksums = None
 
     def modify_metadata(self, file_path: str, key: str, value: str, value_type: str) -> bool:
+        overlay = self._overlay(file_path)
+        if overlay is not None:
+            return self._record_in_overlay(overlay, key, lambda: overlay.set(key, value, value_type))
+        applied = self._apply_to_shards(file_path, {"metadata_to_modify": [{"key": key, "value": value,
+                                                                             "type": value_type}]})
+        if applied is not None:
+            return applied
         try:
-            self._run_rust_command("modify", file_path, key, value, value_type)
+            self._invalidate(file_path)
+            with self._verifying(file_path):
+                self._run_rust_command("modify", file_path, key, value, value_type)
             console.print(f"[green]Successfully modified metadata: {key}")
             return True
         except RuntimeError as e:
@@ -31,68 +214,274 @@ class CLI:
             return False
 
     def remove_metadata(self, file_path: str, key: str) -> bool:
+        overlay = self._overlay(file_path)
+        if overlay is not None:
+            return self._record_in_overlay(overlay, key, lambda: overlay.remove(key))
+        applied = self._apply_to_shards(file_path, {"metadata_to_remove": [key]})
+        if applied is not None:
+            return applied
         try:
-            self._run_rust_command("remove", file_path, key)
+            self._invalidate(file_path)
+            with self._verifying(file_path):
+                self._run_rust_command("remove", file_path, key)
             console.print(f"[green]Successfully removed metadata: {key}")
             return True
         except RuntimeError as e:
             console.print(f"[red]Failed to remove metadata: {e}")
             return False
 
+    def _record_in_overlay(self, overlay: "Overlay", key: str, stage) -> bool:
+        try:
+            stage()
+            overlay.save()
+            console.print(f"[green]Recorded {key} in overlay: {overlay.path}")
+            return True
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Failed to update overlay: {e}")
+            return False
+
+    def compact(self, file_path: str) -> bool:
+        """Fold the file's overlay into it with a single rewrite."""
+        from .overlay import Overlay
+
+        try:
+            overlay = Overlay(file_path, self.config.get_overlay_dir())
+            if not overlay.edits:
+                console.print("[yellow]No overlay edits to compact.")
+                return True
+            self._invalidate(file_path)
+            with self._verifying(file_path):
+                overlay.compact(slack=self.config.get_header_slack())
+            console.print(f"[green]Compacted overlay into: {file_path}")
+            return True
+        except (OSError, ValueError, RuntimeError) as e:
+            console.print(f"[red]Failed to compact overlay: {e}")
+            return False
+
     def export_metadata(self, file_path: str, export_path: str) -> bool:
+        from . import jsonio
+
         try:
-            self._run_rust_command("export", file_path, export_path)
+            overlay = self._overlay(file_path)
+            self._read_through_cache(lambda cache: jsonio.export_metadata(file_path, export_path, overlay, cache))
             console.print(f"[green]Successfully exported metadata to: {export_path}")
             return True
-        except RuntimeError as e:
+        except (OSError, ValueError) as e:
             console.print(f"[red]Failed to export metadata: {e}")
             return False
 
     def import_metadata(self, file_path: str, import_path: str) -> bool:
+        from . import jsonio
+
         try:
-            self._run_rust_command("import", file_path, import_path)
-            console.print(f"[green]Successfully imported metadata from: {import_path}")
+            self._invalidate(file_path)
+            overlay = self._overlay(file_path)
+            # An overlay import never touches the model
+            with self._verifying(file_path) if overlay is None else nullcontext():
+                changed, removed = jsonio.import_metadata(file_path, import_path,
+                                                          slack=self.config.get_header_slack(), overlay=overlay)
+            console.print(f"[green]Successfully imported metadata from: {import_path} "
+                          f"({changed} set, {removed} removed)")
             return True
-        except RuntimeError as e:
+        except (OSError, ValueError, KeyError, TypeError, RuntimeError) as e:
             console.print(f"[red]Failed to import metadata: {e}")
             return False
 
     def search_metadata(self, file_path: str, search_key: str) -> list:
+        """Entries matching search_key: a query (see index.parse_query), or a plain word to find in keys."""
         try:
-            result = self._run_rust_command("search", file_path, search_key)
-            metadata = json.loads(result)
-            return metadata
-        except RuntimeError as e:
+            overlay = self._overlay(file_path)
+            return self._read_through_cache(lambda cache: search_metadata(file_path, search_key, overlay, cache))
+        except (OSError, ValueError, re.error) as e:
             console.print(f"[red]Failed to search metadata: {e}")
             return []
 
-    def process_file_with_config(self, file_path: str, user_config: dict):
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Processing file...", total=100)
+    def checksum(self, file_path: str) -> str:
+        """Print and return the checksum root of the file's tensor data ("" on failure)."""
+        try:
+            checksum = self._checksum(file_path)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Failed to checksum tensor data: {e}")
+            return ""
+        console.print(f"{checksum.root}  {file_path} ({checksum.data_size:,} bytes of tensor data, "
+                      f"{len(checksum.chunks)} chunks)")
+        return checksum.root
 
-            # Modify existing metadata
-            progress.update(task, advance=25, description="Modifying metadata")
-            for item in user_config.get('metadata_to_modify', []):
-                self.modify_metadata(file_path, item['key'], str(item['value']), item['type'])
+    def verify(self, file_path: str, root: str) -> bool:
+        """Check the file's tensor data against a checksum root from an earlier checksum()."""
+        try:
+            checksum = self._checksum(file_path)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Failed to checksum tensor data: {e}")
+            return False
+        if checksum.root != root.strip().lower():
+            console.print(f"[red]Tensor data does not match: {file_path}")
+            return False
+        console.print(f"[green]Tensor data verified: {file_path}")
+        return True
 
-            # Add new metadata
-            progress.update(task, advance=25, description="Adding new metadata")
-            for item in user_config.get('metadata_to_add', []):
-                self.modify_metadata(file_path, item['key'], str(item['value']), item['type'])
+    def extract_stub(self, file_path: str, stub_path: str) -> bool:
+        """Write a header-only stub of the model: its full header, with the tensor data left out."""
+        from . import stub
 
-            # Remove metadata
-            progress.update(task, advance=25, description="Removing metadata")
-            for key in user_config.get('metadata_to_remove', []):
-                self.remove_metadata(file_path, key)
+        try:
+            info = stub.extract_stub(file_path, stub_path, checksum=self._checksum(file_path))
+        except (OSError, ValueError, RuntimeError) as e:
+            console.print(f"[red]Failed to extract stub: {e}")
+            return False
+        console.print(f"[green]Wrote header-only stub: {stub_path} "
+                      f"({info.data_size:,} of {info.source_size:,} bytes left out)")
+        return True
+
+    def replay_stub(self, file_path: str, stub_path: str, output_path: Optional[str] = None) -> bool:
+        """Apply the metadata edits made to a stub onto its full model (or a copy at output_path)."""
+        from . import stub
 
-            progress.update(task, advance=25, description="Processing complete")
+        try:
+            checksum = self._checksum(file_path) if self.config.is_tensor_verification_enabled() else None
+            if output_path is None:
+                self._invalidate(file_path)
+            with self._verifying(file_path) if output_path is None else nullcontext():
+                changed = stub.replay_stub(stub_path, file_path, slack=self.config.get_header_slack(),
+                                           output_path=output_path, checksum=checksum)
+        except (OSError, ValueError, RuntimeError) as e:
+            console.print(f"[red]Failed to replay stub: {e}")
+            return False
+        if not changed:
+            console.print(f"[yellow]Already matches the stub: {file_path}")
+        else:
+            console.print(f"[green]Replayed {stub_path} onto: {output_path or file_path}")
+        return True
+
+    def tensor_summary(self, file_path: str) -> dict:
+        from .shards import tensor_summary
+
+        try:
+            return tensor_summary(file_path)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Failed to read tensor info: {e}")
+            return {}
+
+    def query_library(self, paths: list, query: str) -> list:
+        """Bring the library index up to date for paths, then return the files matching query."""
+        import sqlite3
+        from .bulk import discover_gguf_files
+        from .index import MetadataIndex
+
+        try:
+            with MetadataIndex(self.config.get_index_path()) as index:
+                if paths:
+                    index.update(discover_gguf_files(paths))
+                return index.query(query)
+        except (sqlite3.Error, ValueError) as e:
+            console.print(f"[red]Failed to query metadata: {e}")
+            return []
+
+    def process_file_with_config(self, file_path: str, user_config) -> bool:
+        from .plan import compile_plan, merge_edits
+        from .writer import MetadataTransaction
+
+        if isinstance(user_config, UserConfig):
+            user_config = asdict(user_config)
+
+        # Compile first so a bad value fails the run before the file is touched
+        plan = compile_plan(user_config)
+        if plan.errors:
+            for error in plan.errors:
+                console.print(f"[red]Invalid metadata {error}")
+            return False
+        # A split model is edited as one set, touching only the shard headers that change
+        applied = self._apply_to_shards(file_path, user_config)
+        if applied is not None:
+            return applied
+
+        with output.progress() as progress:
+            task = progress.add_task("[cyan]Processing file...", total=None)
+
+            # Load the metadata once; every edit below is applied in memory.
+            # In overlay mode the edits go to the sidecar and the model is never opened for writing.
+            progress.update(task, description="Loading metadata")
+            try:
+                transaction = MetadataTransaction(file_path)
+                overlay = self._overlay(file_path)
+            except (OSError, ValueError) as e:
+                console.print(f"[red]Failed to load metadata: {e}")
+                return False
+            current = transaction.entries if overlay is None else merge_edits(transaction.entries, overlay.edits)
+            effective = plan.resolve(current)
+            # One step per edit that changes something, plus loading and writing the file
+            progress.update(task, total=len(effective) + 2, completed=1, description="Applying metadata edits")
+            plan.apply(transaction if overlay is None else overlay, effective, lambda: progress.advance(task))
+
+            # Commit all edits with a single rewrite, or none if nothing changes
+            progress.update(task, description="Writing file")
+            try:
+                if overlay is not None:
+                    if effective:
+                        overlay.save()
+                elif transaction.dirty:
+                    self._invalidate(file_path)
+                    with self._verifying(file_path):
+                        transaction.commit(slack=self.config.get_header_slack())
+            except (OSError, ValueError, RuntimeError) as e:
+                console.print(f"[red]Failed to write metadata: {e}")
+                return False
+            progress.update(task, advance=1, description="Processing complete")
 
         console.print("[bold green]File processing completed successfully.")
+        return True
+
+    def dry_run(self, file_path: str, user_config) -> dict:
+        """Report what process_file_with_config would do, without writing anything."""
+        from .plan import compile_plan, estimate
 
-    def display_metadata(self, metadata: list):
+        if isinstance(user_config, UserConfig):
+            user_config = asdict(user_config)
+        result = estimate(file_path, compile_plan(user_config), self.config.get_header_slack(),
+                          self._overlay(file_path))
+        table = output.table(f"Dry run: {file_path}")
+        table.add_column("Field")
+        table.add_column("Value", justify="right")
+        table.add_row("Operations requested", str(result['requested']))
+        table.add_row("After coalescing", str(result['planned']))
+        table.add_row("Sets", str(result['sets']))
+        table.add_row("Removes", str(result['removes']))
+        table.add_row("No-ops dropped", str(result['no_ops']))
+        table.add_row("In place", "yes" if result['in_place'] else "no")
+        table.add_row("Bytes written", f"{result['bytes_written']:,}")
+        table.add_row("File size", f"{result['file_size']:,}")
+        console.print(table)
+        for error in result['errors']:
+            console.print(f"[red]Invalid metadata {error}")
+        return result
+
+    def display_metadata(self, metadata: list, as_json: bool = False):
+        if as_json:
+            console.print_json(data=metadata, default=json_default)
+            return
         for item in metadata:
             console.print(f"[bold]Key:[/bold] {item['key']}")
             console.print(f"[bold]Value:[/bold] {item['value']}")
             console.print(f"[bold]Type:[/bold] {item['value_type']}")
             console.print("---")
-        
+
+    def display_tensor_summary(self, summary: dict):
+        console.print(f"[bold]Tensors:[/bold] {summary['tensor_count']}")
+        console.print(f"[bold]Parameters:[/bold] {summary['parameter_count']:,}")
+        console.print(f"[bold]Data size:[/bold] {summary['total_bytes']:,} bytes")
+        table = output.table("Bytes per dtype")
+        table.add_column("Type")
+        table.add_column("Bytes", justify="right")
+        for dtype, size in summary['bytes_by_dtype'].items():
+            table.add_row(dtype, f"{size:,}")
+        console.print(table)
+        table = output.table("Largest tensors")
+        table.add_column("Name")
+        table.add_column("Shape")
+        table.add_column("Type")
+        table.add_column("Bytes", justify="right")
+        for info in summary['largest']:
+            table.add_row(info['name'], str(list(info['shape'])), info['dtype'], f"{info['nbytes']:,}")
+        console.print(table)
+        for problem in summary['problems']:
+            console.print(f"[red]{problem}")
@@ -3,6 +3,11 @@ import json
 from typing import Any, Dict, Optional
 from dataclasses import dataclass, asdict, field
 import logging
+from . import profiling
+
+def parse_config(text: str) -> Dict[str, Any]:
+    """Parse a config file, skipping the // comment lines that save_config writes into it."""
+    return json.loads("\n".join(line for line in text.split("\n") if not line.lstrip().startswith("//")))
 
 @dataclass
 class MetadataItem:
@@ -22,19 +27,33 @@ class UserConfig:
     max_batch_size: int = 100
     retry_attempts: int = 3
     timeout: float = 30.0
+    header_slack: int = 0
+    backend_workers: int = 0
+    cache_enabled: bool = True
+    cache_max_bytes: int = 64 * 1024 * 1024
+    overlay_mode: bool = False
+    overlay_dir: str = ""
+    verify_tensor_data: bool = True
+    server_address: str = "127.0.0.1:8765"
+    server_cache_entries: int = 256
 
 class Config:
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, debug: bool = False):
         self.config_path = config_path or os.path.expanduser("~/.gguf_modifier_config.json")
-        self.user_config = self.load_config()
+        # The parsed file, shared with anything else that reads the configuration; None if missing or invalid
+        self.raw: Optional[Dict[str, Any]] = None
+        with profiling.span("config.load"):
+            self.user_config = self.load_config()
+        if debug:
+            self.user_config.debug = True
         self.setup_logging()
 
     def load_config(self) -> UserConfig:
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, 'r') as f:
-                    config_dict = json.load(f)
-                return self._dict_to_user_config(config_dict)
+                    self.raw = parse_config(f.read())
+                return self._dict_to_user_config(self.raw)
             except json.JSONDecodeError:
                 logging.error("Invalid JSON in config file. Using default settings.")
         return UserConfig()
@@ -83,13 +102,28 @@ class Config:
             "logging_level": "Set logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)",
             "max_batch_size": "Maximum number of items to process in a single batch",
             "retry_attempts": "Number of retry attempts for failed operations",
-            "timeout": "Timeout for operations in seconds"
+            "timeout": "Timeout for operations in seconds",
+            "header_slack": "Bytes reserved after the metadata on rewrite so later edits can be patched in place",
+            "backend_workers": "Number of persistent backend workers to keep warm (0 spawns one process per command)",
+            "cache_enabled": "Cache parsed metadata on disk, keyed by file identity",
+            "cache_max_bytes": "Maximum size of the metadata cache before least recently used entries are evicted",
+            "overlay_mode": "Record edits in a sidecar overlay file instead of rewriting the model",
+            "overlay_dir": "Directory for overlay files (empty: next to each model)",
+            "verify_tensor_data": "Checksum the tensor data before and after each edit and fail if it changed",
+            "server_address": "Address for --serve: HOST:PORT, or unix:PATH for a Unix socket",
+            "server_cache_entries": "Number of parsed headers the server keeps in memory"
         }
         return comments.get(key)
 
     def setup_logging(self) -> None:
+        level = logging.DEBUG if self.user_config.debug else getattr(logging, self.user_config.logging_level)
+        root = logging.getLogger()
+        if root.handlers:
+            # The entry point already installed its handlers; only apply the configured level
+            root.setLevel(level)
+            return
         logging.basicConfig(
-            level=getattr(logging, self.user_config.logging_level),
+            level=level,
             format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S"
         )
@@ -121,6 +155,45 @@ class Config:
     def get_timeout(self) -> float:
         return self.user_config.timeout
 
+    def get_header_slack(self) -> int:
+        return self.user_config.header_slack
+
+    def get_backend_workers(self) -> int:
+        return self.user_config.backend_workers
+
+    def is_cache_enabled(self) -> bool:
+        return self.user_config.cache_enabled
+
+    def get_cache_max_bytes(self) -> int:
+        return self.user_config.cache_max_bytes
+
+    def is_overlay_mode(self) -> bool:
+        return self.user_config.overlay_mode
+
+    def get_overlay_dir(self) -> Optional[str]:
+        return self.user_config.overlay_dir or None
+
+    def is_tensor_verification_enabled(self) -> bool:
+        return self.user_config.verify_tensor_data
+
+    def get_server_address(self) -> str:
+        return self.user_config.server_address
+
+    def get_server_cache_entries(self) -> int:
+        return self.user_config.server_cache_entries
+
+    def get_cache_path(self) -> str:
+        return os.path.join(os.path.dirname(self.config_path), ".gguf_modifier_cache.sqlite")
+
+    def get_index_path(self) -> str:
+        return os.path.join(os.path.dirname(self.config_path), ".gguf_modifier_index.sqlite")
+
+    def get_checksum_path(self) -> str:
+        return os.path.join(os.path.dirname(self.config_path), ".gguf_modifier_checksums.sqlite")
+
+    def get_journal_path(self) -> str:
+        return os.path.join(os.path.dirname(self.config_path), ".gguf_modifier_journal.sqlite")
+
     def update_config(self, **kwargs) -> None:
         for key, value in kwargs.items():
             if hasattr(self.user_config, key):
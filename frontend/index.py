@@ -0,0 +1,209 @@
+import functools
+import os
+import re
+import shlex
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+from .reader import GGUFReader, VALUE_TYPE_NAMES
+
+_OPERATORS = ("==", "!=", ">=", "<=", "=~", ">", "<")
+_SQL_OPERATORS = {"==": "=", "!=": "!=", ">=": ">=", "<=": "<=", ">": ">", "<": "<"}
+# Only recognized as separate words, so keys containing them still parse
+_WORD_OPERATORS = ("contains", "is")
+
+
+@dataclass
+class Clause:
+    """One query condition: a key (exact, `*` glob or `/regex/`) and an optional value test."""
+    key: str
+    op: Optional[str] = None
+    value: Any = None
+
+
+def _parse_value(text: str) -> Any:
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_query(query: str) -> List[Clause]:
+    """Parse `key OP value and key ...`.
+
+    OP is one of == != >= <= > <, =~ (regex on string values), contains (substring of
+    string values) or is (value type: null, bool, int, float, string or array); a clause
+    with no OP only requires the key to exist. Keys may contain `*` wildcards or be
+    written as /regex/. Values are numbers, true/false or (optionally quoted) strings.
+    """
+    tokens = shlex.split(query, posix=True)
+    clauses: List[Clause] = []
+    current: List[str] = []
+    for token in tokens + ["and"]:
+        if token.lower() != "and":
+            current.append(token)
+            continue
+        if not current:
+            raise ValueError(f"Invalid query: {query!r}")
+        clauses.append(_parse_clause(current[0] if len(current) == 1 else current, query))
+        current = []
+    return clauses
+
+
+def _parse_clause(parts, query: str) -> Clause:
+    if isinstance(parts, str):
+        # Allow `key==value` written without spaces
+        for op in _OPERATORS:
+            key, sep, value = parts.partition(op)
+            if sep and key and value:
+                parts = [key, op, value]
+                break
+        else:
+            return Clause(parts)
+    if len(parts) == 3 and parts[1].lower() in _WORD_OPERATORS:
+        parts = [parts[0], parts[1].lower(), parts[2]]
+    if len(parts) != 3 or parts[1] not in _OPERATORS + _WORD_OPERATORS:
+        raise ValueError(f"Invalid query clause {' '.join(parts)!r} in {query!r}")
+    key, op, value = parts
+    if op == "is":
+        if value.lower() not in VALUE_TYPE_NAMES:
+            raise ValueError(f"Unknown value type {value!r} in {query!r}")
+        return Clause(key, op, VALUE_TYPE_NAMES[value.lower()])
+    return Clause(key, op, value if op in ("=~", "contains") else _parse_value(value))
+
+
+@functools.lru_cache(maxsize=128)
+def _compile(pattern: str):
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and _compile(pattern).search(value) is not None
+
+
+class MetadataIndex:
+    """Inverted index over the keys and scalar values of many GGUF files, stored in SQLite."""
+
+    def __init__(self, index_path: str):
+        # Imported here so parse_query, which every search uses, does not load SQLite
+        import sqlite3
+
+        self.index_path = index_path
+        self._db = sqlite3.connect(index_path, timeout=30.0)
+        self._db.create_function("REGEXP", 2, _regexp, deterministic=True)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE,"
+            " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER);"
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " file_id INTEGER REFERENCES files(id) ON DELETE CASCADE,"
+            " key TEXT, num REAL, str TEXT);"
+            "CREATE INDEX IF NOT EXISTS kv_key_num ON kv (key, num);"
+            "CREATE INDEX IF NOT EXISTS kv_key_str ON kv (key, str);"
+            "CREATE INDEX IF NOT EXISTS kv_file ON kv (file_id);"
+        )
+        self._db.execute("PRAGMA foreign_keys=ON")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "MetadataIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def update(self, files: Iterable[str]) -> Tuple[int, int]:
+        """(Re)index files whose identity changed and drop indexed files that no longer exist.
+
+        Returns (files indexed, files removed). Unreadable or invalid files are skipped.
+        """
+        from .cache import file_identity
+
+        indexed = 0
+        known = {
+            path: (file_id, (dev, ino, size, mtime_ns))
+            for file_id, path, dev, ino, size, mtime_ns in self._db.execute("SELECT * FROM files")
+        }
+        with self._db:
+            for path in files:
+                path = os.path.abspath(path)
+                try:
+                    identity = file_identity(path)
+                except OSError:
+                    continue
+                entry = known.get(path)
+                if entry is not None and entry[1] == identity:
+                    continue
+                try:
+                    rows = self._scalar_rows(path)
+                except (OSError, ValueError):
+                    continue
+                if entry is not None:
+                    self._db.execute("DELETE FROM files WHERE id = ?", (entry[0],))
+                cursor = self._db.execute(
+                    "INSERT INTO files (path, dev, ino, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                    (path, *identity),
+                )
+                self._db.executemany(
+                    "INSERT INTO kv (file_id, key, num, str) VALUES (?, ?, ?, ?)",
+                    ((cursor.lastrowid, key, num, text) for key, num, text in rows),
+                )
+                indexed += 1
+            removed = [(file_id,) for path, (file_id, _) in known.items() if not os.path.exists(path)]
+            self._db.executemany("DELETE FROM files WHERE id = ?", removed)
+        return indexed, len(removed)
+
+    @staticmethod
+    def _scalar_rows(path: str) -> List[Tuple[str, Optional[float], Optional[str]]]:
+        rows = []
+        with GGUFReader(path) as reader:
+            for key, value, _ in reader.iter_metadata():
+                if isinstance(value, (bool, int, float)):
+                    rows.append((key, float(value), None))
+                elif isinstance(value, str):
+                    rows.append((key, None, value))
+                else:
+                    rows.append((key, None, None))
+        return rows
+
+    def _clause_sql(self, clause: Clause) -> Tuple[str, list]:
+        if clause.key.startswith("/") and clause.key.endswith("/") and len(clause.key) > 1:
+            conditions, params = ["REGEXP(?, key)"], [clause.key[1:-1]]
+        elif "*" in clause.key:
+            conditions, params = ["key GLOB ?"], [clause.key]
+        else:
+            conditions, params = ["key = ?"], [clause.key]
+
+        if clause.op == "=~":
+            conditions.append("REGEXP(?, str)")
+            params.append(clause.value)
+        elif clause.op == "contains":
+            conditions.append("instr(str, ?) > 0")
+            params.append(clause.value)
+        elif clause.op == "is":
+            raise ValueError("Type filters (is) are not supported in library queries")
+        elif clause.op is not None:
+            value = clause.value
+            column = "num" if isinstance(value, (bool, int, float)) else "str"
+            conditions.append(f"{column} {_SQL_OPERATORS[clause.op]} ?")
+            params.append(float(value) if column == "num" else value)
+        return "SELECT DISTINCT file_id FROM kv WHERE " + " AND ".join(conditions), params
+
+    def query(self, query: str) -> List[str]:
+        """Return the sorted paths of indexed files matching every clause of query."""
+        clauses = parse_query(query)
+        sql_parts, params = [], []
+        for clause in clauses:
+            sql, clause_params = self._clause_sql(clause)
+            sql_parts.append(sql)
+            params.extend(clause_params)
+        sql = (
+            "SELECT path FROM files WHERE id IN (" + " INTERSECT ".join(sql_parts) + ") ORDER BY path"
+        )
+        return [path for (path,) in self._db.execute(sql, params)]
@@ -0,0 +1,203 @@
+import json
+from typing import Any, Dict, IO, Iterable, Iterator, Optional, Tuple
+from .reader import GGUFArray, GGUFReader, VALUE_TYPE_ARRAY, VALUE_TYPE_STRING
+from .writer import MetadataTransaction, coerce_value, same_value
+from .overlay import Overlay
+from . import profiling
+
+# Array elements are written in slices of this many to keep memory flat
+ARRAY_CHUNK = 4096
+READ_CHUNK = 1 << 20
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def is_ndjson(path: str) -> bool:
+    return path.lower().endswith(('.ndjson', '.jsonl'))
+
+
+def _write_value(out: IO[str], value: Any) -> None:
+    if not isinstance(value, GGUFArray):
+        out.write(_encoder.encode(value))
+        return
+    out.write("[")
+    if value.element_type == VALUE_TYPE_STRING:
+        for i, element in enumerate(value):
+            out.write((", " if i else "") + _encoder.encode(element))
+    else:
+        numbers = value.tolist() if len(value) <= ARRAY_CHUNK else None
+        if numbers is not None:
+            out.write(", ".join(_encoder.encode(n) for n in numbers))
+        else:
+            for start in range(0, len(value), ARRAY_CHUNK):
+                chunk = value[start:start + ARRAY_CHUNK]
+                out.write((", " if start else "") + ", ".join(_encoder.encode(n) for n in chunk))
+    out.write("]")
+
+
+def _write_entry(out: IO[str], key: str, value: Any, value_type: int) -> None:
+    out.write('{"key": ' + _encoder.encode(key) + ', "value": ')
+    _write_value(out, value)
+    out.write(', "value_type": ' + _encoder.encode(str(value_type)) + '}')
+
+
+def export_metadata(file_path: str, export_path: str, overlay: Optional[Overlay] = None, cache=None) -> int:
+    """Stream metadata to JSON (a list of entries) or NDJSON (one entry per line, by extension).
+
+    Entries are written as they are decoded, with any overlay edits merged in; returns
+    the number written. With a MetadataCache, a cached file without arrays (which the
+    cache only summarizes) is exported without being read, and a miss is cached.
+    """
+    cached = cache.get(file_path) if cache is not None else None
+    if cached is not None and any(item["value_type"] == str(VALUE_TYPE_ARRAY) for item in cached):
+        cached = None
+    with profiling.span("export", file=file_path):
+        if cached is not None:
+            items = ((item["key"], item["value"], int(item["value_type"])) for item in cached)
+            return _write_export(export_path, items, overlay)
+        identity = None
+        if cache is not None:
+            from .cache import file_identity
+
+            identity = file_identity(file_path)
+        with GGUFReader(file_path) as reader:
+            items = reader.iter_metadata()
+            if cache is not None:
+                items = list(items)
+                cache.put(file_path, [{"key": key, "value": value, "value_type": str(value_type)}
+                                      for key, value, value_type in items], identity)
+            count = _write_export(export_path, items, overlay)
+            profiling.count("bytes_read", reader.kv_end)
+    return count
+
+
+def _write_export(export_path: str, items: Iterable[Tuple[str, Any, int]], overlay: Optional[Overlay]) -> int:
+    ndjson = is_ndjson(export_path)
+    count = 0
+    with open(export_path, 'w', encoding='utf-8') as out:
+        if not ndjson:
+            out.write("[")
+        if overlay is not None:
+            items = overlay.merge(items)
+        for key, value, value_type in items:
+            if ndjson:
+                _write_entry(out, key, value, value_type)
+                out.write("\n")
+            else:
+                out.write(",\n  " if count else "\n  ")
+                _write_entry(out, key, value, value_type)
+            count += 1
+        if not ndjson:
+            out.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _iter_json_array(f: IO[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the elements of a top-level JSON array, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill(size: int = READ_CHUNK) -> bool:
+        nonlocal buffer, position, eof
+        chunk = f.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def skip_space() -> None:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    skip_space()
+    if buffer[position:position + 1] != "[":
+        raise ValueError("Expected a JSON array of metadata entries")
+    position += 1
+    first = True
+    while True:
+        skip_space()
+        if buffer[position:position + 1] == "]":
+            return
+        if not first:
+            if buffer[position:position + 1] != ",":
+                raise ValueError("Expected ',' between metadata entries")
+            position += 1
+            skip_space()
+        # An entry larger than the buffer is re-parsed after each refill, so grow the
+        # reads geometrically to keep that linear in the entry size
+        size = READ_CHUNK
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                if eof or not fill(size):
+                    raise ValueError("Truncated JSON metadata")
+                size = len(buffer) - position
+        position = end
+        first = False
+        yield item
+
+
+def iter_entries(import_path: str) -> Iterator[Tuple[str, Any, Any]]:
+    """Yield (key, value, value_type) from a JSON or NDJSON export without loading it whole."""
+    with open(import_path, 'r', encoding='utf-8') as f:
+        if is_ndjson(import_path):
+            items = (json.loads(line) for line in f if line.strip())
+        else:
+            items = _iter_json_array(f)
+        for item in items:
+            yield item['key'], item['value'], item['value_type']
+
+
+def import_metadata(file_path: str, import_path: str, slack: int = 0,
+                    overlay: Optional[Overlay] = None) -> Tuple[int, int]:
+    """Make file_path's metadata match an export, touching only the keys that differ.
+
+    Keys missing from the export are removed, as with the backend import. The file is
+    only rewritten when something changed; with an overlay, the differences are
+    recorded there instead. Returns (keys set, keys removed).
+    """
+    with profiling.span("import", file=file_path):
+        return _import_metadata(file_path, import_path, slack, overlay)
+
+
+def _import_metadata(file_path: str, import_path: str, slack: int,
+                     overlay: Optional[Overlay]) -> Tuple[int, int]:
+    transaction = MetadataTransaction(file_path)
+    current = transaction.entries
+    if overlay is not None:
+        merged = overlay.merge((key, value, value_type) for key, (value_type, value) in current.items())
+        current = {key: (value_type, value) for key, value, value_type in merged}
+    seen = set()
+    changed = 0
+    for key, value, value_type in iter_entries(import_path):
+        seen.add(key)
+        new = coerce_value(value, value_type)
+        old = current.get(key)
+        if old is None or not same_value(old, new):
+            if overlay is not None:
+                overlay.edits[key] = new
+            else:
+                transaction.entries[key] = new
+                transaction.dirty = True
+            changed += 1
+    removed = [key for key in current if key not in seen]
+    for key in removed:
+        if overlay is not None:
+            overlay.remove(key)
+        else:
+            transaction.remove(key)
+    if overlay is not None:
+        overlay.save()
+    else:
+        transaction.commit(slack=slack)
+    return changed, len(removed)
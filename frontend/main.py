@@ -3,22 +3,31 @@
 import argparse
 import sys
 import os
-import json
 import logging
-from typing import Dict, Any, Optional
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-from rich.logging import RichHandler
+import signal
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from .cli import CLI
 from .config import Config
-from .utils import validate_gguf_file, load_default_config, save_config
+from .utils import is_bulk_target, validate_gguf_file, load_default_config, save_config
+from .profiling import Profiler, profiling
+from .output import console, set_plain
 
-console = Console()
+if TYPE_CHECKING:
+    from .bulk import FileResult
 
-def setup_logging(debug: bool) -> None:
-    """Set up logging configuration."""
+# Commands that only need some modules (bulk, watch, server, rich for tables) import them when they run,
+# so one-shot calls such as `-s` in a shell loop start quickly.
+
+def setup_logging(debug: bool, plain: bool = False) -> None:
+    """Set up logging once for the whole run; Config only adjusts the level afterwards."""
     log_level = logging.DEBUG if debug else logging.INFO
+    if plain:
+        logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
+        return
+    from rich.logging import RichHandler
+
     logging.basicConfig(
         level=log_level,
         format="%(message)s",
@@ -29,55 +38,143 @@ def setup_logging(debug: bool) -> None:
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="GGUF Metadata Modifier")
-    parser.add_argument("file", nargs="?", help="Path to the GGUF file")
+    parser.add_argument("files", nargs="*", metavar="file",
+                        help="Path to the GGUF file; several paths, directories or glob patterns run in bulk mode")
     parser.add_argument("-C", "--config", action="store_true", help="Edit configuration")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug mode")
-    parser.add_argument("-e", "--export", help="Export metadata to JSON file")
-    parser.add_argument("-i", "--import", dest="import_file", help="Import metadata from JSON file")
-    parser.add_argument("-s", "--search", help="Search for a specific metadata key")
+    parser.add_argument("-e", "--export", help="Export metadata to a JSON (or .ndjson) file")
+    parser.add_argument("-i", "--import", dest="import_file", help="Import metadata from a JSON (or .ndjson) file, applying only changed keys")
+    parser.add_argument("-s", "--search",
+                        help="Search metadata: a word to find in keys, or a query such as "
+                             "\"tokenizer.* is array\" or \"general.name contains llama\"")
+    parser.add_argument("--json", action="store_true", help="Print search results as JSON")
+    parser.add_argument("--plain", action="store_true",
+                        help="Plain text output without colours, progress bars or rich (for scripts)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="Print a checksum of the tensor data only (unaffected by metadata edits)")
+    parser.add_argument("--verify", metavar="CHECKSUM", help="Check the tensor data against an earlier --checksum")
+    parser.add_argument("--stub", metavar="PATH",
+                        help="Write a header-only stub (no tensor data) to PATH, or into directory PATH in bulk mode")
+    parser.add_argument("--replay", metavar="STUB", help="Apply the metadata edits made to STUB onto its full model")
+    parser.add_argument("--output", metavar="PATH", help="With --replay, write the edited model to PATH instead")
+    parser.add_argument("-t", "--tensors", action="store_true", help="Summarize the tensor-info table")
+    parser.add_argument("-q", "--query",
+                        help="Query the library index, e.g. 'general.architecture == llama and *.context_length >= 32768'")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for bulk mode (default: CPU count)")
+    parser.add_argument("-o", "--overlay", action="store_true",
+                        help="Record edits in a sidecar overlay instead of rewriting the model")
+    parser.add_argument("--overlay-dir", metavar="DIR", help="Keep overlay files in DIR (e.g. for read-only models)")
+    parser.add_argument("--compact", action="store_true", help="Fold a model's overlay into the model file")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Keep applying the configuration to new or changed GGUF files under the given directories")
+    parser.add_argument("--once", action="store_true",
+                        help="With --watch, process what is new or changed since the last run, then exit")
+    parser.add_argument("--settle", type=float, default=None, metavar="SECONDS",
+                        help="With --watch, wait until a file has not changed for this long (default: 2 seconds)")
+    parser.add_argument("--serve", nargs="?", const="", metavar="ADDRESS",
+                        help="Serve metadata, search and tensor summaries over HTTP on HOST:PORT or unix:PATH "
+                             "(default: the server_address setting)")
+    parser.add_argument("-n", "--dry-run", action="store_true",
+                        help="Show what applying the configuration would change and write, without writing")
+    parser.add_argument("--profile", action="store_true", help="Time each phase and print a summary table")
+    parser.add_argument("--profile-output", metavar="PATH", help="Write the profile to PATH instead (implies --profile)")
+    parser.add_argument("--profile-format", choices=["json", "chrome"], default="json",
+                        help="Format of the --profile-output file (chrome: trace viewer format)")
     parser.add_argument("--version", action="version", version="%(prog)s 1.0")
     return parser.parse_args()
 
-def load_user_config() -> Dict[str, Any]:
-    """Load user configuration or create default if not exists."""
-    config_path = os.path.expanduser("~/.gguf_modifier_config.json")
-    if not os.path.exists(config_path):
+def load_user_config(config: Config) -> Dict[str, Any]:
+    """The edits from the configuration file Config already parsed, creating a default file if there is none."""
+    if not os.path.exists(config.config_path):
         default_config = load_default_config()
-        save_config(config_path, default_config)
+        save_config(config.config_path, default_config)
         return default_config
-    
-    try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        logging.error("Invalid JSON in config file. Using default settings.")
+    if config.raw is None:
+        # Config has already reported the invalid file
         return load_default_config()
+    return config.raw
 
 def main() -> None:
     args = parse_arguments()
-    setup_logging(args.debug)
+    set_plain(args.plain)
+    setup_logging(args.debug, args.plain)
 
+    if not (args.profile or args.profile_output):
+        run(args)
+        return
+    with profiling() as profiler:
+        try:
+            run(args)
+        finally:
+            report_profile(profiler, args.profile_output, args.profile_format)
+
+def report_profile(profiler: Profiler, path: Optional[str], fmt: str) -> None:
+    """Print the profile as a table, or write it to path."""
+    if path:
+        profiler.write(path, fmt)
+        console.print(f"[green]Profile written to: {path}")
+    else:
+        profiler.print_table()
+
+def run(args: argparse.Namespace) -> None:
+    """Dispatch the parsed command line."""
     config = Config(debug=args.debug)
+    if args.overlay:
+        config.user_config.overlay_mode = True
+    if args.overlay_dir:
+        config.user_config.overlay_dir = args.overlay_dir
     cli = CLI(config)
 
     try:
-        user_config = load_user_config()
-        
+        user_config = load_user_config(config)
+        file = args.files[0] if args.files else None
+
         if args.config:
             edit_config(user_config)
+        elif args.query:
+            for path in cli.query_library(args.files, args.query):
+                console.print(path)
+        elif args.watch:
+            watch(args, config, user_config)
+        elif args.serve is not None:
+            serve(args.serve or config.get_server_address(), config)
+        elif len(args.files) > 1 or (file and is_bulk_target(file)):
+            process_bulk(args, config, user_config)
+        elif args.compact and file:
+            cli.compact(file)
         elif args.export:
-            cli.export_metadata(args.file, args.export)
+            cli.export_metadata(file, args.export)
         elif args.import_file:
-            cli.import_metadata(args.file, args.import_file)
+            cli.import_metadata(file, args.import_file)
         elif args.search:
-            cli.search_metadata(args.file, args.search)
-        elif args.file:
-            process_file(args.file, cli, user_config)
+            cli.display_metadata(cli.search_metadata(file, args.search), as_json=args.json)
+        elif args.checksum and file:
+            cli.checksum(file)
+        elif args.verify and file:
+            if not cli.verify(file, args.verify):
+                sys.exit(1)
+        elif args.stub and file:
+            if not cli.extract_stub(file, args.stub):
+                sys.exit(1)
+        elif args.replay and file:
+            if not cli.replay_stub(file, args.replay, args.output):
+                sys.exit(1)
+        elif args.tensors and file:
+            summary = cli.tensor_summary(file)
+            if summary:
+                cli.display_tensor_summary(summary)
+        elif args.dry_run and file:
+            cli.dry_run(file, user_config)
+        elif file:
+            process_file(file, cli, user_config)
         else:
             show_usage()
     except Exception as e:
         logging.exception("An error occurred:")
         sys.exit(1)
+    finally:
+        # Closes the worker pool and the SQLite caches, which exiting would otherwise leave to the GC
+        cli.close()
 
 def edit_config(user_config: Dict[str, Any]) -> None:
     """Edit user configuration using the default text editor."""
@@ -93,24 +190,152 @@ def edit_config(user_config: Dict[str, Any]) -> None:
 
 def process_file(file_path: str, cli: CLI, user_config: Dict[str, Any]) -> None:
     """Process the GGUF file with the given configuration."""
-    if not validate_gguf_file(file_path):
+    if not validate_gguf_file(file_path, cli.metadata_cache):
         raise ValueError(f"{file_path} is not a valid GGUF file.")
     
     cli.process_file_with_config(file_path, user_config)
 
+def process_bulk(args: argparse.Namespace, config: Config, user_config: Dict[str, Any]) -> None:
+    """Apply the configuration, a search or an export to every GGUF file under the given paths."""
+    if args.import_file:
+        raise ValueError("Import is not supported in bulk mode.")
+    if args.replay:
+        raise ValueError("Replay is not supported in bulk mode.")
+    from .bulk import discover_gguf_files, print_summary, run_bulk
+    from .plan import compile_plan
+    from .shards import first_shards
+
+    files = discover_gguf_files(args.files)
+    if not files:
+        raise ValueError("No GGUF files found.")
+
+    if args.compact:
+        operation, payload = "compact", {"slack": config.get_header_slack()}
+    elif args.checksum:
+        operation, payload = "checksum", {}
+    elif args.stub:
+        os.makedirs(args.stub, exist_ok=True)
+        operation, payload = "stub", {"stub_dir": args.stub}
+    elif args.search:
+        operation, payload = "search", {"search_key": args.search}
+    elif args.export:
+        os.makedirs(args.export, exist_ok=True)
+        operation, payload = "export", {"export_dir": args.export}
+    else:
+        # Compiled and type-checked once here; workers reuse the plan instead of re-validating
+        plan = compile_plan(user_config)
+        if plan.errors:
+            raise ValueError("Invalid config: " + "; ".join(plan.errors))
+        operation = "plan" if args.dry_run else "apply"
+        payload = {"user_config": user_config, "plan": plan, "slack": config.get_header_slack(),
+                   "verify": config.is_tensor_verification_enabled()}
+    if operation in ("apply", "search") and not config.is_overlay_mode():
+        # A split model is edited and searched as one set, through its first shard
+        files = first_shards(files)
+    payload.update(overlay=config.is_overlay_mode(), overlay_dir=config.get_overlay_dir())
+
+    start = time.perf_counter()
+    results = run_bulk(
+        files, operation, payload,
+        workers=args.jobs,
+        max_batch_size=config.get_max_batch_size(),
+        timeout=config.get_timeout(),
+        retry_attempts=config.get_retry_attempts(),
+    )
+    print_summary(results, time.perf_counter() - start, show_results=operation in ("search", "plan", "checksum"))
+
+def watch(args: argparse.Namespace, config: Config, user_config: Dict[str, Any]) -> None:
+    """Apply the configuration to GGUF files under the given directories as they arrive or change."""
+    roots = [path for path in args.files if os.path.isdir(path)]
+    if not roots or len(roots) != len(args.files):
+        raise ValueError("Watch mode needs one or more directories.")
+    from .watch import DEFAULT_SETTLE, Journal, Watcher
+
+    with Journal(config.get_journal_path()) as journal:
+        watcher = Watcher(
+            roots, user_config, journal,
+            workers=args.jobs or 2,
+            settle=DEFAULT_SETTLE if args.settle is None else args.settle,
+            slack=config.get_header_slack(),
+            overlay=config.is_overlay_mode(),
+            overlay_dir=config.get_overlay_dir(),
+            timeout=config.get_timeout(),
+            retry_attempts=config.get_retry_attempts(),
+            verify=config.is_tensor_verification_enabled(),
+        )
+        previous = {sig: signal.signal(sig, lambda signum, frame: watcher.stop())
+                    for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            if not args.once:
+                console.print(f"Watching {', '.join(roots)} (Ctrl-C to stop)")
+            processed = watcher.run(once=args.once, on_result=report_watch_result)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            watcher.close()
+    console.print(f"Processed {processed} file(s).")
+
+def serve(address: str, config: Config) -> None:
+    """Answer metadata lookups over HTTP until interrupted."""
+    from .server import HeaderCache, make_server
+
+    with HeaderCache(config.get_server_cache_entries()) as cache:
+        server = make_server(address, cache)
+        # shutdown() waits for serve_forever() to return, so it cannot run on the serving thread
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        try:
+            console.print(f"Serving GGUF metadata on {address} (Ctrl-C to stop)")
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            server.server_close()
+
+def report_watch_result(result: "FileResult") -> None:
+    if result.ok:
+        console.print(f"[green]{result.path}: {result.result}")
+    else:
+        console.print(f"[red]{result.path}: {result.error}")
+
 def show_usage() -> None:
     """Display usage information."""
+    from rich.panel import Panel
+    from rich.text import Text
+
     usage_text = Text("Usage:", style="bold")
     usage_text.append("\n\nTo edit configuration:")
     usage_text.append("\n  gguf_modifier -C")
     usage_text.append("\n\nTo process a GGUF file:")
     usage_text.append("\n  gguf_modifier <gguf_file_path>")
+    usage_text.append("\n\nTo preview the changes and bytes written, without writing:")
+    usage_text.append("\n  gguf_modifier --dry-run <gguf_file_path_or_dir>")
     usage_text.append("\n\nTo export metadata:")
     usage_text.append("\n  gguf_modifier -e output.json <gguf_file_path>")
     usage_text.append("\n\nTo import metadata:")
     usage_text.append("\n  gguf_modifier -i input.json <gguf_file_path>")
     usage_text.append("\n\nTo search metadata:")
     usage_text.append("\n  gguf_modifier -s key_name <gguf_file_path>")
+    usage_text.append("\n  gguf_modifier -s \"general.architecture == llama and *.context_length >= 4096\" --json <gguf_file_path>")
+    usage_text.append("\n\nTo summarize tensors:")
+    usage_text.append("\n  gguf_modifier -t <gguf_file_path>")
+    usage_text.append("\n\nTo checksum the tensor data, and later check it is unchanged:")
+    usage_text.append("\n  gguf_modifier --checksum <gguf_file_path_or_dir>")
+    usage_text.append("\n  gguf_modifier --verify <checksum> <gguf_file_path>")
+    usage_text.append("\n\nTo edit a header-only stub (no tensor data) and replay the edits onto the model:")
+    usage_text.append("\n  gguf_modifier --stub <stub_path_or_dir> <gguf_file_path_or_dir>")
+    usage_text.append("\n  gguf_modifier --replay <stub_path> [--output <path>] <gguf_file_path>")
+    usage_text.append("\n\nTo find files across a library by metadata:")
+    usage_text.append("\n  gguf_modifier -q \"general.architecture == llama and *.context_length >= 32768\" <dir_or_glob> ...")
+    usage_text.append("\n\nTo process every GGUF file under directories or globs in parallel:")
+    usage_text.append("\n  gguf_modifier [-s key_name | -e export_dir] [-j jobs] <dir_or_glob> ...")
+    usage_text.append("\n\nTo keep applying the configuration to models as they are added or changed:")
+    usage_text.append("\n  gguf_modifier --watch [--once] [--settle seconds] [-j jobs] <dir> ...")
+    usage_text.append("\n\nTo record edits in a sidecar overlay, and later fold it into the model:")
+    usage_text.append("\n  gguf_modifier --overlay [--overlay-dir dir] <gguf_file_path>")
+    usage_text.append("\n  gguf_modifier --compact [--overlay-dir dir] <gguf_file_path>")
+    usage_text.append("\n\nTo see where time goes (table, or a JSON / Chrome trace file):")
+    usage_text.append("\n  gguf_modifier --profile [--profile-output profile.json] [--profile-format chrome] <gguf_file_path>")
     usage_panel = Panel(usage_text, expand=False, border_style="green")
     console.print(usage_panel)
 
@@ -0,0 +1,153 @@
+import sys
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+_Entry = Tuple[int, Any]
+_Edit = Optional[_Entry]
+
+# Compact once this many slots (and over half of them) are holes left by deletes
+_COMPACT_MIN_HOLES = 32
+
+
+class MetadataTable(MutableMapping):
+    """Key -> (value_type, value) in insertion order, like the dict it replaces, but compact.
+
+    Entries live in parallel arrays: interned keys, a byte per value type and the values,
+    with a hash index from key to slot, so get/set/delete are O(1) and iteration follows
+    slot order, which is the order entries are written back in. Deletes leave holes that
+    are compacted away in bulk. snapshot() is O(1): the copy shares the arrays until
+    either side is written to.
+    """
+    __slots__ = ("_keys", "_types", "_values", "_index", "_shared")
+
+    def __init__(self, entries: Union[Mapping[str, _Entry], Iterable[Tuple[str, _Entry]], None] = None):
+        self._keys: list = []
+        self._types = array('B')
+        self._values: list = []
+        self._index: Dict[str, int] = {}
+        self._shared = False
+        if entries is not None:
+            items = entries.items() if isinstance(entries, Mapping) else entries
+            for key, (value_type, value) in items:
+                self[key] = (value_type, value)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, Any, int]]) -> "MetadataTable":
+        """A table of (key, value, value_type) items, as GGUFReader.iter_metadata() yields them."""
+        table = cls()
+        keys, types, values, index = table._keys, table._types, table._values, table._index
+        for key, value, value_type in items:
+            slot = index.get(key)
+            if slot is not None:
+                types[slot], values[slot] = value_type, value
+                continue
+            key = sys.intern(key)
+            index[key] = len(keys)
+            keys.append(key)
+            types.append(value_type)
+            values.append(value)
+        return table
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __getitem__(self, key: str) -> _Entry:
+        slot = self._index[key]
+        return self._types[slot], self._values[slot]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        slot = self._index.get(key)
+        if slot is None:
+            return default
+        return self._types[slot], self._values[slot]
+
+    def __setitem__(self, key: str, entry: _Entry) -> None:
+        value_type, value = entry
+        self._own()
+        slot = self._index.get(key)
+        if slot is None:
+            key = sys.intern(key)
+            self._index[key] = len(self._keys)
+            self._keys.append(key)
+            self._types.append(value_type)
+            self._values.append(value)
+        else:
+            self._types[slot] = value_type
+            self._values[slot] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self._index:
+            raise KeyError(key)
+        self._own()
+        slot = self._index.pop(key)
+        self._keys[slot] = None
+        self._values[slot] = None
+        holes = len(self._keys) - len(self._index)
+        if holes >= _COMPACT_MIN_HOLES and holes * 2 > len(self._keys):
+            self._compact()
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._keys:
+            if key is not None:
+                yield key
+
+    def items(self) -> Iterator[Tuple[str, _Entry]]:
+        for key, value_type, value in zip(self._keys, self._types, self._values):
+            if key is not None:
+                yield key, (value_type, value)
+
+    def iter_entries(self) -> Iterator[Tuple[str, int, Any]]:
+        """(key, value_type, value) in order, as encode_entries takes them."""
+        for key, value_type, value in zip(self._keys, self._types, self._values):
+            if key is not None:
+                yield key, value_type, value
+
+    def __repr__(self) -> str:
+        return f"MetadataTable({len(self)} entries)"
+
+    def snapshot(self) -> "MetadataTable":
+        """An O(1) copy; the arrays are shared until one side is written to."""
+        copy = MetadataTable.__new__(MetadataTable)
+        copy._keys, copy._types, copy._values, copy._index = self._keys, self._types, self._values, self._index
+        copy._shared = self._shared = True
+        return copy
+
+    def diff(self, base: "MetadataTable") -> Dict[str, _Edit]:
+        """The edits that turn base into this table: (value_type, value) to set, or None to remove."""
+        from .writer import same_value
+
+        if self._values is base._values and self._index is base._index:
+            # Neither side has been written to since the snapshot
+            return {}
+        edits: Dict[str, _Edit] = {}
+        for key, value_type, value in self.iter_entries():
+            slot = base._index.get(key)
+            if slot is None:
+                edits[key] = (value_type, value)
+            elif base._values[slot] is not value or base._types[slot] != value_type:
+                if not same_value((base._types[slot], base._values[slot]), (value_type, value)):
+                    edits[key] = (value_type, value)
+        for key in base:
+            if key not in self._index:
+                edits[key] = None
+        return edits
+
+    def _own(self) -> None:
+        # Copy-on-write: take private arrays before the first write after a snapshot
+        if self._shared:
+            self._keys = list(self._keys)
+            self._types = array('B', self._types)
+            self._values = list(self._values)
+            self._index = dict(self._index)
+            self._shared = False
+
+    def _compact(self) -> None:
+        live = [slot for slot, key in enumerate(self._keys) if key is not None]
+        self._keys = [self._keys[slot] for slot in live]
+        self._types = array('B', (self._types[slot] for slot in live))
+        self._values = [self._values[slot] for slot in live]
+        self._index = {key: slot for slot, key in enumerate(self._keys)}
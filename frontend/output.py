@@ -0,0 +1,121 @@
+import json
+import re
+import sys
+from typing import Any, List, Optional, Tuple
+
+# The markup this package writes ([red], [bold green], [/bold]); other brackets are data
+_MARKUP = re.compile(r"\[/?(?:bold|dim|italic|red|green|yellow|cyan|blue|magenta)"
+                     r"(?: (?:red|green|yellow|cyan|blue|magenta))?\]|\[/\]")
+
+_plain = False
+
+
+class PlainTable:
+    """The part of rich's Table this package uses, drawn by PlainConsole as aligned plain text."""
+
+    def __init__(self, title: Optional[str] = None, **kwargs: Any):
+        self.title = title
+        self.columns: List[Tuple[str, str]] = []
+        self.rows: List[List[str]] = []
+
+    def add_column(self, header: str = "", justify: str = "left", **kwargs: Any) -> None:
+        self.columns.append((header, justify))
+
+    def add_row(self, *cells: Any) -> None:
+        self.rows.append([_MARKUP.sub("", str(cell)) for cell in cells])
+
+    def render(self) -> str:
+        rows = [[header for header, _ in self.columns]] + self.rows
+        rows = [row + [""] * (len(self.columns) - len(row)) for row in rows]
+        widths = [max(len(row[i]) for row in rows) for i in range(len(self.columns))]
+        rows.insert(1, ["-" * width for width in widths])
+        lines = [self.title] if self.title else []
+        for row in rows:
+            cells = [cell.rjust(width) if justify == "right" else cell.ljust(width)
+                     for cell, width, (_, justify) in zip(row, widths, self.columns)]
+            lines.append("  ".join(cells).rstrip())
+        return "\n".join(lines)
+
+
+class PlainConsole:
+    """The part of rich's Console this package uses, writing plain text without importing rich."""
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", **kwargs: Any) -> None:
+        if all(isinstance(obj, (str, PlainTable)) for obj in objects):
+            sys.stdout.write(sep.join(obj.render() if isinstance(obj, PlainTable) else _MARKUP.sub("", obj)
+                                      for obj in objects) + end)
+            return
+        # Panels are rich objects already, so rich is loaded anyway; draw them without colour
+        from rich.console import Console
+        Console(color_system=None, highlight=False).print(*objects, sep=sep, end=end, **kwargs)
+
+    def print_json(self, text: Optional[str] = None, *, data: Any = None, indent: int = 2,
+                   default: Any = None, **kwargs: Any) -> None:
+        if text is None:
+            text = json.dumps(data, indent=indent, default=default, ensure_ascii=False)
+        sys.stdout.write(text + "\n")
+
+
+class _LazyConsole:
+    """Stands in for a console, creating it (and importing rich) on first use."""
+
+    def __init__(self):
+        self._console = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._console is None:
+            if _plain:
+                self._console = PlainConsole()
+            else:
+                from rich.console import Console
+                self._console = Console()
+        return getattr(self._console, name)
+
+
+console = _LazyConsole()
+
+
+def set_plain(plain: bool) -> None:
+    """Switch every module's console to plain text output (or back to rich)."""
+    global _plain
+    _plain = plain
+    console._console = None
+
+
+def is_plain() -> bool:
+    return _plain
+
+
+class _NullProgress:
+    """Progress that shows nothing, for plain output."""
+
+    def __enter__(self) -> "_NullProgress":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def add_task(self, description: str, **kwargs: Any) -> int:
+        return 0
+
+    def update(self, task: int, **kwargs: Any) -> None:
+        pass
+
+    def advance(self, task: int, advance: float = 1) -> None:
+        pass
+
+
+def table(title: Optional[str] = None, **kwargs: Any):
+    """A rich Table, or a PlainTable in plain mode."""
+    if _plain:
+        return PlainTable(title, **kwargs)
+    from rich.table import Table
+    return Table(title=title, **kwargs)
+
+
+def progress():
+    """A rich Progress, or one that shows nothing in plain mode."""
+    if _plain:
+        return _NullProgress()
+    from rich.progress import Progress
+    return Progress()
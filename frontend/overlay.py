@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .reader import json_default, read_metadata
+from .writer import MetadataTransaction, coerce_value
+from . import profiling
+
+OVERLAY_SUFFIX = ".overlay.json"
+OVERLAY_FORMAT = "gguf-overlay"
+OVERLAY_VERSION = 1
+
+# None marks a removed key
+_Edit = Optional[Tuple[int, Any]]
+
+
+def overlay_path(model_path: str, overlay_dir: Optional[str] = None) -> str:
+    """Sidecar path for model_path: next to the model, or in overlay_dir (e.g. for read-only mounts)."""
+    if not overlay_dir:
+        return model_path + OVERLAY_SUFFIX
+    # Models from different directories may share a name
+    digest = hashlib.sha1(os.path.abspath(model_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(overlay_dir, f"{os.path.basename(model_path)}.{digest}{OVERLAY_SUFFIX}")
+
+
+class Overlay:
+    """Metadata edits kept in a sidecar file instead of being written into the model.
+
+    Edits are kept in the order they were first made; reads merge them over the
+    model's own metadata and compact() folds them into the model in one rewrite.
+    """
+
+    def __init__(self, model_path: str, overlay_dir: Optional[str] = None):
+        self.model_path = model_path
+        self.path = overlay_path(model_path, overlay_dir)
+        self.edits: Dict[str, _Edit] = {}
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("format") != OVERLAY_FORMAT:
+            raise ValueError(f"{self.path}: Not a metadata overlay")
+        for item in data.get("edits", []):
+            if item.get("removed"):
+                self.edits[item["key"]] = None
+            else:
+                self.edits[item["key"]] = coerce_value(item["value"], item["value_type"])
+
+    def set(self, key: str, value: Any, value_type: Union[str, int]) -> None:
+        self.edits[key] = coerce_value(value, value_type)
+
+    def remove(self, key: str) -> None:
+        self.edits[key] = None
+
+    def save(self) -> None:
+        """Write the sidecar atomically, or delete it when there are no edits."""
+        if not self.edits:
+            self.discard()
+            return
+        edits = [
+            {"key": key, "removed": True} if edit is None
+            else {"key": key, "value": edit[1], "value_type": str(edit[0])}
+            for key, edit in self.edits.items()
+        ]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"format": OVERLAY_FORMAT, "version": OVERLAY_VERSION, "edits": edits}, f,
+                          default=json_default)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def discard(self) -> None:
+        self.edits.clear()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def merge(self, items: Iterable[Tuple[str, Any, int]]) -> Iterator[Tuple[str, Any, int]]:
+        """Overlay (key, value, value_type) items: edited keys keep their place, new keys follow."""
+        pending = dict(self.edits)
+        for key, value, value_type in items:
+            if key in pending:
+                edit = pending.pop(key)
+                if edit is None:
+                    continue
+                value_type, value = edit
+            yield key, value, value_type
+        for key, edit in pending.items():
+            if edit is not None:
+                yield key, edit[1], edit[0]
+
+    def apply(self, metadata: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge the overlay into read_metadata()-style dicts."""
+        if not self.edits:
+            return metadata
+        items = ((item['key'], item['value'], int(item['value_type'])) for item in metadata)
+        return [{"key": key, "value": value, "value_type": str(value_type)} for key, value, value_type in self.merge(items)]
+
+    def compact(self, slack: int = 0) -> bool:
+        """Fold the overlay into the model with a single write and delete the sidecar.
+
+        Returns True if the model changed.
+        """
+        with profiling.span("overlay.compact", file=self.model_path):
+            transaction = MetadataTransaction(self.model_path)
+            for key, edit in self.edits.items():
+                if edit is None:
+                    transaction.remove(key)
+                else:
+                    transaction.set(key, edit[1], edit[0])
+            changed = transaction.commit(slack=slack)
+        self.discard()
+        return changed
+
+
+def read_merged_metadata(model_path: str, overlay_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """read_metadata() with any sidecar edits applied."""
+    return Overlay(model_path, overlay_dir).apply(read_metadata(model_path))
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .metadata import MetadataTable
+from .writer import MetadataTransaction, coerce_value, estimate_write, same_value
+from . import profiling
+
+# Compiled plans kept per process, keyed by config hash
+PLAN_CACHE_SIZE = 128
+
+_Edit = Optional[Tuple[int, Any]]
+_plans: Dict[str, "Plan"] = {}
+
+
+def config_hash(user_config: Dict[str, Any]) -> str:
+    """Stable hash of the edit lists in a user config."""
+    edits = {section: user_config.get(section, [])
+             for section in ("metadata_to_modify", "metadata_to_add", "metadata_to_remove")}
+    return hashlib.sha256(json.dumps(edits, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class Plan:
+    """A user config compiled to one edit per key: (type id, value) to set, or None to remove.
+
+    Later edits to a key replace earlier ones, and removals win over modifications,
+    which matches the order the config lists were applied in.
+    """
+    config_hash: str
+    edits: Dict[str, _Edit] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    requested: int = 0
+
+    def resolve(self, entries: Dict[str, Tuple[int, Any]]) -> Dict[str, _Edit]:
+        """The edits that would change entries; setting a current value or removing a missing key is dropped."""
+        effective = {}
+        for key, edit in self.edits.items():
+            current = entries.get(key)
+            if edit is None:
+                if current is not None:
+                    effective[key] = None
+            elif current is None or not same_value(current, edit):
+                effective[key] = edit
+        return effective
+
+    @staticmethod
+    def apply(target, effective: Dict[str, _Edit], on_step: Optional[Callable[[], None]] = None) -> None:
+        """Stage resolved edits on a MetadataTransaction or Overlay."""
+        for key, edit in effective.items():
+            with profiling.span("apply.remove" if edit is None else "apply.set", key=key):
+                if edit is None:
+                    target.remove(key)
+                else:
+                    target.set(key, edit[1], edit[0])
+            if on_step is not None:
+                on_step()
+
+
+def merge_edits(entries: Dict[str, Tuple[int, Any]], edits: Dict[str, _Edit]) -> Dict[str, Tuple[int, Any]]:
+    """entries with edits (e.g. an overlay's) applied; entries itself is left alone."""
+    if not edits:
+        return entries
+    merged = entries.snapshot() if isinstance(entries, MetadataTable) else MetadataTable(entries)
+    for key, edit in edits.items():
+        if edit is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = edit
+    return merged
+
+
+def _compile(user_config: Dict[str, Any], digest: str) -> Plan:
+    plan = Plan(digest)
+    for item in user_config.get('metadata_to_modify', []) + user_config.get('metadata_to_add', []):
+        plan.requested += 1
+        try:
+            plan.edits[item['key']] = coerce_value(item['value'], item['type'])
+        except KeyError as e:
+            plan.errors.append(f"{item.get('key', '?')}: missing {e}")
+        except (TypeError, ValueError) as e:
+            plan.errors.append(f"{item['key']}: {e}")
+    for key in user_config.get('metadata_to_remove', []):
+        plan.requested += 1
+        plan.edits[key] = None
+    return plan
+
+
+def compile_plan(user_config: Dict[str, Any]) -> Plan:
+    """Compile (or fetch the cached plan for) a user config. Values are type-checked here, once."""
+    digest = config_hash(user_config)
+    plan = _plans.get(digest)
+    if plan is None:
+        with profiling.span("plan.compile"):
+            plan = _compile(user_config, digest)
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            del _plans[next(iter(_plans))]
+        _plans[digest] = plan
+    return plan
+
+
+def estimate(file_path: str, plan: Plan, slack: int = 0, overlay=None) -> Dict[str, Any]:
+    """Dry run: what applying plan to file_path would change and cost, without writing.
+
+    With an overlay, edits already recorded there count as applied and the cost is that
+    of compacting the overlay together with the plan.
+    """
+    transaction = MetadataTransaction(file_path)
+    recorded = overlay.edits if overlay is not None else {}
+    transaction.entries = merge_edits(transaction.entries, recorded)
+    effective = plan.resolve(transaction.entries)
+    plan.apply(transaction, effective)
+    if effective or recorded:
+        in_place, nbytes = estimate_write(file_path, list(transaction.entries.iter_entries()), slack)
+    else:
+        in_place, nbytes = True, 0
+    return {
+        "file": file_path,
+        "config_hash": plan.config_hash,
+        "requested": plan.requested,
+        "planned": len(plan.edits),
+        "sets": sum(1 for edit in effective.values() if edit is not None),
+        "removes": sum(1 for edit in effective.values() if edit is None),
+        "no_ops": len(plan.edits) - len(effective),
+        "errors": list(plan.errors),
+        "in_place": in_place,
+        "bytes_written": nbytes,
+        "file_size": os.path.getsize(file_path),
+        "overlay": overlay.path if overlay is not None else None,
+    }
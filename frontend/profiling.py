@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_NULL_SPAN = nullcontext()
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    seconds: float
+    pid: int
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class Profiler:
+    """Collects timed spans and counters. Hooks are called with each finished Span."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self.hooks: List[Callable[[Span], None]] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[Span], None]) -> None:
+        self.hooks.append(hook)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = Span(name, start - self._origin, time.perf_counter() - start,
+                            os.getpid(), threading.get_ident(), args)
+            with self._lock:
+                self.spans.append(finished)
+            for hook in self.hooks:
+                hook(finished)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """Fold in another profiler's to_json() output, e.g. from a bulk worker process."""
+        with self._lock:
+            self.spans.extend(Span(**span) for span in data.get("spans", []))
+            for name, amount in data.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Per span name: count, total, mean and max seconds."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += span.seconds
+            entry["max"] = max(entry["max"], span.seconds)
+        for entry in totals.values():
+            entry["mean"] = entry["total"] / entry["count"]
+        return totals
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "spans": [asdict(span) for span in self.spans],
+            "counters": dict(self.counters),
+            "totals": self.totals(),
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace Event Format, loadable in chrome://tracing or Perfetto."""
+        events: List[Dict[str, Any]] = [
+            {"name": span.name, "ph": "X", "ts": span.start * 1e6, "dur": span.seconds * 1e6,
+             "pid": span.pid, "tid": span.tid, "args": span.args}
+            for span in self.spans
+        ]
+        end = max((span.start + span.seconds for span in self.spans), default=0.0)
+        events += [
+            {"name": name, "ph": "C", "ts": end * 1e6, "pid": os.getpid(), "args": {name: amount}}
+            for name, amount in self.counters.items()
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, fmt: str = "json") -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace() if fmt == "chrome" else self.to_json(), f, indent=2)
+
+    def print_table(self) -> None:
+        from . import output
+
+        table = output.table("Profile")
+        table.add_column("Span")
+        for column in ("Count", "Total (ms)", "Mean (ms)", "Max (ms)"):
+            table.add_column(column, justify="right")
+        totals = self.totals()
+        for name in sorted(totals, key=lambda name: -totals[name]["total"]):
+            entry = totals[name]
+            table.add_row(name, str(entry["count"]), f"{entry['total'] * 1e3:.2f}",
+                          f"{entry['mean'] * 1e3:.2f}", f"{entry['max'] * 1e3:.2f}")
+        output.console.print(table)
+        if self.counters:
+            counters = output.table("Counters")
+            counters.add_column("Counter")
+            counters.add_column("Value", justify="right")
+            for name, amount in sorted(self.counters.items()):
+                counters.add_row(name, f"{amount:,}")
+            output.console.print(counters)
+
+
+_active: Optional[Profiler] = None
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _active
+
+
+def set_profiler(profiler: Optional[Profiler]) -> Optional[Profiler]:
+    """Install profiler (None disables profiling); returns the previous one."""
+    global _active
+    previous, _active = _active, profiler
+    return previous
+
+
+@contextmanager
+def profiling(profiler: Optional[Profiler] = None) -> Iterator[Profiler]:
+    """Profile the enclosed block, restoring whatever was installed before."""
+    profiler = profiler or Profiler()
+    previous = set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_profiler(previous)
+
+
+def span(name: str, **args: Any):
+    """Time a block when profiling is enabled; costs one global lookup otherwise."""
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name, **args)
+
+
+def count(name: str, amount: int = 1) -> None:
+    if _active is not None:
+        _active.count(name, amount)
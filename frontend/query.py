@@ -0,0 +1,146 @@
+import fnmatch
+import glob
+import operator
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .index import Clause, parse_query
+from .reader import (GGUFReader, VALUE_TYPE_BOOL, VALUE_TYPE_FLOAT, VALUE_TYPE_INT, VALUE_TYPE_STRING,
+                     summarize_value)
+from .shards import ShardSet
+from . import profiling
+
+_COMPARE = {"==": operator.eq, "!=": operator.ne, ">=": operator.ge, "<=": operator.le,
+            ">": operator.gt, "<": operator.lt}
+_NUMERIC_TYPES = (VALUE_TYPE_BOOL, VALUE_TYPE_INT, VALUE_TYPE_FLOAT)
+
+
+class _Matcher:
+    """One compiled clause."""
+
+    def __init__(self, clause: Clause):
+        self.clause = clause
+        key = clause.key
+        self.exact: Optional[str] = None
+        if key.startswith("/") and key.endswith("/") and len(key) > 1:
+            self.key_matches: Callable[[str], bool] = re.compile(key[1:-1]).search
+        elif "*" in key:
+            self.key_matches = lambda k, pattern=key: fnmatch.fnmatchcase(k, pattern)
+        else:
+            self.exact = key
+            self.key_matches = key.__eq__
+        if clause.op == "=~":
+            self._regex = re.compile(clause.value)
+
+    def wants(self, key: str, value_type: int) -> bool:
+        """Whether an entry could match, judged before its value is read."""
+        if not self.key_matches(key):
+            return False
+        return self.clause.op != "is" or value_type == self.clause.value
+
+    def value_matches(self, value: Any, value_type: int) -> bool:
+        op, expected = self.clause.op, self.clause.value
+        if op is None:
+            return True
+        if op == "is":
+            return value_type == expected
+        if op == "=~":
+            return value_type == VALUE_TYPE_STRING and self._regex.search(value) is not None
+        if op == "contains":
+            return value_type == VALUE_TYPE_STRING and expected in value
+        # Same typing as library queries: numbers compare with numbers, strings with strings
+        if isinstance(expected, (bool, int, float)):
+            return value_type in _NUMERIC_TYPES and _COMPARE[op](float(value), float(expected))
+        return value_type == VALUE_TYPE_STRING and _COMPARE[op](value, expected)
+
+
+class MetadataQuery:
+    """A query (see index.parse_query) evaluated while streaming one file's KV section.
+
+    Values of entries no clause can match are skipped by their length prefixes without
+    being decoded, and when every clause names an exact key the scan stops as soon as
+    all of them have been seen.
+    """
+
+    def __init__(self, clauses: List[Clause]):
+        self.clauses = clauses
+        self._matchers = [_Matcher(clause) for clause in clauses]
+        exact = [matcher.exact for matcher in self._matchers]
+        self._exact_keys = None if None in exact else frozenset(exact)
+
+    @classmethod
+    def parse(cls, query: str) -> "MetadataQuery":
+        return cls(parse_query(query))
+
+    @classmethod
+    def for_search(cls, search: str) -> "MetadataQuery":
+        """A query, or for a single plain word the historical key-substring search."""
+        clauses = parse_query(search)
+        if len(clauses) == 1 and clauses[0].op is None and "*" not in search and not search.startswith("/"):
+            clauses = [Clause(f"*{glob.escape(clauses[0].key)}*")]
+        return cls(clauses)
+
+    def _wants(self, key: str, value_type: int) -> bool:
+        return any(matcher.wants(key, value_type) for matcher in self._matchers)
+
+    def filter(self, items: Iterable[Tuple[str, Any, int]]) -> List[Dict[str, Any]]:
+        """Entries of (key, value, value_type) items that satisfy a clause, in order.
+
+        Clauses are ANDed as in matches(): unless every clause is satisfied by some entry,
+        nothing is returned.
+        """
+        found = []
+        satisfied = [False] * len(self._matchers)
+        remaining = set(self._exact_keys) if self._exact_keys is not None else None
+        for key, value, value_type in items:
+            hit = False
+            for i, matcher in enumerate(self._matchers):
+                if matcher.key_matches(key) and matcher.value_matches(value, value_type):
+                    satisfied[i] = hit = True
+            if hit:
+                found.append({"key": key, "value": summarize_value(value), "value_type": str(value_type)})
+            if remaining is not None:
+                remaining.discard(key)
+                if not remaining:
+                    break
+        return found if all(satisfied) else []
+
+    def search(self, file_path: str, overlay=None) -> List[Dict[str, Any]]:
+        """Matching entries of file_path (with the overlay's edits applied), array values summarized."""
+        with profiling.span("query.scan", file=file_path), GGUFReader(file_path) as reader:
+            if overlay is not None and overlay.edits:
+                # Edited values come from the overlay, so every value has to be read to merge
+                return self.filter(overlay.merge(reader.iter_metadata()))
+            return self.filter(reader.iter_metadata(self._wants))
+
+    def matches(self, file_path: str) -> bool:
+        """Whether every clause is satisfied by some entry of file_path."""
+        satisfied = [False] * len(self._matchers)
+        remaining = set(self._exact_keys) if self._exact_keys is not None else None
+        with profiling.span("query.scan", file=file_path), GGUFReader(file_path) as reader:
+            for key, value, value_type in reader.iter_metadata(self._wants):
+                for i, matcher in enumerate(self._matchers):
+                    if not satisfied[i] and matcher.key_matches(key) and matcher.value_matches(value, value_type):
+                        satisfied[i] = True
+                if all(satisfied):
+                    return True
+                if remaining is not None:
+                    remaining.discard(key)
+                    if not remaining:
+                        break
+        return False
+
+
+def search_metadata(file_path: str, search: str, overlay=None, cache=None) -> List[Dict[str, Any]]:
+    """Entries of file_path matching search (a query, or a plain word to match within keys).
+
+    A shard of a split model is searched as its whole set. With a MetadataCache, a file
+    whose identity is cached is answered without reading it, and a miss is cached.
+    """
+    query = MetadataQuery.for_search(search)
+    shards = ShardSet.open(file_path) if overlay is None else None
+    if shards is not None:
+        return query.filter(shards.iter_metadata())
+    if cache is not None:
+        items = ((item["key"], item["value"], int(item["value_type"])) for item in cache.load(file_path))
+        return query.filter(overlay.merge(items) if overlay is not None else items)
+    return query.search(file_path, overlay)
@@ -0,0 +1,379 @@
+import mmap
+import struct
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from . import profiling
+
+GGUF_MAGIC = b"GGUF"
+
+# Value type ids, as written by GGUFFile::save in backend/src/lib.rs
+VALUE_TYPE_NULL = 0
+VALUE_TYPE_BOOL = 1
+VALUE_TYPE_INT = 2
+VALUE_TYPE_FLOAT = 3
+VALUE_TYPE_STRING = 4
+VALUE_TYPE_ARRAY = 5
+
+# Names accepted on the command line (see backend/src/main.rs)
+VALUE_TYPE_NAMES = {
+    "null": VALUE_TYPE_NULL,
+    "bool": VALUE_TYPE_BOOL,
+    "int": VALUE_TYPE_INT,
+    "float": VALUE_TYPE_FLOAT,
+    "string": VALUE_TYPE_STRING,
+    "array": VALUE_TYPE_ARRAY,
+}
+
+# Zero-filled string entry that reserves room in the KV section for in-place edits
+PADDING_KEY = "gguf_modifier.padding"
+# Entries a header-only stub carries about the tensor data it omits (see stub.py); never surfaced as metadata
+STUB_PREFIX = "gguf_modifier.stub."
+ALIGNMENT_KEY = "general.alignment"
+DEFAULT_ALIGNMENT = 32
+
+HEADER = struct.Struct("<4sIQQ")
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# Fixed-size array elements and their memoryview formats
+_ELEMENT_SIZES = {VALUE_TYPE_NULL: 0, VALUE_TYPE_BOOL: 1, VALUE_TYPE_INT: 8, VALUE_TYPE_FLOAT: 8}
+_ELEMENT_FORMATS = {VALUE_TYPE_BOOL: 'B', VALUE_TYPE_INT: 'q', VALUE_TYPE_FLOAT: 'd'}
+
+
+# Bytes taken by the padding entry besides its zero fill
+PADDING_OVERHEAD = _U64.size + len(PADDING_KEY) + _U32.size + _U64.size
+
+
+def align_offset(offset: int, alignment: int) -> int:
+    return offset + (alignment - offset % alignment) % alignment
+
+
+class GGUFArray:
+    """Lazy view of an array value inside a mapped file.
+
+    Only the element type and length are read up front. Numeric elements are served
+    zero-copy from the mapping; strings are decoded one at a time through an offset
+    index built on first access.
+    """
+
+    def __init__(self, buffer: memoryview, element_type: int, count: int, start: int, end: int):
+        self._buffer = buffer
+        self.element_type = element_type
+        self.count = count
+        self.start = start
+        self.end = end
+        self._numbers: Optional[memoryview] = None
+        self._string_offsets: Optional[array] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"<array {type_name(self.element_type)}[{self.count}]>"
+
+    @property
+    def raw(self) -> memoryview:
+        """The encoded elements, exactly as stored in the file."""
+        return self._buffer[self.start:self.end]
+
+    @property
+    def numbers(self) -> memoryview:
+        """Numeric elements as a zero-copy memoryview ('B' for bools, 'q' for ints, 'd' for floats)."""
+        if self.element_type not in _ELEMENT_FORMATS:
+            raise TypeError(f"{self!r} is not numeric")
+        if self._numbers is None:
+            self._numbers = self.raw.cast(_ELEMENT_FORMATS[self.element_type])
+        return self._numbers
+
+    def _string_at(self, i: int) -> str:
+        if self._string_offsets is None:
+            offsets = array('Q')
+            offset = self.start
+            for _ in range(self.count):
+                offsets.append(offset)
+                offset += _U64.size + _U64.unpack_from(self._buffer, offset)[0]
+            self._string_offsets = offsets
+        offset = self._string_offsets[i]
+        (length,) = _U64.unpack_from(self._buffer, offset)
+        return str(self._buffer[offset + _U64.size:offset + _U64.size + length], 'utf-8', 'replace')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("array index out of range")
+        if self.element_type == VALUE_TYPE_STRING:
+            return self._string_at(i)
+        if self.element_type == VALUE_TYPE_NULL:
+            return None
+        value = self.numbers[i]
+        return bool(value) if self.element_type == VALUE_TYPE_BOOL else value
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.element_type == VALUE_TYPE_STRING:
+            offset = self.start
+            for _ in range(self.count):
+                (length,) = _U64.unpack_from(self._buffer, offset)
+                offset += _U64.size
+                yield str(self._buffer[offset:offset + length], 'utf-8', 'replace')
+                offset += length
+        elif self.element_type == VALUE_TYPE_NULL:
+            yield from (None for _ in range(self.count))
+        elif self.element_type == VALUE_TYPE_BOOL:
+            yield from (bool(value) for value in self.numbers)
+        else:
+            yield from self.numbers
+
+    def tolist(self) -> List[Any]:
+        if self.element_type in (VALUE_TYPE_INT, VALUE_TYPE_FLOAT):
+            return self.numbers.tolist()
+        return list(self)
+
+
+def type_name(value_type: int) -> str:
+    for name, type_id in VALUE_TYPE_NAMES.items():
+        if type_id == value_type:
+            return name
+    return str(value_type)
+
+
+def summarize_value(value: Any) -> Any:
+    """JSON-friendly stand-in for a value that never materializes lazy arrays."""
+    if isinstance(value, GGUFArray):
+        return {"element_type": type_name(value.element_type), "length": value.count}
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """json.dump hook that materializes lazy arrays."""
+    if isinstance(value, GGUFArray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class GGUFReader:
+    """Read-only view of a GGUF file, decoded straight from an mmap."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise ValueError(f"{file_path}: Not a valid GGUF file")
+        self._view = memoryview(self._mmap)
+        try:
+            if len(self._view) < HEADER.size:
+                raise ValueError(f"{file_path}: Not a valid GGUF file")
+            magic, self.version, self.tensor_count, self.metadata_count = HEADER.unpack_from(self._view, 0)
+            if magic != GGUF_MAGIC:
+                raise ValueError(f"{file_path}: Not a valid GGUF file")
+        except ValueError:
+            self.close()
+            raise
+        self._kv_end: Optional[int] = None
+        self._tensor_info_end: Optional[int] = None
+        self.alignment = DEFAULT_ALIGNMENT
+        self.padding_size = 0
+        # (key, value_type, value) of the stub entries, in file order; empty for a full model
+        self.stub_entries: List[Tuple[str, int, Any]] = []
+        self._tensors = None
+        # Separate view handed to lazy arrays so they outlive close()
+        self._array_view: Optional[memoryview] = None
+
+    def __enter__(self) -> "GGUFReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+            self._array_view = None
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Lazy arrays still point into the mapping; it is unmapped once they are gone
+                pass
+            self._file.close()
+
+    @property
+    def size(self) -> int:
+        return len(self._view)
+
+    @property
+    def buffer(self) -> memoryview:
+        return self._view
+
+    @property
+    def tensors(self):
+        """Tensor-info table (a TensorTable), parsed on first access."""
+        if self._tensors is None:
+            from .tensors import TensorTable
+            self._tensors = TensorTable.from_reader(self)
+        return self._tensors
+
+    @property
+    def stub(self) -> Dict[str, Any]:
+        """What a header-only stub records about its tensor data ({} for a full model)."""
+        self.kv_end
+        return {key[len(STUB_PREFIX):]: value for key, _, value in self.stub_entries}
+
+    @property
+    def kv_end(self) -> int:
+        """Offset of the first byte after the KV section."""
+        if self._kv_end is None:
+            for _ in self.iter_metadata(lambda key, value_type: False):
+                pass
+        return self._kv_end
+
+    @property
+    def tensor_info_end(self) -> int:
+        """Offset of the first byte after the tensor-info table."""
+        if self._tensor_info_end is None:
+            offset = self.kv_end
+            try:
+                for _ in range(self.tensor_count):
+                    (name_length,) = _U64.unpack_from(self._view, offset)
+                    offset += _U64.size + name_length
+                    (n_dims,) = _U32.unpack_from(self._view, offset)
+                    # dims, then the ggml type and the data offset
+                    offset += _U32.size + n_dims * _U64.size + _U32.size + _U64.size
+                    if offset > len(self._view):
+                        raise struct.error
+            except struct.error:
+                raise ValueError(f"{self.file_path}: Truncated tensor info")
+            self._tensor_info_end = offset
+        return self._tensor_info_end
+
+    @property
+    def data_offset(self) -> int:
+        """Offset of the tensor data region; files without tensors have no alignment padding."""
+        if not self.tensor_count:
+            return self.tensor_info_end
+        return align_offset(self.tensor_info_end, self.alignment)
+
+    def _read_string(self, offset: int) -> Tuple[str, int]:
+        (length,) = _U64.unpack_from(self._view, offset)
+        start = offset + _U64.size
+        end = start + length
+        if end > len(self._view):
+            raise ValueError(f"{self.file_path}: Truncated GGUF header")
+        return str(self._view[start:end], 'utf-8', 'replace'), end
+
+    def _read_value(self, value_type: int, offset: int) -> Tuple[Any, int]:
+        view = self._view
+        if value_type == VALUE_TYPE_NULL:
+            return None, offset
+        if value_type == VALUE_TYPE_BOOL:
+            return _U8.unpack_from(view, offset)[0] != 0, offset + _U8.size
+        if value_type == VALUE_TYPE_INT:
+            return _I64.unpack_from(view, offset)[0], offset + _I64.size
+        if value_type == VALUE_TYPE_FLOAT:
+            return _F64.unpack_from(view, offset)[0], offset + _F64.size
+        if value_type == VALUE_TYPE_STRING:
+            return self._read_string(offset)
+        if value_type == VALUE_TYPE_ARRAY:
+            return self._read_array(offset)
+        raise ValueError(f"{self.file_path}: Unknown value type {value_type}")
+
+    def _read_array(self, offset: int) -> Tuple[GGUFArray, int]:
+        view = self._view
+        (element_type,) = _U32.unpack_from(view, offset)
+        (count,) = _U64.unpack_from(view, offset + _U32.size)
+        start = offset + _U32.size + _U64.size
+        if element_type in _ELEMENT_SIZES:
+            end = start + count * _ELEMENT_SIZES[element_type]
+        elif element_type == VALUE_TYPE_STRING:
+            # Walk the length prefixes without decoding anything
+            end = start
+            for _ in range(count):
+                end += _U64.size + _U64.unpack_from(view, end)[0]
+        else:
+            raise ValueError(f"{self.file_path}: Unsupported array element type {element_type}")
+        if end > len(view):
+            raise ValueError(f"{self.file_path}: Truncated GGUF header")
+        if self._array_view is None:
+            self._array_view = memoryview(self._mmap)
+        return GGUFArray(self._array_view, element_type, count, start, end), end
+
+    def _skip_value(self, value_type: int, offset: int) -> int:
+        """Offset just past a value, found from its length prefixes without decoding it."""
+        if value_type in _ELEMENT_SIZES:
+            return offset + _ELEMENT_SIZES[value_type]
+        if value_type == VALUE_TYPE_STRING:
+            end = offset + _U64.size + _U64.unpack_from(self._view, offset)[0]
+        elif value_type == VALUE_TYPE_ARRAY:
+            (element_type,) = _U32.unpack_from(self._view, offset)
+            (count,) = _U64.unpack_from(self._view, offset + _U32.size)
+            end = offset + _U32.size + _U64.size
+            if element_type in _ELEMENT_SIZES:
+                end += count * _ELEMENT_SIZES[element_type]
+            elif element_type == VALUE_TYPE_STRING:
+                for _ in range(count):
+                    end += _U64.size + _U64.unpack_from(self._view, end)[0]
+            else:
+                raise ValueError(f"{self.file_path}: Unsupported array element type {element_type}")
+        else:
+            raise ValueError(f"{self.file_path}: Unknown value type {value_type}")
+        if end > len(self._view):
+            raise ValueError(f"{self.file_path}: Truncated GGUF header")
+        return end
+
+    def iter_metadata(self, decode: Optional[Callable[[str, int], bool]] = None) -> Iterator[Tuple[str, Any, int]]:
+        """Yield (key, value, value_type) for every KV entry in file order.
+
+        With decode, only values for which decode(key, value_type) is true are read; the
+        rest are stepped over by their length prefixes and yielded as None.
+        """
+        offset = HEADER.size
+        stub_entries = []
+        try:
+            for _ in range(self.metadata_count):
+                key, offset = self._read_string(offset)
+                (value_type,) = _U32.unpack_from(self._view, offset)
+                offset += _U32.size
+                if key == PADDING_KEY and value_type == VALUE_TYPE_STRING:
+                    (fill,) = _U64.unpack_from(self._view, offset)
+                    offset += _U64.size + fill
+                    self.padding_size = PADDING_OVERHEAD + fill
+                    continue
+                if key.startswith(STUB_PREFIX):
+                    value, offset = self._read_value(value_type, offset)
+                    stub_entries.append((key, value_type, value))
+                    continue
+                if decode is not None and key != ALIGNMENT_KEY and not decode(key, value_type):
+                    offset = self._skip_value(value_type, offset)
+                    yield key, None, value_type
+                    continue
+                value, offset = self._read_value(value_type, offset)
+                if key == ALIGNMENT_KEY and value_type == VALUE_TYPE_INT and value > 0:
+                    self.alignment = value
+                yield key, value, value_type
+        except struct.error:
+            raise ValueError(f"{self.file_path}: Truncated GGUF header")
+        self._kv_end = offset
+        self.stub_entries = stub_entries
+
+    def metadata(self) -> List[Dict[str, Any]]:
+        """Return the metadata in the same shape the backend exports to JSON."""
+        return [
+            {"key": key, "value": value, "value_type": str(value_type)}
+            for key, value, value_type in self.iter_metadata()
+        ]
+
+
+def read_metadata(file_path: str) -> List[Dict[str, Any]]:
+    with profiling.span("header.parse", file=file_path), GGUFReader(file_path) as reader:
+        metadata = reader.metadata()
+        profiling.count("bytes_read", reader.kv_end)
+        return metadata
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import re
+import socket
+import socketserver
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from .cache import file_identity
+from .query import MetadataQuery
+from .reader import GGUFReader, json_default, summarize_value
+from .shards import ShardSet, shard_paths
+from . import profiling
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+DEFAULT_CACHE_ENTRIES = 256
+
+# One identity per file the header was parsed from (every shard of a split model)
+_Identity = Tuple[Tuple[int, int, int, int], ...]
+
+
+@dataclass
+class Header:
+    """A parsed header: merged metadata items and the tensor summary."""
+    identity: _Identity
+    items: List[Tuple[str, Any, int]]
+    tensor_summary: Dict[str, object]
+
+    def metadata(self, full: bool = False) -> List[Dict[str, Any]]:
+        """Entries in read_metadata() shape; arrays are summarized unless full."""
+        return [{"key": key, "value": value if full else summarize_value(value), "value_type": str(value_type)}
+                for key, value, value_type in self.items]
+
+
+def _identity(file_path: str) -> _Identity:
+    return tuple(file_identity(path) for path in shard_paths(file_path) or [file_path])
+
+
+def _parse(file_path: str, identity: _Identity) -> Header:
+    with profiling.span("server.parse", file=file_path):
+        shards = ShardSet.open(file_path)
+        if shards is not None:
+            return Header(identity, list(shards.iter_metadata()), shards.tensor_summary())
+        # Array values stay lazy; they keep the file mapped for as long as the header is cached
+        with GGUFReader(file_path) as reader:
+            return Header(identity, list(reader.iter_metadata()), reader.tensors.summary())
+
+
+class HeaderCache:
+    """In-memory LRU of parsed headers, valid for as long as the file's stat identity is unchanged.
+
+    Cold parses run on a thread pool, and concurrent lookups of a file that is already
+    being parsed wait for that parse instead of starting another.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, workers: Optional[int] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Header]" = OrderedDict()
+        self._pending: Dict[str, Tuple[_Identity, Future]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="header-parse")
+        self.hits = self.misses = self.coalesced = 0
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._entries.clear()
+
+    def __enter__(self) -> "HeaderCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, file_path: str) -> Header:
+        """The parsed header of file_path (or of its whole set if it is a shard)."""
+        path = os.path.abspath(file_path)
+        identity = _identity(path)
+        with self._lock:
+            header = self._entries.get(path)
+            if header is not None and header.identity == identity:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                profiling.count("header_cache_hits")
+                return header
+            pending = self._pending.get(path)
+            if pending is not None and pending[0] == identity:
+                self.coalesced += 1
+                future = pending[1]
+            else:
+                self.misses += 1
+                future = self._executor.submit(self._load, path, identity)
+                self._pending[path] = (identity, future)
+        return future.result()
+
+    def _load(self, path: str, identity: _Identity) -> Header:
+        try:
+            header = _parse(path, identity)
+        except BaseException:
+            with self._lock:
+                self._forget_pending(path, identity)
+            raise
+        # A file rewritten during the parse is served once but not cached
+        try:
+            unchanged = _identity(path) == identity
+        except (OSError, ValueError):
+            unchanged = False
+        with self._lock:
+            self._forget_pending(path, identity)
+            if unchanged:
+                self._entries[path] = header
+                self._entries.move_to_end(path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return header
+
+    def _forget_pending(self, path: str, identity: _Identity) -> None:
+        pending = self._pending.get(path)
+        if pending is not None and pending[0] == identity:
+            del self._pending[path]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+def _search(cache: HeaderCache, params: Dict[str, str]) -> Any:
+    return MetadataQuery.for_search(_param(params, "q")).filter(cache.get(_param(params, "path")).items)
+
+
+def _metadata(cache: HeaderCache, params: Dict[str, str]) -> Any:
+    return cache.get(_param(params, "path")).metadata(full=params.get("full") in ("1", "true"))
+
+
+def _tensors(cache: HeaderCache, params: Dict[str, str]) -> Any:
+    return cache.get(_param(params, "path")).tensor_summary
+
+
+ROUTES = {
+    "/health": lambda cache, params: {"ok": True},
+    "/stats": lambda cache, params: cache.stats(),
+    "/metadata": _metadata,
+    "/search": _search,
+    "/tensors": _tensors,
+}
+
+
+def _param(params: Dict[str, str], name: str) -> str:
+    value = params.get(name)
+    if not value:
+        raise KeyError(name)
+    return value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so a gateway can reuse one connection for many lookups
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            return self._reply(404, {"error": f"Unknown endpoint: {url.path}"})
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            with profiling.span("server.request", endpoint=url.path):
+                result = route(self.server.cache, params)
+        except KeyError as e:
+            return self._reply(400, {"error": f"Missing parameter: {e.args[0]}"})
+        except FileNotFoundError as e:
+            return self._reply(404, {"error": str(e)})
+        except (ValueError, re.error) as e:
+            return self._reply(400, {"error": str(e)})
+        except OSError as e:
+            return self._reply(500, {"error": str(e)})
+        self._reply(200, result)
+
+    def _reply(self, status: int, body: Any) -> None:
+        data = json.dumps(body, default=json_default, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+class _TCPServer(ThreadingHTTPServer):
+    def __init__(self, address: Tuple[str, int], cache: HeaderCache):
+        super().__init__(address, _Handler)
+        self.cache = cache
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, cache: HeaderCache):
+        # Replace a socket left behind by a previous run, but never any other file
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        super().__init__(path, _Handler)
+        self.cache = cache
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """(socket family, address) for "unix:PATH", a path containing "/", "HOST:PORT" or "PORT"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if "/" in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    try:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise ValueError(f"Invalid server address: {address!r}") from None
+
+
+def make_server(address: str, cache: HeaderCache) -> socketserver.BaseServer:
+    """An HTTP server for the metadata endpoints, on a Unix socket or a TCP address.
+
+    GET /metadata?path=P[&full=1], /search?path=P&q=QUERY, /tensors?path=P, /stats and /health
+    all answer with JSON.
+    """
+    family, bound = parse_address(address)
+    if family == socket.AF_UNIX:
+        return _UnixServer(bound, cache)
+    return _TCPServer(bound, cache)
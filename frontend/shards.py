@@ -0,0 +1,249 @@
+import heapq
+import os
+import re
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .reader import GGUFReader
+from .writer import MetadataTransaction, discard_journal, estimate_write, recover, write_metadata
+from . import profiling
+
+if TYPE_CHECKING:
+    from .plan import Plan
+
+# llama.cpp's gguf-split naming: <prefix>-00001-of-00005.gguf
+SHARD_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<index>\d{5})-of-(?P<count>\d{5})\.gguf$", re.IGNORECASE)
+# Keys describing the split itself; they differ per shard and are never edited as model metadata
+SPLIT_PREFIX = "split."
+# Hard link to a shard's original while its rewrite is being renamed into place
+BACKUP_SUFFIX = ".orig"
+
+
+def shard_paths(file_path: str) -> Optional[List[str]]:
+    """Every shard of the set file_path belongs to, in order; None if it is not named as a shard.
+
+    Raises ValueError if any shard is missing.
+    """
+    match = SHARD_PATTERN.match(file_path)
+    if match is None:
+        return None
+    count = int(match.group('count'))
+    if count < 1 or not 1 <= int(match.group('index')) <= count:
+        raise ValueError(f"{file_path}: Invalid shard name")
+    suffix = file_path[match.end('count'):]
+    paths = [f"{match.group('prefix')}-{i:05d}-of-{count:05d}{suffix}" for i in range(1, count + 1)]
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing:
+        raise ValueError(f"{file_path}: Missing shard(s): {', '.join(missing)}")
+    return paths
+
+
+def first_shard(path: str) -> str:
+    """The first shard of the set path belongs to (by name), or path itself if it is not a shard."""
+    match = SHARD_PATTERN.match(path)
+    if match is None or int(match.group('index')) == 1:
+        return path
+    return f"{match.group('prefix')}-{1:05d}-of-{match.group('count')}{path[match.end('count'):]}"
+
+
+def first_shards(files: List[str]) -> List[str]:
+    """files with every shard set reduced to its first shard, so sets are handled once."""
+    kept = []
+    for path in files:
+        first = first_shard(path)
+        if first != path and first in files:
+            continue
+        kept.append(path)
+    return kept
+
+
+def tensor_summary(file_path: str) -> Dict[str, object]:
+    """TensorTable.summary() of file_path, or of its whole set if it is a shard."""
+    shards = ShardSet.open(file_path)
+    if shards is not None:
+        return shards.tensor_summary()
+    with GGUFReader(file_path) as reader:
+        return reader.tensors.summary()
+
+
+def _read_shard(path: str) -> Tuple[List[Tuple[str, Any, int]], Dict[str, object]]:
+    with profiling.span("header.parse", file=path), GGUFReader(path) as reader:
+        return list(reader.iter_metadata()), reader.tensors.summary()
+
+
+class ShardSet:
+    """The shards of a split model, treated as one model.
+
+    Headers are read concurrently. Merged metadata takes each key from the first shard
+    that has it; edits go to every shard that carries the key (new keys go to the first
+    shard), and only the headers that change are rewritten, in parallel.
+    """
+
+    def __init__(self, paths: List[str], workers: Optional[int] = None):
+        self.paths = paths
+        self.workers = workers or min(len(paths), 32)
+        self._metadata: Optional[List[List[Tuple[str, Any, int]]]] = None
+        self._summaries: Optional[List[Dict[str, object]]] = None
+
+    @classmethod
+    def open(cls, file_path: str) -> Optional["ShardSet"]:
+        """The set file_path belongs to, or None if it is a plain file."""
+        paths = shard_paths(file_path)
+        return cls(paths) if paths is not None else None
+
+    def _map(self, func, items):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(func, items))
+
+    def _read(self) -> None:
+        if self._metadata is None:
+            with profiling.span("shards.read", shards=len(self.paths)):
+                shards = self._map(_read_shard, self.paths)
+            self._metadata = [metadata for metadata, _ in shards]
+            self._summaries = [summary for _, summary in shards]
+
+    def iter_metadata(self) -> Iterator[Tuple[str, Any, int]]:
+        """Merged (key, value, value_type) entries: each key once, from the first shard carrying it."""
+        self._read()
+        seen = set()
+        for metadata in self._metadata:
+            for key, value, value_type in metadata:
+                if key not in seen:
+                    seen.add(key)
+                    yield key, value, value_type
+
+    def metadata(self) -> List[Dict[str, Any]]:
+        """Merged metadata in read_metadata() shape."""
+        return [{"key": key, "value": value, "value_type": str(value_type)}
+                for key, value, value_type in self.iter_metadata()]
+
+    def carriers(self, key: str) -> List[str]:
+        """Paths of the shards that carry key."""
+        self._read()
+        return [path for path, metadata in zip(self.paths, self._metadata)
+                if any(item[0] == key for item in metadata)]
+
+    def tensor_summary(self) -> Dict[str, object]:
+        """TensorTable.summary() over every shard's tensors."""
+        self._read()
+        summaries = self._summaries
+        bytes_by_dtype: Dict[str, int] = {}
+        for summary in summaries:
+            for dtype, size in summary['bytes_by_dtype'].items():
+                bytes_by_dtype[dtype] = bytes_by_dtype.get(dtype, 0) + size
+        return {
+            "tensor_count": sum(summary['tensor_count'] for summary in summaries),
+            "parameter_count": sum(summary['parameter_count'] for summary in summaries),
+            "total_bytes": sum(summary['total_bytes'] for summary in summaries),
+            "bytes_by_dtype": dict(sorted(bytes_by_dtype.items(), key=lambda item: -item[1])),
+            "largest": heapq.nlargest(5, (info for summary in summaries for info in summary['largest']),
+                                      key=lambda info: info['nbytes']),
+            "problems": [f"{os.path.basename(path)}: {problem}"
+                         for path, summary in zip(self.paths, summaries) for problem in summary['problems']],
+            "shard_count": len(self.paths),
+        }
+
+    def apply(self, user_config: Dict[str, Any], slack: int = 0, verify: bool = False,
+              plan: Optional["Plan"] = None) -> List[str]:
+        """Apply a user config across the set in one batch; returns the shards that were rewritten.
+
+        Every shard is loaded and its edits resolved before any is written. Shards whose
+        edits fit their header are patched in place with a journal; the others are rewritten
+        to temp files next to them first, which are renamed into place last. Until every
+        shard is written, a failure rolls all of them back, so an invalid config, unreadable
+        shard or failed write leaves the whole set untouched.
+        """
+        from .plan import Plan, compile_plan
+
+        plan = plan or compile_plan(user_config)
+        if plan.errors:
+            raise ValueError("Invalid config: " + "; ".join(plan.errors))
+        split_keys = [key for key in plan.edits if key.startswith(SPLIT_PREFIX)]
+        if split_keys:
+            raise ValueError(f"{', '.join(split_keys)}: split.* keys describe the shard layout and cannot be edited")
+
+        with profiling.span("shards.apply", shards=len(self.paths)):
+            transactions = self._map(MetadataTransaction, self.paths)
+            edits: List[Dict[str, Any]] = [{} for _ in self.paths]
+            for key, edit in plan.edits.items():
+                carriers = [i for i, transaction in enumerate(transactions) if key in transaction.entries]
+                for i in carriers or ([0] if edit is not None else []):
+                    edits[i][key] = edit
+            for transaction, shard_edits in zip(transactions, edits):
+                shard_plan = Plan(plan.config_hash, shard_edits)
+                shard_plan.apply(transaction, shard_plan.resolve(transaction.entries))
+
+            dirty = [(path, list(transaction.entries.iter_entries()))
+                     for path, transaction in zip(self.paths, transactions) if transaction.dirty]
+            # A header patch leaves the tensor data where it is, so only rewrites are verified
+            fits = [estimate_write(path, entries, slack)[0] for path, entries in dirty]
+            in_place = [item for item, fit in zip(dirty, fits) if fit]
+            rewrites = [item for item, fit in zip(dirty, fits) if not fit]
+            staged = self._map(lambda item: self._stage(*item, slack, verify), rewrites)
+            failures = [f"{os.path.basename(path)}: {error}"
+                        for (path, _), (_, error) in zip(rewrites, staged) if error]
+            if failures:
+                self._discard(temp_path for temp_path, _ in staged if temp_path is not None)
+                raise RuntimeError("Failed to update shard(s): " + "; ".join(failures))
+            self._commit(in_place, [(path, temp_path) for (path, _), (temp_path, _) in zip(rewrites, staged)], slack)
+        self._metadata = self._summaries = None
+        return [path for path, _ in dirty]
+
+    def _commit(self, in_place: List[Tuple[str, List[Tuple[str, int, Any]]]],
+                staged: List[Tuple[str, str]], slack: int) -> None:
+        # Patches keep their journals and replaced shards a hard link to the original
+        # until the whole set is written, so any failure can put every shard back
+        patched: List[str] = []
+        backups: List[str] = []
+        replaced: List[Tuple[str, str]] = []
+        try:
+            for path, entries in in_place:
+                patched.append(path)
+                if not write_metadata(path, entries, slack=slack, keep_journal=True):
+                    # Rewritten after all (the file changed since the estimate): nothing to journal
+                    patched.pop()
+            for path, temp_path in staged:
+                backup = path + BACKUP_SUFFIX
+                self._discard([backup])
+                os.link(path, backup)
+                backups.append(backup)
+                os.replace(temp_path, path)
+                replaced.append((path, backup))
+        except (OSError, ValueError, RuntimeError) as e:
+            for path in patched:
+                recover(path)
+            for path, backup in replaced:
+                os.replace(backup, path)
+            # Whatever was not renamed back or into place is left over
+            self._discard(backups + [temp_path for _, temp_path in staged])
+            raise RuntimeError(f"Failed to update shard(s): {e}") from e
+        for path in patched:
+            discard_journal(path)
+        self._discard(backups)
+
+    @staticmethod
+    def _discard(paths: Iterable[str]) -> None:
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _stage(path: str, entries: List[Tuple[str, int, Any]], slack: int,
+               verify: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Write the shard's edited copy to a temp file; returns (temp path, None) or (None, error)."""
+        # Errors are collected rather than raised so the other shards' temp files can be cleaned up
+        from .checksum import check_unchanged, tensor_checksum
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".gguf.tmp")
+        os.close(fd)
+        try:
+            write_metadata(path, entries, slack=slack, output_path=temp_path)
+            if verify:
+                check_unchanged(tensor_checksum(path), tensor_checksum(temp_path))
+        except (OSError, ValueError, RuntimeError) as e:
+            os.unlink(temp_path)
+            return None, str(e)
+        return temp_path, None
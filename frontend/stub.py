@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import astuple, dataclass, fields
+from typing import Any, Iterable, List, Optional, Tuple
+from .checksum import DEFAULT_CHUNK_SIZE, TensorChecksum, tensor_checksum
+from .metadata import MetadataTable
+from .reader import (GGUFReader, GGUF_MAGIC, HEADER, STUB_PREFIX, VALUE_TYPE_INT, VALUE_TYPE_STRING,
+                     align_offset)
+from .writer import MetadataTransaction, encode_entries, write_metadata
+from . import profiling
+
+
+@dataclass
+class StubInfo:
+    """What a header-only stub records about the model it was extracted from."""
+    data_size: int
+    checksum: str
+    chunk_size: int
+    metadata_digest: str
+    source_size: int
+
+    def entries(self) -> List[Tuple[str, int, Any]]:
+        return [(STUB_PREFIX + field.name, VALUE_TYPE_INT if field.type is int else VALUE_TYPE_STRING, value)
+                for field, value in zip(fields(self), astuple(self))]
+
+
+def metadata_digest(entries: Iterable[Tuple[str, int, Any]]) -> str:
+    """sha256 of (key, value_type, value) entries as encoded in the KV section, in order."""
+    return hashlib.sha256(encode_entries(entries)).hexdigest()
+
+
+def read_stub(file_path: str) -> Optional[StubInfo]:
+    """The stub record of file_path, or None if it is a full model."""
+    with GGUFReader(file_path) as reader:
+        stub = reader.stub
+    return StubInfo(**stub) if stub else None
+
+
+def extract_stub(model_path: str, stub_path: str, checksum: Optional[TensorChecksum] = None) -> StubInfo:
+    """Write a header-only stub of model_path: its KV section and tensor-info table, without the data.
+
+    The stub ends at the data offset and records the size and checksum of the data it
+    omits (checksum is computed unless given) plus a digest of the metadata, so edits made
+    to it can later be replayed onto the model with replay_stub.
+    """
+    if os.path.exists(stub_path) and os.path.samefile(model_path, stub_path):
+        raise ValueError(f"{stub_path}: A stub cannot replace its own model")
+    checksum = checksum or tensor_checksum(model_path, DEFAULT_CHUNK_SIZE)
+    with profiling.span("stub.extract", file=model_path), GGUFReader(model_path) as reader:
+        if reader.stub:
+            raise ValueError(f"{model_path}: Already a header-only stub")
+        entries = [(key, value_type, value) for key, value, value_type in reader.iter_metadata()]
+        if (checksum.data_offset, checksum.data_size) != (reader.data_offset, reader.size - reader.data_offset):
+            raise RuntimeError(f"{model_path}: The file changed while the stub was being extracted")
+        info = StubInfo(checksum.data_size, checksum.root, checksum.chunk_size, metadata_digest(entries), reader.size)
+        header = (HEADER.pack(GGUF_MAGIC, reader.version, reader.tensor_count, len(entries) + len(info.entries()))
+                  + encode_entries(entries + info.entries())
+                  + bytes(reader.buffer[reader.kv_end:reader.tensor_info_end]))
+        if reader.tensor_count:
+            # Keep the data offset aligned, as it is in the model
+            header += b"\0" * (align_offset(len(header), reader.alignment) - len(header))
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(stub_path)), suffix=".gguf.tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+        shutil.copymode(model_path, temp_path)
+        os.replace(temp_path, stub_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    profiling.count("bytes_written", len(header))
+    return info
+
+
+def replay_stub(stub_path: str, model_path: str, slack: int = 0, output_path: Optional[str] = None,
+                checksum: Optional[TensorChecksum] = None) -> bool:
+    """Make model_path's metadata match the (edited) stub in one pass; returns True if anything was written.
+
+    The model must still be the one the stub was extracted from: same tensor-info table and
+    data size, and metadata that is either unchanged since extraction or already matches
+    the stub. With checksum (the model's tensor checksum) the data is checked as well.
+    With output_path the model is left untouched and the edited copy is streamed there.
+    """
+    with profiling.span("stub.replay", file=model_path):
+        with GGUFReader(stub_path) as reader:
+            stub = reader.stub
+            if not stub:
+                raise ValueError(f"{stub_path}: Not a header-only stub")
+            edited = [(key, value_type, value) for key, value, value_type in reader.iter_metadata()]
+            tensor_info = bytes(reader.buffer[reader.kv_end:reader.tensor_info_end])
+        info = StubInfo(**stub)
+        with GGUFReader(model_path) as reader:
+            if reader.stub:
+                raise ValueError(f"{model_path}: Edits replay onto a full model, not a stub")
+            if (bytes(reader.buffer[reader.kv_end:reader.tensor_info_end]) != tensor_info
+                    or reader.size - reader.data_offset != info.data_size):
+                raise ValueError(f"{model_path}: Not the model {stub_path} was extracted from")
+        if checksum is not None and checksum.root != info.checksum:
+            raise ValueError(f"{model_path}: Tensor data does not match {stub_path}")
+
+        transaction = MetadataTransaction(model_path)
+        if metadata_digest(transaction.entries.iter_entries()) not in (info.metadata_digest, metadata_digest(edited)):
+            raise ValueError(f"{model_path}: Metadata changed since {stub_path} was extracted")
+        target = MetadataTable.from_items((key, value, value_type) for key, value_type, value in edited)
+        for key, edit in target.diff(transaction.entries).items():
+            if edit is None:
+                transaction.remove(key)
+            else:
+                transaction.set(key, edit[1], edit[0])
+        if output_path is not None:
+            write_metadata(model_path, list(transaction.entries.iter_entries()), slack=slack, output_path=output_path)
+            return True
+        return transaction.commit(slack=slack)
@@ -0,0 +1,179 @@
+import heapq
+import struct
+from array import array
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+from .reader import GGUFReader
+
+# ggml tensor types: id -> (name, elements per block, bytes per block)
+GGML_TYPES = {
+    0: ("F32", 1, 4),
+    1: ("F16", 1, 2),
+    2: ("Q4_0", 32, 18),
+    3: ("Q4_1", 32, 20),
+    6: ("Q5_0", 32, 22),
+    7: ("Q5_1", 32, 24),
+    8: ("Q8_0", 32, 34),
+    9: ("Q8_1", 32, 36),
+    10: ("Q2_K", 256, 84),
+    11: ("Q3_K", 256, 110),
+    12: ("Q4_K", 256, 144),
+    13: ("Q5_K", 256, 176),
+    14: ("Q6_K", 256, 210),
+    15: ("Q8_K", 256, 292),
+    16: ("IQ2_XXS", 256, 66),
+    17: ("IQ2_XS", 256, 74),
+    18: ("IQ3_XXS", 256, 98),
+    19: ("IQ1_S", 256, 50),
+    20: ("IQ4_NL", 32, 18),
+    21: ("IQ3_S", 256, 110),
+    22: ("IQ2_S", 256, 82),
+    23: ("IQ4_XS", 256, 136),
+    24: ("I8", 1, 1),
+    25: ("I16", 1, 2),
+    26: ("I32", 1, 4),
+    27: ("I64", 1, 8),
+    28: ("F64", 1, 8),
+    29: ("IQ1_M", 256, 56),
+    30: ("BF16", 1, 2),
+}
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+TensorInfo = namedtuple("TensorInfo", ["name", "shape", "dtype", "offset", "nbytes"])
+
+
+def dtype_name(dtype: int) -> str:
+    return GGML_TYPES[dtype][0] if dtype in GGML_TYPES else f"unknown({dtype})"
+
+
+class TensorTable:
+    """Tensor descriptors held as parallel `array` columns; TensorInfo tuples are built on demand."""
+
+    def __init__(self, info: bytes, name_start: array, name_length: array, dim_start: array,
+                 dims: array, dtypes: array, offsets: array, data_size: int, alignment: int):
+        self._info = info
+        self._name_start = name_start
+        self._name_length = name_length
+        self._dim_start = dim_start
+        self._dims = dims
+        self.dtypes = dtypes
+        self.offsets = offsets
+        self.data_size = data_size
+        self.alignment = alignment
+        self._nbytes: Optional[array] = None
+        self._by_name: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_reader(cls, reader: GGUFReader) -> "TensorTable":
+        """Parse the tensor-info table only; the tensor data is never touched."""
+        start, end = reader.kv_end, reader.tensor_info_end
+        info = bytes(reader.buffer[start:end])
+        name_start, name_length = array('Q'), array('Q')
+        dim_start, dims = array('Q'), array('Q')
+        dtypes, offsets = array('I'), array('Q')
+        offset = 0
+        for _ in range(reader.tensor_count):
+            (length,) = _U64.unpack_from(info, offset)
+            name_start.append(offset + _U64.size)
+            name_length.append(length)
+            offset += _U64.size + length
+            (n_dims,) = _U32.unpack_from(info, offset)
+            offset += _U32.size
+            dim_start.append(len(dims))
+            dims.extend(struct.unpack_from(f"<{n_dims}Q", info, offset))
+            offset += n_dims * _U64.size
+            dtype, data_offset = struct.unpack_from("<IQ", info, offset)
+            offset += _U32.size + _U64.size
+            dtypes.append(dtype)
+            offsets.append(data_offset)
+        dim_start.append(len(dims))
+        # A stub omits the data but records its size, so offsets are checked against the original
+        data_size = reader.stub.get("data_size", reader.size - reader.data_offset)
+        return cls(info, name_start, name_length, dim_start, dims, dtypes, offsets, data_size, reader.alignment)
+
+    def __len__(self) -> int:
+        return len(self.dtypes)
+
+    def name(self, i: int) -> str:
+        start = self._name_start[i]
+        return self._info[start:start + self._name_length[i]].decode('utf-8', 'replace')
+
+    def shape(self, i: int) -> Tuple[int, ...]:
+        return tuple(self._dims[self._dim_start[i]:self._dim_start[i + 1]])
+
+    def n_elements(self, i: int) -> int:
+        count = 1
+        for dim in self._dims[self._dim_start[i]:self._dim_start[i + 1]]:
+            count *= dim
+        return count
+
+    @property
+    def nbytes(self) -> array:
+        """Bytes of tensor data per tensor (0 for unknown ggml types), computed once."""
+        if self._nbytes is None:
+            sizes = array('Q')
+            for i, dtype in enumerate(self.dtypes):
+                _, block, size = GGML_TYPES.get(dtype, (None, 1, 0))
+                sizes.append(self.n_elements(i) // block * size)
+            self._nbytes = sizes
+        return self._nbytes
+
+    def __getitem__(self, i: int) -> TensorInfo:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("tensor index out of range")
+        return TensorInfo(self.name(i), self.shape(i), dtype_name(self.dtypes[i]), self.offsets[i], self.nbytes[i])
+
+    def find(self, name: str) -> Optional[TensorInfo]:
+        if self._by_name is None:
+            self._by_name = {self.name(i): i for i in range(len(self))}
+        i = self._by_name.get(name)
+        return None if i is None else self[i]
+
+    def parameter_count(self) -> int:
+        return sum(self.n_elements(i) for i in range(len(self)))
+
+    def bytes_by_dtype(self) -> Dict[str, int]:
+        totals: Dict[int, int] = {}
+        for dtype, size in zip(self.dtypes, self.nbytes):
+            totals[dtype] = totals.get(dtype, 0) + size
+        return {dtype_name(dtype): size for dtype, size in sorted(totals.items())}
+
+    def largest(self, n: int = 10) -> List[TensorInfo]:
+        nbytes = self.nbytes
+        return [self[i] for i in heapq.nlargest(n, range(len(self)), key=nbytes.__getitem__)]
+
+    def validate(self) -> List[str]:
+        """Check every tensor is aligned, inside the data region and not overlapping another."""
+        problems = []
+        nbytes = self.nbytes
+        for i, dtype in enumerate(self.dtypes):
+            if dtype not in GGML_TYPES:
+                problems.append(f"{self.name(i)}: unknown ggml type {dtype}")
+            if self.offsets[i] % self.alignment:
+                problems.append(f"{self.name(i)}: offset {self.offsets[i]} is not aligned to {self.alignment}")
+            if self.offsets[i] + nbytes[i] > self.data_size:
+                problems.append(f"{self.name(i)}: data runs past the end of the file")
+        order = sorted(range(len(self)), key=self.offsets.__getitem__)
+        for previous, current in zip(order, order[1:]):
+            if self.offsets[previous] + nbytes[previous] > self.offsets[current]:
+                problems.append(f"{self.name(current)}: overlaps {self.name(previous)}")
+        return problems
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "tensor_count": len(self),
+            "parameter_count": self.parameter_count(),
+            "total_bytes": sum(self.nbytes),
+            "bytes_by_dtype": self.bytes_by_dtype(),
+            "largest": [info._asdict() for info in self.largest(5)],
+            "problems": self.validate(),
+        }
+
+
+def read_tensors(file_path: str) -> TensorTable:
+    with GGUFReader(file_path) as reader:
+        return reader.tensors
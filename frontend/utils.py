@@ -1,10 +1,40 @@
+import glob
 import json
 import os
+from .reader import GGUF_MAGIC
+from .shards import shard_paths
+from . import profiling
 
-def validate_gguf_file(file_path):
-    # Implement GGUF file validation logic here
-    # For now, we'll just check if the file exists and has a .gguf extension
-    return os.path.exists(file_path) and file_path.lower().endswith('.gguf')
+def is_bulk_target(path):
+    return os.path.isdir(path) or glob.has_magic(path)
+
+def validate_gguf_file(file_path, cache=None):
+    with profiling.span("validate", file=file_path):
+        return _validate_gguf_file(file_path, cache)
+
+def _validate_gguf_file(file_path, cache):
+    # A shard of a split model is valid only if every shard of its set is
+    try:
+        paths = shard_paths(file_path)
+    except ValueError:
+        return False
+    if paths is not None:
+        return all(_validate_one(path, cache) for path in paths)
+    return _validate_one(file_path, cache)
+
+def _validate_one(file_path, cache):
+    # A .gguf file that exists and starts with the GGUF magic. With a metadata
+    # cache, a file whose identity is already cached costs a single stat.
+    if not (os.path.isfile(file_path) and file_path.lower().endswith('.gguf')):
+        return False
+    if cache is not None:
+        try:
+            cache.load(file_path)
+            return True
+        except ValueError:
+            return False
+    with open(file_path, 'rb') as f:
+        return f.read(len(GGUF_MAGIC)) == GGUF_MAGIC
 
 def load_default_config():
     return {
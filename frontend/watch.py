@@ -0,0 +1,407 @@
+import ctypes
+import os
+import select
+import signal
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from .bulk import FileResult, process_one
+from .plan import compile_plan
+from .shards import first_shard, shard_paths
+
+# Seconds a file's size and mtime must stay unchanged before it is processed
+DEFAULT_SETTLE = 2.0
+DEFAULT_INTERVAL = 1.0
+# Full rescans catch anything the cheap checks miss, e.g. files rewritten in place while polling
+DEFAULT_RESCAN_INTERVAL = 300.0
+
+_Identity = Tuple[int, int, int, int]
+
+# inotify(7) event masks
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF)
+_GONE = _IN_MOVED_FROM | _IN_DELETE | _IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+def _identity(st: os.stat_result) -> _Identity:
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _ignore_sigint() -> None:
+    # Ctrl-C reaches the whole process group; let the parent shut the pool down instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class Journal:
+    """Which files were processed, in what state and with which config, stored in SQLite."""
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        # The watcher may run on a thread other than the one that opened the journal
+        self._db = sqlite3.connect(journal_path, timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " path TEXT PRIMARY KEY, dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,"
+            " config_hash TEXT, ok INTEGER, result TEXT, processed_at REAL)"
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def load(self, config_hash: str) -> Dict[str, _Identity]:
+        """Identity of every file as it was left after processing with config_hash."""
+        return {
+            path: (dev, ino, size, mtime_ns)
+            for path, dev, ino, size, mtime_ns in self._db.execute(
+                "SELECT path, dev, ino, size, mtime_ns FROM processed WHERE config_hash = ?", (config_hash,)
+            )
+        }
+
+    def record(self, path: str, identity: _Identity, config_hash: str, ok: bool, result: Any) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, *identity, config_hash, int(ok), None if result is None else str(result), time.time()),
+            )
+
+    def forget(self, path: str) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM processed WHERE path = ?", (path,))
+
+    def entries(self) -> List[Tuple[str, str, bool, Optional[str]]]:
+        """(path, config hash, ok, result or error) for every journaled file."""
+        return [(path, config_hash, bool(ok), result) for path, config_hash, ok, result in
+                self._db.execute("SELECT path, config_hash, ok, result FROM processed ORDER BY path")]
+
+
+class _Inotify:
+    """Just enough of inotify(7), through ctypes, to watch directories. Linux only."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dirs: Dict[int, str] = {}
+
+    def add(self, directory: str) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._dirs[wd] = directory
+
+    def read(self, timeout: float) -> Optional[List[Tuple[str, int]]]:
+        """(path, mask) events, waiting up to timeout for the first; None if the kernel queue overflowed."""
+        events: List[Tuple[str, int]] = []
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return events
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                elif wd in self._dirs:
+                    directory = self._dirs[wd]
+                    events.append((os.path.join(directory, os.fsdecode(name)) if name else directory, mask))
+        return None if overflow else events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    """Apply a user config to every GGUF file under some directories as files arrive or change.
+
+    After one full scan, steady-state work is proportional to the number of changes:
+    inotify reports them directly where available; otherwise each poll stats the known
+    directories and re-lists only those whose mtime moved. Files still changing are
+    restatted each poll and processed once they have been quiet for `settle` seconds.
+    Outside overlay mode a split model is processed once as a set, like bulk does,
+    when none of its shards is still settling or being processed.
+    The journal records each file's identity after processing along with the config
+    hash, so restarts and config changes pick up exactly what is out of date.
+    """
+
+    def __init__(self, roots: List[str], user_config: Dict[str, Any], journal: Journal, workers: int = 2,
+                 settle: float = DEFAULT_SETTLE, interval: float = DEFAULT_INTERVAL,
+                 rescan_interval: float = DEFAULT_RESCAN_INTERVAL, slack: int = 0, overlay: bool = False,
+                 overlay_dir: Optional[str] = None, timeout: Optional[float] = None, retry_attempts: int = 1,
+                 verify: bool = False, use_inotify: bool = True):
+        self.plan = compile_plan(user_config)
+        if self.plan.errors:
+            raise ValueError("Invalid config: " + "; ".join(self.plan.errors))
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.journal = journal
+        self.workers = workers
+        self.settle = settle
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+        self._payload = {"user_config": user_config, "plan": self.plan, "slack": slack,
+                         "overlay": overlay, "overlay_dir": overlay_dir, "verify": verify}
+        # In overlay mode every shard keeps its own sidecar, so shards are handled as plain files
+        self._shard_sets = not overlay
+        self._done = journal.load(self.plan.config_hash)
+        self._dir_mtimes: Dict[str, int] = {}
+        self._dir_files: Dict[str, Set[str]] = {}
+        self._pending: Dict[str, Tuple[_Identity, float]] = {}
+        self._in_flight: Dict[Future, str] = {}
+        # Keyed by _set_of, so a set being processed covers all its shards
+        self._in_flight_paths: Set[str] = set()
+        self._last_full_scan: Optional[float] = None
+        self._events: Optional[List[Tuple[str, int]]] = []
+        self._stop = threading.Event()
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                # Not Linux, or out of inotify instances: fall back to polling
+                self._inotify = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def stop(self) -> None:
+        """Ask run() to finish the files in progress and return. Safe to call from a signal handler."""
+        self._stop.set()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _set_of(self, path: str) -> str:
+        return first_shard(path) if self._shard_sets else path
+
+    def _observe(self, path: str, st: os.stat_result) -> None:
+        identity = _identity(st)
+        if self._set_of(path) in self._in_flight_paths or self._done.get(path) == identity:
+            self._pending.pop(path, None)
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != identity:
+            # New or still changing: (re)start the settle clock
+            self._pending[path] = (identity, time.monotonic())
+
+    def _vanished(self, path: str) -> None:
+        self._pending.pop(path, None)
+        self._dir_files.get(os.path.dirname(path), set()).discard(path)
+        if self._done.pop(path, None) is not None:
+            self.journal.forget(path)
+
+    def _forget_dir(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for known in [d for d in self._dir_mtimes if d == directory or d.startswith(prefix)]:
+            for path in list(self._dir_files.get(known, ())):
+                self._vanished(path)
+            self._dir_mtimes.pop(known, None)
+            self._dir_files.pop(known, None)
+
+    def _scan_dir(self, directory: str, full: bool = False) -> None:
+        """Re-list one directory, descending into subdirectories that are new (or all of them if full)."""
+        if self._inotify is not None:
+            try:
+                # Watch before listing so nothing created in between is missed
+                self._inotify.add(directory)
+            except OSError:
+                pass
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except (FileNotFoundError, NotADirectoryError):
+            self._forget_dir(directory)
+            return
+        self._dir_mtimes[directory] = mtime_ns
+        present = set()
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if full or entry.path not in self._dir_mtimes:
+                        self._scan_dir(entry.path, full)
+                elif entry.is_file() and entry.name.lower().endswith('.gguf'):
+                    self._observe(entry.path, entry.stat())
+                    present.add(entry.path)
+            except FileNotFoundError:
+                continue
+        for path in self._dir_files.get(directory, set()) - present:
+            self._vanished(path)
+        self._dir_files[directory] = present
+
+    def _handle_event(self, path: str, mask: int) -> None:
+        if mask & _IN_ISDIR or path in self._dir_mtimes:
+            if mask & _GONE:
+                self._forget_dir(path)
+            else:
+                self._scan_dir(path)
+            return
+        if not path.lower().endswith('.gguf'):
+            return
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._vanished(path)
+            return
+        self._dir_files.setdefault(os.path.dirname(path), set()).add(path)
+        self._observe(path, st)
+
+    def poll(self) -> List[str]:
+        """Pick up changes since the last poll; returns the files that are ready to process."""
+        now = time.monotonic()
+        if (self._last_full_scan is None or self._events is None
+                or (self.rescan_interval and now - self._last_full_scan >= self.rescan_interval)):
+            for root in self.roots:
+                self._scan_dir(root, full=True)
+            self._last_full_scan = now
+        elif self._inotify is not None:
+            for path, mask in self._events:
+                self._handle_event(path, mask)
+        else:
+            for directory, mtime_ns in list(self._dir_mtimes.items()):
+                try:
+                    changed = os.stat(directory).st_mtime_ns != mtime_ns
+                except FileNotFoundError:
+                    self._forget_dir(directory)
+                    continue
+                if changed:
+                    self._scan_dir(directory)
+        self._events = []
+
+        # Files being copied in don't touch their directory's mtime; watch them directly
+        for path in list(self._pending):
+            try:
+                self._observe(path, os.stat(path))
+            except FileNotFoundError:
+                self._vanished(path)
+        now = time.monotonic()
+        settled = sorted(path for path, (_, since) in self._pending.items() if now - since >= self.settle)
+        busy = {self._set_of(path) for path in self._pending.keys() - set(settled)} | self._in_flight_paths
+        ready: Dict[str, str] = {}
+        for path in settled:
+            key = self._set_of(path)
+            if key in busy:
+                # Left pending until the rest of its set has settled or finished processing
+                continue
+            del self._pending[path]
+            ready.setdefault(key, path)
+        return sorted(ready.values())
+
+    def _wait(self, timeout: float) -> None:
+        if self._inotify is None:
+            self._stop.wait(timeout)
+            return
+        events = self._inotify.read(timeout)
+        if events is None or self._events is None:
+            self._events = None
+        else:
+            self._events.extend(events)
+
+    def _record(self, result: FileResult) -> None:
+        paths = [result.path]
+        if self._shard_sets:
+            try:
+                paths = shard_paths(result.path) or paths
+            except ValueError:
+                pass
+        for path in paths:
+            try:
+                identity = _identity(os.stat(path))
+            except FileNotFoundError:
+                self._vanished(path)
+                continue
+            # Failures are journaled too, so a bad file is retried only once it changes
+            self._done[path] = identity
+            self.journal.record(path, identity, self.plan.config_hash, result.ok,
+                                result.result if result.ok else result.error)
+
+    def _reap(self, block: bool = False) -> List[FileResult]:
+        if block and self._in_flight:
+            wait(list(self._in_flight))
+        results = []
+        for future in [f for f in self._in_flight if f.done()]:
+            path = self._in_flight.pop(future)
+            self._in_flight_paths.discard(self._set_of(path))
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                result = FileResult(path=path, ok=False, error=str(e) or type(e).__name__)
+            self._record(result)
+            results.append(result)
+        return results
+
+    def run(self, once: bool = False, on_result: Optional[Callable[[FileResult], None]] = None) -> int:
+        """Process new and changed files until stop() is called; returns how many were processed.
+
+        With once, return as soon as everything found by the first scan has been processed.
+        On stop, files not yet started are left for next time and running ones are finished.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        processed = 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_sigint) as executor:
+            try:
+                while not self._stop.is_set():
+                    for path in self.poll():
+                        future = executor.submit(process_one, "apply", path, self._payload,
+                                                 self.timeout, self.retry_attempts)
+                        self._in_flight[future] = path
+                        self._in_flight_paths.add(self._set_of(path))
+                    for result in self._reap():
+                        processed += 1
+                        if on_result is not None:
+                            on_result(result)
+                    if once and not self._pending and not self._in_flight:
+                        break
+                    self._wait(min(self.interval, self.settle) if once and self._pending else self.interval)
+            finally:
+                for future in self._in_flight:
+                    future.cancel()
+                for result in self._reap(block=True):
+                    processed += 1
+                    if on_result is not None:
+                        on_result(result)
+        return processed
@@ -0,0 +1,131 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import selectors
+import subprocess
+import threading
+import time
+from typing import Any, List, Optional
+
+
+class WorkerError(RuntimeError):
+    """The worker answered the request with an error."""
+
+
+class _Worker:
+    """One long-lived `gguf_metadata_modifier serve` process."""
+
+    def __init__(self, binary: str):
+        self.proc = subprocess.Popen(
+            [binary, "serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._buffer = b""
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.proc.stdout, selectors.EVENT_READ)
+
+    def call(self, request: dict, timeout: Optional[float]) -> dict:
+        self.proc.stdin.write(json.dumps(request).encode('utf-8') + b"\n")
+        self.proc.stdin.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0 or not self._selector.select(remaining):
+                raise TimeoutError(f"Backend worker did not answer within {timeout}s")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("Backend worker exited")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._selector.close()
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+
+
+class WorkerPool:
+    """Keep `size` backend workers warm and hand requests to whichever is idle.
+
+    Requests that time out or hit a crashed worker are retried on a fresh
+    worker up to `retry_attempts` times; errors reported by the backend are not.
+    If no worker can be started any more, requests fail instead of waiting.
+    """
+
+    def __init__(self, binary: str, size: int = 2, timeout: Optional[float] = 30.0, retry_attempts: int = 3):
+        self.binary = binary
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # None is queued once the pool has no workers left, to wake every waiter
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self.binary)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _acquire(self) -> _Worker:
+        worker = self._idle.get()
+        if worker is None:
+            self._idle.put(None)
+            raise RuntimeError("Rust command failed: no backend workers left")
+        return worker
+
+    def _replace(self, worker: _Worker) -> None:
+        with self._lock:
+            self._workers.remove(worker)
+        worker.close()
+        try:
+            self._idle.put(self._spawn())
+        except OSError as e:
+            logging.warning(f"Could not restart backend worker: {e}")
+            with self._lock:
+                empty = not self._workers
+            if empty:
+                self._idle.put(None)
+                raise RuntimeError(f"Rust command failed: no backend workers left ({e})")
+
+    def request(self, *args: str) -> Any:
+        attempts = max(1, self.retry_attempts)
+        for attempt in range(1, attempts + 1):
+            worker = self._acquire()
+            request_id = next(self._ids)
+            try:
+                response = worker.call({"id": request_id, "args": list(args)}, self.timeout)
+                if response.get("id") != request_id:
+                    raise ValueError(f"Backend worker answered request {response.get('id')!r}, not {request_id}")
+            except (TimeoutError, EOFError, OSError, ValueError) as e:
+                logging.warning(f"Backend worker failed ({e}), attempt {attempt}/{attempts}")
+                self._replace(worker)
+                if attempt == attempts:
+                    raise RuntimeError(f"Rust command failed: {e}")
+                continue
+            self._idle.put(worker)
+            if not response.get("ok"):
+                raise WorkerError(response.get("error", "unknown error"))
+            return response.get("result")
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,375 @@
+import errno
+import os
+import shutil
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from .reader import (
+    GGUFReader, GGUF_MAGIC, HEADER, VALUE_TYPE_NAMES, PADDING_KEY, PADDING_OVERHEAD,
+    ALIGNMENT_KEY, DEFAULT_ALIGNMENT, align_offset,
+    VALUE_TYPE_NULL, VALUE_TYPE_BOOL, VALUE_TYPE_INT, VALUE_TYPE_FLOAT, VALUE_TYPE_STRING,
+    VALUE_TYPE_ARRAY, GGUFArray,
+)
+from .metadata import MetadataTable
+from . import profiling
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# Bytes handed to the kernel per copy call, and the buffer used when we copy ourselves
+COPY_CHUNK_SIZE = 1 << 30
+COPY_BUFFER_SIZE = 16 << 20
+
+_KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+# Saved copy of the header an in-place patch is overwriting, until the patch is on disk
+JOURNAL_SUFFIX = ".journal"
+
+
+def coerce_value(value: Any, value_type: Union[str, int]) -> Tuple[int, Any]:
+    """Convert a config value to (type id, python value) the way backend/src/main.rs parses it."""
+    type_id = VALUE_TYPE_NAMES.get(value_type) if isinstance(value_type, str) else value_type
+    if isinstance(value_type, str) and type_id is None and value_type.isdigit():
+        type_id = int(value_type)
+    if type_id == VALUE_TYPE_NULL:
+        return type_id, None
+    if type_id == VALUE_TYPE_BOOL:
+        if isinstance(value, bool):
+            return type_id, value
+        if str(value).lower() in ("true", "false"):
+            return type_id, str(value).lower() == "true"
+        raise ValueError(f"Invalid bool value: {value!r}")
+    if type_id == VALUE_TYPE_INT:
+        # int() would truncate 3.7 and accept True; the backend rejects both
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"Invalid int value: {value!r}")
+        return type_id, int(value)
+    if type_id == VALUE_TYPE_FLOAT:
+        return type_id, float(value)
+    if type_id == VALUE_TYPE_STRING:
+        return type_id, str(value)
+    if type_id == VALUE_TYPE_ARRAY:
+        if isinstance(value, GGUFArray):
+            return type_id, value
+        if isinstance(value, (list, tuple)):
+            return type_id, list(value)
+        raise ValueError(f"Invalid array value: {value!r}")
+    raise ValueError(f"Invalid value type {value_type!r}. Supported types are: string, int, float, bool, array")
+
+
+def array_element_type(values: List[Any]) -> int:
+    """Element type id for a list: the narrowest of bool, int, float and string that fits every element."""
+    if all(isinstance(v, bool) for v in values):
+        return VALUE_TYPE_BOOL
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return VALUE_TYPE_INT
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return VALUE_TYPE_FLOAT
+    if all(isinstance(v, str) for v in values):
+        return VALUE_TYPE_STRING
+    raise ValueError("Array elements must all be bools, numbers or strings")
+
+
+def _encode_string(value: str) -> bytes:
+    encoded = value.encode('utf-8')
+    return _U64.pack(len(encoded)) + encoded
+
+
+def encode_value(value_type: int, value: Any) -> bytes:
+    if value_type == VALUE_TYPE_NULL:
+        return b""
+    if value_type == VALUE_TYPE_BOOL:
+        return bytes([1 if value else 0])
+    if value_type == VALUE_TYPE_INT:
+        return _I64.pack(value)
+    if value_type == VALUE_TYPE_FLOAT:
+        return _F64.pack(value)
+    if value_type == VALUE_TYPE_STRING:
+        return _encode_string(value)
+    if value_type == VALUE_TYPE_ARRAY:
+        if isinstance(value, GGUFArray):
+            # Copied straight from the mapped file, never decoded
+            return _U32.pack(value.element_type) + _U64.pack(value.count) + bytes(value.raw)
+        element_type = array_element_type(value) if value else VALUE_TYPE_NULL
+        if element_type == VALUE_TYPE_FLOAT:
+            value = [float(v) for v in value]
+        return (
+            _U32.pack(element_type) + _U64.pack(len(value))
+            + b"".join(encode_value(element_type, element) for element in value)
+        )
+    raise ValueError(f"Unsupported value type {value_type}")
+
+
+def encode_entries(entries: Iterable[Tuple[str, int, Any]]) -> bytes:
+    """Encode (key, value_type, value) entries as a KV section, without the fixed header."""
+    parts = []
+    for key, value_type, value in entries:
+        parts.append(_encode_string(key))
+        parts.append(_U32.pack(value_type))
+        parts.append(encode_value(value_type, value))
+    return b"".join(parts)
+
+
+def encode_padding(size: int) -> bytes:
+    """Encode a padding entry that takes exactly size bytes of the KV section."""
+    return _encode_string(PADDING_KEY) + _U32.pack(VALUE_TYPE_STRING) + _encode_string("\0" * (size - PADDING_OVERHEAD))
+
+
+def encode_header(entries: Iterable[Tuple[str, int, Any]], version: int = 1, tensor_count: int = 0) -> bytes:
+    """Encode the fixed header and KV section for (key, value_type, value) entries."""
+    entries = list(entries)
+    return HEADER.pack(GGUF_MAGIC, version, tensor_count, len(entries)) + encode_entries(entries)
+
+
+def same_value(current: Tuple[int, Any], new: Tuple[int, Any]) -> bool:
+    """True if two (type id, value) pairs encode identically."""
+    if current[0] != new[0]:
+        return False
+    if current[0] == VALUE_TYPE_ARRAY:
+        # Compare encodings so a stored lazy array is never decoded
+        return encode_value(VALUE_TYPE_ARRAY, new[1]) == encode_value(VALUE_TYPE_ARRAY, current[1])
+    return current[1] == new[1]
+
+
+class MetadataTransaction:
+    """Load a file's metadata once, apply edits in memory and write them back in one pass."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        recover(file_path)
+        with profiling.span("header.parse", file=file_path), GGUFReader(file_path) as reader:
+            self.entries = MetadataTable.from_items(reader.iter_metadata())
+            profiling.count("bytes_read", reader.kv_end)
+        # The entries as loaded, shared with self.entries until the first edit
+        self.base = self.entries.snapshot()
+        self.dirty = False
+
+    def set(self, key: str, value: Any, value_type: Union[str, int]) -> None:
+        entry = coerce_value(value, value_type)
+        current = self.entries.get(key)
+        if current is None or not same_value(current, entry):
+            self.entries[key] = entry
+            self.dirty = True
+
+    def remove(self, key: str) -> None:
+        if self.entries.pop(key, None) is not None:
+            self.dirty = True
+
+    def changes(self) -> Dict[str, Optional[Tuple[int, Any]]]:
+        """Staged edits that change the file: (type id, value) to set, or None to remove."""
+        return self.entries.diff(self.base)
+
+    def commit(self, slack: int = 0) -> bool:
+        """Write pending edits; returns False when there was nothing to write."""
+        if not self.dirty:
+            return False
+        write_metadata(self.file_path, list(self.entries.iter_entries()), slack=slack)
+        self.base = self.entries.snapshot()
+        self.dirty = False
+        return True
+
+
+def write_metadata(file_path: str, entries: List[Tuple[str, int, Any]], slack: int = 0,
+                   output_path: Optional[str] = None, keep_journal: bool = False) -> bool:
+    """Replace the KV section of file_path with entries, keeping the tensor info and data.
+
+    The edit is patched in place when it fits in the existing KV section (including any
+    padding reserved by an earlier rewrite). Otherwise the file is rewritten to a temp file
+    with `slack` bytes of padding reserved after the KV entries and renamed into place.
+    With output_path, the result goes there instead and file_path is left untouched.
+    A stub's own entries are always kept. Returns True when the file was patched in place.
+
+    An in-place patch first saves the header it overwrites to a journal next to the file,
+    so a patch cut short (crash, power loss) is undone by recover() before the next edit.
+    With keep_journal the journal outlives a successful patch, for callers that commit
+    several files together: recover() then rolls the patch back, discard_journal() keeps it.
+    """
+    with profiling.span("file.write", file=file_path):
+        return _write_metadata(file_path, entries, slack, output_path, keep_journal)
+
+
+def _write_metadata(file_path: str, entries: List[Tuple[str, int, Any]], slack: int,
+                    output_path: Optional[str], keep_journal: bool) -> bool:
+    alignment = DEFAULT_ALIGNMENT
+    for key, value_type, value in entries:
+        if key == ALIGNMENT_KEY and value_type == VALUE_TYPE_INT and value > 0:
+            alignment = value
+
+    recover(file_path)
+    with GGUFReader(file_path) as reader:
+        version = reader.version
+        tensor_count = reader.tensor_count
+        kv_end = reader.kv_end
+        tensor_info_end = reader.tensor_info_end
+        data_offset = reader.data_offset
+        size = reader.size
+        entries = list(entries) + reader.stub_entries
+    kv = encode_entries(entries)
+
+    spare = kv_end - HEADER.size - len(kv)
+    if (output_path is None and _fits_in_place(spare)
+            and _data_offset(tensor_count, tensor_info_end, alignment) == data_offset):
+        padding = encode_padding(spare) if spare else b""
+        count = len(entries) + (1 if padding else 0)
+        with open(file_path, 'r+b') as f:
+            _save_journal(file_path, f.read(kv_end))
+            # Entries first, then the fixed header that makes them count
+            f.seek(HEADER.size)
+            f.write(kv + padding)
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(HEADER.pack(GGUF_MAGIC, version, tensor_count, count))
+            f.flush()
+            os.fsync(f.fileno())
+        if not keep_journal:
+            discard_journal(file_path)
+        profiling.count("in_place_writes")
+        profiling.count("bytes_written", HEADER.size + len(kv) + len(padding))
+        return True
+
+    padding = encode_padding(_rewrite_padding_size(slack)) if slack > 0 else b""
+    count = len(entries) + (1 if padding else 0)
+    header = HEADER.pack(GGUF_MAGIC, version, tensor_count, count) + kv + padding
+    destination = output_path or file_path
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".gguf.tmp")
+    try:
+        with open(file_path, 'rb') as src:
+            _write_all(fd, header)
+            copy_range(src.fileno(), fd, kv_end, tensor_info_end - kv_end)
+            if tensor_count:
+                position = len(header) + tensor_info_end - kv_end
+                _write_all(fd, b"\0" * (align_offset(position, alignment) - position))
+            copy_range(src.fileno(), fd, data_offset, size - data_offset)
+        os.fsync(fd)
+        written = os.fstat(fd).st_size
+        os.close(fd)
+        fd = None
+        shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        os.unlink(temp_path)
+        raise
+    profiling.count("rewrites")
+    profiling.count("bytes_read", size - data_offset + tensor_info_end - kv_end)
+    profiling.count("bytes_written", written)
+    return False
+
+
+def recover(file_path: str) -> bool:
+    """Undo an in-place patch that was cut short, restoring the header saved in its journal."""
+    journal = file_path + JOURNAL_SUFFIX
+    try:
+        with open(journal, 'rb') as f:
+            saved = f.read()
+    except FileNotFoundError:
+        return False
+    with open(file_path, 'r+b') as f:
+        f.write(saved)
+        f.flush()
+        os.fsync(f.fileno())
+    os.unlink(journal)
+    return True
+
+
+def discard_journal(file_path: str) -> None:
+    """Make an in-place patch written with keep_journal final."""
+    os.unlink(file_path + JOURNAL_SUFFIX)
+
+
+def _save_journal(file_path: str, header: bytes) -> None:
+    # Renamed into place only once complete, so any journal found is a whole header
+    journal = file_path + JOURNAL_SUFFIX
+    temp_path = journal + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        _write_all(fd, header)
+        os.fsync(fd)
+        os.close(fd)
+        fd = None
+        os.replace(temp_path, journal)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        os.unlink(temp_path)
+        raise
+
+
+def _data_offset(tensor_count: int, tensor_info_end: int, alignment: int) -> int:
+    return align_offset(tensor_info_end, alignment) if tensor_count else tensor_info_end
+
+
+def _fits_in_place(spare: int) -> bool:
+    # Leftover space must be zero or big enough to hold a padding entry
+    return spare == 0 or spare >= PADDING_OVERHEAD
+
+
+def _rewrite_padding_size(slack: int) -> int:
+    return max(slack, PADDING_OVERHEAD) if slack > 0 else 0
+
+
+def estimate_write(file_path: str, entries: List[Tuple[str, int, Any]], slack: int = 0) -> Tuple[bool, int]:
+    """What write_metadata(file_path, entries, slack) would do: (patched in place, bytes written)."""
+    alignment = DEFAULT_ALIGNMENT
+    for key, value_type, value in entries:
+        if key == ALIGNMENT_KEY and value_type == VALUE_TYPE_INT and value > 0:
+            alignment = value
+    with GGUFReader(file_path) as reader:
+        kv_end = reader.kv_end
+        kv_size = len(encode_entries(list(entries) + reader.stub_entries))
+        tensor_info = reader.tensor_info_end - kv_end
+        data = reader.size - reader.data_offset
+        tensor_count = reader.tensor_count
+        # Alignment changes move the tensor data, which only a rewrite can do
+        keeps_data = _data_offset(tensor_count, reader.tensor_info_end, alignment) == reader.data_offset
+    if keeps_data and _fits_in_place(kv_end - HEADER.size - kv_size):
+        return True, kv_end
+    data_offset = HEADER.size + kv_size + _rewrite_padding_size(slack) + tensor_info
+    if tensor_count:
+        data_offset = align_offset(data_offset, alignment)
+    return False, data_offset + data
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    """Append count bytes of src_fd starting at offset to dst_fd, in the kernel where possible."""
+    end = offset + count
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < end:
+                copied = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, end - offset), offset)
+                if not copied:
+                    return
+                offset += copied
+            return
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+    if hasattr(os, 'sendfile'):
+        try:
+            while offset < end:
+                copied = os.sendfile(dst_fd, src_fd, offset, min(COPY_CHUNK_SIZE, end - offset))
+                if not copied:
+                    return
+                offset += copied
+            return
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+    while offset < end:
+        chunk = os.pread(src_fd, min(COPY_BUFFER_SIZE, end - offset), offset)
+        if not chunk:
+            return
+        _write_all(dst_fd, chunk)
+        offset += len(chunk)
@@ -0,0 +1,212 @@
+use gguf_metadata_modifier::GGUFFile;
+use serde_json::{json, Value};
+use std::fs;
+use std::io::{BufRead, BufReader, Write};
+use std::process::{Command, Stdio};
+use tempfile::TempDir;
+
+const ALIGNMENT: usize = 32;
+const TENSOR_DATA: &[u8] = &[7u8; 100];
+
+fn push_string(out: &mut Vec<u8>, s: &str) {
+    out.extend_from_slice(&(s.len() as u64).to_le_bytes());
+    out.extend_from_slice(s.as_bytes());
+}
+
+/// A GGUF file with a string, an int and one tensor whose data sits at an aligned offset.
+fn write_model(dir: &TempDir) -> String {
+    let mut out = Vec::new();
+    out.extend_from_slice(b"GGUF");
+    out.extend_from_slice(&1u32.to_le_bytes());
+    out.extend_from_slice(&1u64.to_le_bytes());
+    out.extend_from_slice(&2u64.to_le_bytes());
+    push_string(&mut out, "general.name");
+    out.extend_from_slice(&4u32.to_le_bytes());
+    push_string(&mut out, "model");
+    push_string(&mut out, "general.layers");
+    out.extend_from_slice(&2u32.to_le_bytes());
+    out.extend_from_slice(&32i64.to_le_bytes());
+    // Tensor info: name, n_dims, dims, dtype, offset into the data section
+    push_string(&mut out, "blk.0.weight");
+    out.extend_from_slice(&1u32.to_le_bytes());
+    out.extend_from_slice(&25u64.to_le_bytes());
+    out.extend_from_slice(&0u32.to_le_bytes());
+    out.extend_from_slice(&0u64.to_le_bytes());
+    out.resize(out.len().div_ceil(ALIGNMENT) * ALIGNMENT, 0);
+    out.extend_from_slice(TENSOR_DATA);
+
+    let path = dir.path().join("model.gguf");
+    fs::write(&path, out).unwrap();
+    path.to_str().unwrap().to_string()
+}
+
+fn assert_tensor_data_intact(path: &str) {
+    let bytes = fs::read(path).unwrap();
+    assert!(bytes.len() >= TENSOR_DATA.len());
+    let data_offset = bytes.len() - TENSOR_DATA.len();
+    assert_eq!(data_offset % ALIGNMENT, 0);
+    assert_eq!(&bytes[data_offset..], TENSOR_DATA);
+}
+
+fn value_of(path: &str, key: &str) -> Option<Value> {
+    GGUFFile::new(path).unwrap().get_metadata(key).map(|m| m.value.clone())
+}
+
+#[test]
+fn test_streaming_save_keeps_tensor_data() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+
+    let mut gguf = GGUFFile::new(&path).unwrap();
+    gguf.modify_metadata("general.name", Value::from("a much longer model name"), "string").unwrap();
+    gguf.modify_metadata("general.extra", Value::from(7), "int").unwrap();
+    gguf.remove_metadata("general.layers").unwrap();
+    assert_tensor_data_intact(&path);
+
+    assert_eq!(value_of(&path, "general.name"), Some(Value::from("a much longer model name")));
+    assert_eq!(value_of(&path, "general.extra"), Some(Value::from(7)));
+    assert_eq!(value_of(&path, "general.layers"), None);
+    assert!(!dir.path().join("model.gguf.tmp").exists());
+}
+
+#[test]
+fn test_save_refuses_an_unreadable_original() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+    let mut gguf = GGUFFile::new(&path).unwrap();
+    // Cut the file off inside its KV section after it was loaded
+    let truncated = fs::read(&path).unwrap()[..40].to_vec();
+    fs::write(&path, &truncated).unwrap();
+
+    assert!(gguf.modify_metadata("general.name", Value::from("renamed"), "string").is_err());
+    assert_eq!(fs::read(&path).unwrap(), truncated);
+    assert!(!dir.path().join("model.gguf.tmp").exists());
+}
+
+#[test]
+fn test_apply_edits_saves_once_in_order() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+
+    let mut gguf = GGUFFile::new(&path).unwrap();
+    gguf.apply_edits(vec![
+        ("general.layers".to_string(), None),
+        ("general.extra".to_string(), Some((Value::from(1), "int".to_string()))),
+        ("general.layers".to_string(), Some((Value::from(40), "int".to_string()))),
+    ]).unwrap();
+    assert_tensor_data_intact(&path);
+
+    let export = dir.path().join("after.ndjson");
+    GGUFFile::new(&path).unwrap().export_metadata(export.to_str().unwrap()).unwrap();
+    let keys: Vec<String> = fs::read_to_string(&export).unwrap().lines()
+        .map(|line| serde_json::from_str::<Value>(line).unwrap()["key"].as_str().unwrap().to_string())
+        .collect();
+    assert_eq!(keys, ["general.name", "general.extra", "general.layers"]);
+}
+
+#[test]
+fn test_ndjson_export_import_round_trip() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+    let export = dir.path().join("metadata.ndjson");
+    let export = export.to_str().unwrap();
+
+    GGUFFile::new(&path).unwrap().export_metadata(export).unwrap();
+    let lines: Vec<Value> = fs::read_to_string(export).unwrap().lines()
+        .map(|line| serde_json::from_str(line).unwrap())
+        .collect();
+    assert_eq!(lines.len(), 2);
+    assert_eq!(lines[0]["key"], "general.name");
+
+    // Edit the export: change one key, drop one, add one
+    let edited = [
+        json!({"key": "general.name", "value": "renamed", "value_type": "4"}),
+        json!({"key": "general.new", "value": 3, "value_type": "2"}),
+    ];
+    let text: String = edited.iter().map(|entry| format!("{}\n", entry)).collect();
+    fs::write(export, text).unwrap();
+
+    GGUFFile::new(&path).unwrap().import_metadata(export).unwrap();
+    assert_tensor_data_intact(&path);
+    assert_eq!(value_of(&path, "general.name"), Some(Value::from("renamed")));
+    assert_eq!(value_of(&path, "general.new"), Some(Value::from(3)));
+    assert_eq!(value_of(&path, "general.layers"), None);
+}
+
+#[test]
+fn test_non_finite_floats_stay_floats() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+    let export = dir.path().join("floats.ndjson");
+    let edits = [
+        json!({"key": "general.nan", "value": "NaN", "value_type": "3"}),
+        json!({"key": "general.floats", "value": [1.5, "inf", "-inf"], "value_type": "5"}),
+    ];
+    let text: String = edits.iter().map(|entry| format!("{}\n", entry)).collect();
+    fs::write(&export, text).unwrap();
+    GGUFFile::new(&path).unwrap().import_metadata(export.to_str().unwrap()).unwrap();
+
+    // Saving an unrelated edit must write them back as f64, not as null or strings
+    let mut gguf = GGUFFile::new(&path).unwrap();
+    gguf.modify_metadata("general.name", Value::from("renamed"), "string").unwrap();
+    let gguf = GGUFFile::new(&path).unwrap();
+    let nan = gguf.get_metadata("general.nan").unwrap();
+    assert_eq!((nan.value.clone(), nan.value_type.as_str()), (Value::from("NaN"), "3"));
+    assert_eq!(value_of(&path, "general.floats"), Some(json!([1.5, "inf", "-inf"])));
+    let bytes = fs::read(&path).unwrap();
+    let key = bytes.windows(11).position(|w| w == b"general.nan").unwrap() + 11;
+    assert_eq!(u32::from_le_bytes(bytes[key..key + 4].try_into().unwrap()), 3);
+    assert!(f64::from_le_bytes(bytes[key + 4..key + 12].try_into().unwrap()).is_nan());
+    assert_tensor_data_intact(&path);
+}
+
+#[test]
+fn test_search_file_matches_loaded_search() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+    let found = GGUFFile::search_file(&path, "layers").unwrap();
+    assert_eq!(found.len(), 1);
+    assert_eq!(found[0].value, Value::from(32));
+    let gguf = GGUFFile::new(&path).unwrap();
+    assert_eq!(gguf.search_metadata("general").len(), 2);
+}
+
+#[test]
+fn test_serve_answers_json_lines() {
+    let dir = TempDir::new().unwrap();
+    let path = write_model(&dir);
+    let mut child = Command::new(env!("CARGO_BIN_EXE_gguf_metadata_modifier"))
+        .arg("serve")
+        .stdin(Stdio::piped())
+        .stdout(Stdio::piped())
+        .spawn()
+        .unwrap();
+    let mut stdin = child.stdin.take().unwrap();
+    let mut stdout = BufReader::new(child.stdout.take().unwrap());
+    let mut call = |id: u64, args: &[&str]| -> Value {
+        writeln!(stdin, "{}", json!({"id": id, "args": args})).unwrap();
+        stdin.flush().unwrap();
+        let mut line = String::new();
+        stdout.read_line(&mut line).unwrap();
+        let response: Value = serde_json::from_str(&line).unwrap();
+        assert_eq!(response["id"], id);
+        response
+    };
+
+    let response = call(1, &["modify", &path, "general.layers", "48", "int"]);
+    assert_eq!(response["ok"], true);
+    let response = call(2, &["search", &path, "layers"]);
+    assert_eq!(response["result"][0]["value"], 48);
+    let response = call(3, &["remove", &path, "general.name"]);
+    assert_eq!(response["ok"], true);
+    let response = call(4, &["modify", &path, "general.layers", "4.5", "int"]);
+    assert_eq!(response["ok"], false);
+    let response = call(5, &["bogus"]);
+    assert_eq!(response["ok"], false);
+
+    drop(stdin);
+    assert!(child.wait().unwrap().success());
+    assert_tensor_data_intact(&path);
+    assert_eq!(value_of(&path, "general.name"), None);
+    assert_eq!(value_of(&path, "general.layers"), Some(Value::from(48)));
+}
@@ -0,0 +1,170 @@
+import unittest
+import asyncio
+import tempfile
+import os
+import sys
+import time
+from frontend.async_cli import AsyncCLI
+from frontend.config import Config
+from frontend.reader import read_metadata
+from test_reader import write_gguf, SAMPLE_ENTRIES
+from test_writer import write_model
+
+FAKE_BACKEND = '''#!{python}
+import os, sys, time
+with open(os.path.join({pids!r}, str(os.getpid())), "w"):
+    pass
+command, *args = sys.argv[1:]
+if command == "modify" and args[1] == "hang":
+    time.sleep(60)
+if command == "modify" and args[1] == "slow":
+    time.sleep(0.3)
+if command == "modify" and args[1] == "corrupt":
+    with open(args[0], "ab") as f:
+        f.write(b"\\0")
+if command == "remove":
+    sys.stderr.write("no such key")
+    sys.exit(1)
+print(" ".join([command] + args))
+'''
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class TestAsyncCLI(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pids = os.path.join(self.temp_dir.name, "pids")
+        os.mkdir(self.pids)
+        self.binary = os.path.join(self.temp_dir.name, "fake_backend")
+        with open(self.binary, 'w') as f:
+            f.write(FAKE_BACKEND.format(python=sys.executable, pids=self.pids))
+        os.chmod(self.binary, 0o755)
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+        self.config = Config(os.path.join(self.temp_dir.name, "config.json"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_cli(self, concurrency=None):
+        cli = AsyncCLI(self.config, concurrency=concurrency)
+        cli.rust_binary = self.binary
+        return cli
+
+    def spawned(self):
+        return [int(name) for name in os.listdir(self.pids)]
+
+    def test_backend_commands(self):
+        async def scenario():
+            async with self.make_cli() as cli:
+                self.assertEqual(await cli.modify_metadata(self.gguf_file, "k", "v", "string"),
+                                 f"modify {self.gguf_file} k v string")
+                with self.assertRaises(RuntimeError) as ctx:
+                    await cli.remove_metadata(self.gguf_file, "k")
+                self.assertIn("no such key", str(ctx.exception))
+        asyncio.run(scenario())
+
+    def test_timeout_kills_child(self):
+        async def scenario():
+            async with self.make_cli() as cli:
+                with self.assertRaises(TimeoutError):
+                    await cli.modify_metadata(self.gguf_file, "hang", "v", "string", timeout=0.5)
+        asyncio.run(scenario())
+        self.assertFalse(any(alive(pid) for pid in self.spawned()))
+
+    def test_cancellation_kills_child(self):
+        async def scenario():
+            cli = self.make_cli()
+            task = asyncio.create_task(cli.modify_metadata(self.gguf_file, "hang", "v", "string", timeout=None))
+            while not self.spawned():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(scenario())
+        self.assertFalse(any(alive(pid) for pid in self.spawned()))
+
+    def test_concurrency_is_bounded(self):
+        async def scenario():
+            cli = self.make_cli(concurrency=2)
+            start = time.monotonic()
+            await asyncio.gather(*[cli.modify_metadata(self.gguf_file, "slow", str(i), "int") for i in range(4)])
+            return time.monotonic() - start
+        self.assertGreaterEqual(asyncio.run(scenario()), 0.6)
+
+    def test_timed_out_thread_keeps_its_slot(self):
+        async def scenario():
+            cli = self.make_cli(concurrency=1)
+            start = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                await cli._run_local(time.sleep, 0.3, timeout=0.05)
+            await cli._run_local(time.sleep, 0)
+            elapsed = time.monotonic() - start
+            await cli.close()
+            return elapsed
+        self.assertGreaterEqual(asyncio.run(scenario()), 0.3)
+
+    def test_backend_edit_that_changes_tensor_data_fails(self):
+        write_model(self.gguf_file, [("general.name", 4, "model")], [("a", b"\1" * 64)])
+
+        async def scenario():
+            async with self.make_cli() as cli:
+                await cli.modify_metadata(self.gguf_file, "general.name", "renamed", "string")
+                with self.assertRaisesRegex(RuntimeError, "Tensor data changed"):
+                    await cli.modify_metadata(self.gguf_file, "corrupt", "v", "string")
+        asyncio.run(scenario())
+
+    def test_shard_edits_apply_to_the_set(self):
+        paths = [os.path.join(self.temp_dir.name, f"model-{i:05d}-of-00002.gguf") for i in (1, 2)]
+        for i, path in enumerate(paths):
+            write_model(path, [("split.no", 2, i), ("split.count", 2, 2), ("general.layers", 2, 32)],
+                        [(f"blk.{i}.weight", b"\1" * 64)])
+
+        async def scenario():
+            async with self.make_cli() as cli:
+                await cli.modify_metadata(paths[1], "general.layers", "40", "int")
+                await cli.remove_metadata(paths[0], "general.layers")
+        asyncio.run(scenario())
+        self.assertEqual(self.spawned(), [])
+        for path in paths:
+            self.assertNotIn("general.layers", [item["key"] for item in read_metadata(path)])
+
+    def test_in_process_operations(self):
+        async def scenario():
+            cli = self.make_cli()
+            found = await cli.search_metadata(self.gguf_file, "general.la")
+            rewritten = await cli.process_file_with_config(self.gguf_file, {
+                "metadata_to_modify": [{"key": "general.layers", "value": "40", "type": "int"}],
+            })
+            return found, rewritten
+        found, rewritten = asyncio.run(scenario())
+        self.assertEqual(found, [{"key": "general.layers", "value": 32, "value_type": "2"}])
+        self.assertTrue(rewritten)
+        self.assertEqual(read_metadata(self.gguf_file)[1]["value"], 40)
+
+    def test_overlay_mode(self):
+        self.config.user_config.overlay_mode = True
+
+        async def scenario():
+            cli = self.make_cli()
+            await cli.modify_metadata(self.gguf_file, "general.name", "renamed", "string")
+            found = await cli.search_metadata(self.gguf_file, "general.name")
+            rewritten = await cli.compact(self.gguf_file)
+            return found, rewritten
+        found, rewritten = asyncio.run(scenario())
+        self.assertEqual(self.spawned(), [])
+        self.assertEqual(found[0]["value"], "renamed")
+        self.assertTrue(rewritten)
+        self.assertEqual(read_metadata(self.gguf_file)[0]["value"], "renamed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import os
+import hashlib
+from benchmarks.run import compare, run_suite
+from benchmarks.startup import run_startup
+from benchmarks.synthetic import SyntheticSpec, generate
+from frontend.reader import read_metadata
+from frontend.tensors import read_tensors
+
+SMALL = SyntheticSpec(kv_count=40, string_length=8, array_length=50, tensor_count=3, tensor_bytes=1000, alignment=64)
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class TestSyntheticGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_generated_file_matches_spec(self):
+        size = generate(self.path("a.gguf"), SMALL)
+        self.assertEqual(size, os.path.getsize(self.path("a.gguf")))
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.path("a.gguf"))}
+        self.assertEqual(len([key for key in metadata if key.startswith("synthetic.kv.")]), 40)
+        self.assertEqual(len(metadata["synthetic.kv.000000"]), 8)
+        self.assertEqual(len(metadata["tokenizer.ggml.tokens"]), 50)
+        tensors = read_tensors(self.path("a.gguf"))
+        self.assertEqual(len(tensors), 3)
+        self.assertEqual(tensors.alignment, 64)
+        self.assertEqual(tensors.validate(), [])
+
+    def test_deterministic(self):
+        generate(self.path("a.gguf"), SMALL)
+        generate(self.path("b.gguf"), SMALL)
+        generate(self.path("c.gguf"), SyntheticSpec(**dict(SMALL.to_dict(), seed=1)))
+        self.assertEqual(digest(self.path("a.gguf")), digest(self.path("b.gguf")))
+        self.assertNotEqual(digest(self.path("a.gguf")), digest(self.path("c.gguf")))
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+
+    def test_cli_suite_reports_every_operation(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run_suite(SMALL, ["open", "modify", "import"], ["cli", "backend"], 1,
+                               os.path.join(workdir, "no-such-binary"), workdir)
+        by_target = {(entry["target"], entry["operation"]): entry for entry in report["results"]}
+        for operation in ("open", "modify", "import"):
+            run = by_target[("cli", operation)]["runs"][0]
+            self.assertTrue(run["ok"], run.get("error"))
+            self.assertGreater(run["peak_rss_kib"], 0)
+            self.assertIn("skipped", by_target[("backend", operation)])
+        self.assertGreater(by_target[("cli", "modify")]["runs"][0]["bytes_written"], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": [{"operation": "open", "target": "cli", "median_seconds": 1.0}]}
+        slower = {"results": [{"operation": "open", "target": "cli", "median_seconds": 1.5}]}
+        self.assertEqual(len(compare(slower, baseline, 1.2)), 1)
+        self.assertEqual(compare(slower, baseline, 2.0), [])
+
+
+class TestStartupBenchmark(unittest.TestCase):
+
+    def test_reports_each_command(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run_startup(["interpreter", "search-plain"], 1, workdir)
+        for entry in report["results"]:
+            self.assertTrue(entry["runs"][0]["ok"], entry["runs"][0].get("error"))
+            self.assertGreater(entry["median_seconds"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
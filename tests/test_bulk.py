@@ -0,0 +1,100 @@
+import unittest
+import tempfile
+import os
+import time
+from unittest.mock import patch
+from frontend import writer
+from frontend.bulk import discover_gguf_files, process_one, run_bulk
+from frontend.reader import read_metadata
+from frontend.writer import MetadataTransaction
+from test_reader import write_gguf, SAMPLE_ENTRIES
+
+
+class TestBulkMode(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        os.makedirs(os.path.join(root, "nested", "deeper"))
+        self.files = [
+            os.path.join(root, "a.gguf"),
+            os.path.join(root, "nested", "b.GGUF"),
+            os.path.join(root, "nested", "deeper", "c.gguf"),
+        ]
+        for path in self.files:
+            write_gguf(path, SAMPLE_ENTRIES)
+        with open(os.path.join(root, "nested", "notes.txt"), 'w') as f:
+            f.write("not a model")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_discover_directories_and_globs(self):
+        root = self.temp_dir.name
+        self.assertEqual(discover_gguf_files([root]), sorted(self.files))
+        self.assertEqual(discover_gguf_files([os.path.join(root, "*.gguf")]), [self.files[0]])
+        self.assertEqual(discover_gguf_files([self.files[0], root]), sorted(self.files))
+
+    def test_apply_user_config_in_parallel(self):
+        user_config = {
+            "metadata_to_modify": [{"key": "general.name", "value": "bulk", "type": "string"}],
+            "metadata_to_remove": ["general.unused"],
+        }
+        results = run_bulk(self.files, "apply", {"user_config": user_config}, workers=2, max_batch_size=2)
+        self.assertEqual([r.path for r in results], self.files)
+        self.assertTrue(all(r.ok and r.result == "rewritten" for r in results))
+        for path in self.files:
+            metadata = {item["key"]: item["value"] for item in read_metadata(path)}
+            self.assertEqual(metadata["general.name"], "bulk")
+            self.assertNotIn("general.unused", metadata)
+
+    def test_invalid_file_fails_without_retry(self):
+        with open(self.files[0], 'wb') as f:
+            f.write(b"garbage")
+        result = process_one("search", self.files[0], {"search_key": "general"}, timeout=5, retry_attempts=3)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 1)
+
+    def test_missing_file_is_retried(self):
+        missing = os.path.join(self.temp_dir.name, "missing.gguf")
+        result = process_one("search", missing, {"search_key": "general"}, timeout=5, retry_attempts=3)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+
+    def test_timeout_never_interrupts_a_write(self):
+        real_write = writer._write_metadata
+
+        def slow_write(*args):
+            time.sleep(0.3)
+            return real_write(*args)
+
+        user_config = {"metadata_to_modify": [{"key": "general.name", "value": "slow", "type": "string"}]}
+        with patch('frontend.writer._write_metadata', side_effect=slow_write) as mock_write:
+            result = process_one("apply", self.files[0], {"user_config": user_config}, timeout=0.1, retry_attempts=3)
+        # The timeout covers reading and planning; the write it would have cut short ran to completion
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(mock_write.call_count, 1)
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.files[0])}
+        self.assertEqual(metadata["general.name"], "slow")
+
+    def test_timeout_before_writing_is_retried(self):
+        real_transaction = MetadataTransaction
+        calls = []
+
+        def slow_first_load(path):
+            calls.append(path)
+            if len(calls) == 1:
+                time.sleep(0.3)
+            return real_transaction(path)
+
+        user_config = {"metadata_to_modify": [{"key": "general.name", "value": "retried", "type": "string"}]}
+        with patch('frontend.bulk.MetadataTransaction', side_effect=slow_first_load):
+            result = process_one("apply", self.files[0], {"user_config": user_config}, timeout=0.1, retry_attempts=3)
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(result.attempts, 2)
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.files[0])}
+        self.assertEqual(metadata["general.name"], "retried")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+import tempfile
+import os
+from unittest.mock import patch
+from frontend.cache import MetadataCache
+from frontend.jsonio import export_metadata
+from frontend.query import search_metadata
+from frontend.utils import validate_gguf_file
+from test_reader import write_gguf, SAMPLE_ENTRIES
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = MetadataCache(os.path.join(self.temp_dir.name, "cache.sqlite"))
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_hit_skips_parsing(self):
+        first = self.cache.load(self.gguf_file)
+        with patch('frontend.cache.read_metadata') as mock_read:
+            second = self.cache.load(self.gguf_file)
+        mock_read.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(second[0]["value"], "test model")
+
+    def test_changed_file_is_reparsed(self):
+        self.cache.load(self.gguf_file)
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES[:2])
+        os.utime(self.gguf_file, ns=(1, 1))
+        self.assertEqual(len(self.cache.load(self.gguf_file)), 2)
+
+    def test_invalidate(self):
+        self.cache.load(self.gguf_file)
+        self.cache.invalidate(self.gguf_file)
+        self.assertIsNone(self.cache.get(self.gguf_file))
+
+    def test_lru_eviction_by_size(self):
+        other = os.path.join(self.temp_dir.name, "other.gguf")
+        write_gguf(other, SAMPLE_ENTRIES)
+        self.cache.load(self.gguf_file)
+        self.cache.max_bytes = 300
+        self.cache.load(other)
+        self.assertIsNone(self.cache.get(self.gguf_file))
+        self.assertIsNotNone(self.cache.get(other))
+
+    def test_validate_with_cache(self):
+        self.assertTrue(validate_gguf_file(self.gguf_file, self.cache))
+        with patch('frontend.cache.read_metadata') as mock_read:
+            self.assertTrue(validate_gguf_file(self.gguf_file, self.cache))
+        mock_read.assert_not_called()
+        bad = os.path.join(self.temp_dir.name, "bad.gguf")
+        with open(bad, 'wb') as f:
+            f.write(b"nope")
+        self.assertFalse(validate_gguf_file(bad, self.cache))
+        self.assertFalse(validate_gguf_file(bad))
+
+    def test_search_and_export_read_through_cache(self):
+        export_path = os.path.join(self.temp_dir.name, "export.json")
+        self.assertEqual(len(search_metadata(self.gguf_file, "general.name", cache=self.cache)), 1)
+        expected = [item["key"] for item in search_metadata(self.gguf_file, "general")]
+        with patch('frontend.query.GGUFReader') as mock_query, patch('frontend.jsonio.GGUFReader') as mock_export:
+            found = search_metadata(self.gguf_file, "general", cache=self.cache)
+            self.assertEqual(export_metadata(self.gguf_file, export_path, cache=self.cache), len(SAMPLE_ENTRIES))
+        mock_query.assert_not_called()
+        mock_export.assert_not_called()
+        self.assertEqual([item["key"] for item in found], expected)
+        with open(export_path) as f:
+            self.assertEqual(json.load(f)[0], {"key": "general.name", "value": "test model", "value_type": "4"})
+
+
+if __name__ == '__main__':
+    unittest.main()
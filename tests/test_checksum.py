@@ -0,0 +1,139 @@
+import unittest
+import tempfile
+import os
+import hashlib
+from io import StringIO
+from unittest.mock import patch
+from frontend import profiling
+from frontend.bulk import apply_user_config, run_bulk
+from frontend.checksum import ChecksumCache, merkle_root, tensor_checksum, verify_tensor_data
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.reader import GGUFReader
+from frontend.writer import MetadataTransaction
+from test_writer import write_model
+
+ENTRIES = [("general.name", 4, "model"), ("general.layers", 2, 32)]
+TENSORS = [("a", bytes(range(256)) * 4), ("b", b"\7" * 2000), ("c", b"\1" * 96)]
+CHUNK = 256
+
+
+class TestTensorChecksum(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, TENSORS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def flip_tensor_byte(self, index=300):
+        with GGUFReader(self.gguf_file) as reader:
+            offset = reader.data_offset + index
+        with open(self.gguf_file, 'r+b') as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 0xff]))
+
+    def test_covers_only_tensor_data(self):
+        before = tensor_checksum(self.gguf_file, CHUNK)
+        with GGUFReader(self.gguf_file) as reader:
+            self.assertEqual((before.data_offset, before.data_size), (reader.data_offset, reader.size - reader.data_offset))
+        apply_user_config(self.gguf_file, {"metadata_to_add": [{"key": "general.extra", "value": "x" * 100,
+                                                                "type": "string"}]}, slack=64)
+        after = tensor_checksum(self.gguf_file, CHUNK)
+        self.assertNotEqual(after.data_offset, before.data_offset)
+        self.assertEqual(after.root, before.root)
+
+    def test_detects_changed_chunk(self):
+        before = tensor_checksum(self.gguf_file, CHUNK)
+        self.flip_tensor_byte(300)
+        after = tensor_checksum(self.gguf_file, CHUNK)
+        self.assertNotEqual(after.root, before.root)
+        self.assertEqual(before.diff(after), [1])
+        self.assertFalse(verify_tensor_data(self.gguf_file, before.root, CHUNK))
+
+    def test_parallel_matches_serial(self):
+        parallel = tensor_checksum(self.gguf_file, CHUNK, workers=4)
+        self.assertGreater(len(parallel.chunks), 4)
+        self.assertEqual(parallel, tensor_checksum(self.gguf_file, CHUNK, workers=1))
+
+    def test_merkle_root(self):
+        leaves = [hashlib.sha256(bytes([i])).digest() for i in range(3)]
+        pair = hashlib.sha256(b"\x01" + leaves[0] + leaves[1]).digest()
+        self.assertEqual(merkle_root(leaves), hashlib.sha256(b"\x01" + pair + leaves[2]).digest())
+        self.assertEqual(merkle_root(leaves[:1]), leaves[0])
+
+    def test_cached_by_file_identity(self):
+        cache = ChecksumCache(os.path.join(self.temp_dir.name, "checksums.sqlite"))
+        self.addCleanup(cache.close)
+        first = tensor_checksum(self.gguf_file, CHUNK, cache=cache)
+        with profiling.profiling() as profiler:
+            self.assertEqual(tensor_checksum(self.gguf_file, CHUNK, cache=cache), first)
+        self.assertEqual(profiler.counters["checksum_cache_hits"], 1)
+        self.assertNotIn("bytes_hashed", profiler.counters)
+        self.flip_tensor_byte()
+        self.assertNotEqual(tensor_checksum(self.gguf_file, CHUNK, cache=cache).root, first.root)
+
+    def test_bulk_checksum(self):
+        [result] = run_bulk([self.gguf_file], "checksum", {}, workers=1)
+        self.assertEqual(result.result, tensor_checksum(self.gguf_file).root)
+
+
+@patch('sys.stdout', new_callable=StringIO)
+class TestEditVerification(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, TENSORS)
+        self.cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+        self.user_config = {"metadata_to_modify": [{"key": "general.name", "value": "renamed", "type": "string"}]}
+
+    def tearDown(self):
+        self.cli.close()
+        self.temp_dir.cleanup()
+
+    def test_edit_is_verified(self, mock_stdout):
+        self.assertTrue(self.cli.process_file_with_config(self.gguf_file, self.user_config))
+
+    def test_edit_that_changes_tensor_data_fails(self, mock_stdout):
+        commit = MetadataTransaction.commit
+
+        def corrupting_commit(transaction, slack=0):
+            changed = commit(transaction, slack)
+            with open(self.gguf_file, 'r+b') as f:
+                f.seek(-1, os.SEEK_END)
+                f.write(b"\0")
+            return changed
+
+        with patch.object(MetadataTransaction, "commit", corrupting_commit):
+            self.assertFalse(self.cli.process_file_with_config(self.gguf_file, self.user_config))
+        self.assertIn("Tensor data changed", mock_stdout.getvalue())
+
+    def test_in_place_edits_do_not_rehash_tensor_data(self, mock_stdout):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "m", "string")
+        transaction.commit(slack=256)
+        with profiling.profiling() as profiler:
+            self.assertTrue(self.cli.process_file_with_config(self.gguf_file, self.user_config))
+        self.assertEqual(profiler.counters["in_place_writes"], 1)
+        # Hashed once, before the edit
+        self.assertEqual(profiler.counters["bytes_hashed"], tensor_checksum(self.gguf_file).data_size)
+        # The checksum carries over to the patched file, so the next edit hashes nothing
+        self.user_config["metadata_to_modify"][0]["value"] = "renamed again"
+        with profiling.profiling() as profiler:
+            self.assertTrue(self.cli.process_file_with_config(self.gguf_file, self.user_config))
+        self.assertNotIn("bytes_hashed", profiler.counters)
+
+    def test_checksum_and_verify(self, mock_stdout):
+        root = self.cli.checksum(self.gguf_file)
+        self.cli.process_file_with_config(self.gguf_file, self.user_config)
+        self.assertTrue(self.cli.verify(self.gguf_file, root))
+        self.assertFalse(self.cli.verify(self.gguf_file, "0" * 64))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,17 +2,21 @@ import unittest
 import tempfile
 import os
 import json
+import shutil
 from unittest.mock import patch, MagicMock
 from io import StringIO
 from frontend.cli import CLI
 from frontend.config import Config
+from frontend.reader import read_metadata
+from frontend.writer import write_metadata
+from test_reader import write_gguf
 
 class TestGGUFMetadataModifierFrontend(unittest.TestCase):
 
     def setUp(self):
-        self.config = Config(debug=True)
-        self.cli = CLI(self.config)
         self.temp_dir = tempfile.mkdtemp()
+        self.config = Config(os.path.join(self.temp_dir, "config.json"), debug=True)
+        self.cli = CLI(self.config)
         self.gguf_file = os.path.join(self.temp_dir, "test.gguf")
         self.json_file = os.path.join(self.temp_dir, "test.json")
 
@@ -21,11 +25,9 @@ class TestGGUFMetadataModifierFrontend(unittest.TestCase):
             f.write("MOCK GGUF FILE")
 
     def tearDown(self):
-        # Clean up temporary files
-        os.remove(self.gguf_file)
-        if os.path.exists(self.json_file):
-            os.remove(self.json_file)
-        os.rmdir(self.temp_dir)
+        # Clean up temporary files, including the metadata cache
+        self.cli.close()
+        shutil.rmtree(self.temp_dir)
 
     @patch('frontend.cli.subprocess.run')
     def test_modify_metadata(self, mock_run):
@@ -47,46 +49,38 @@ class TestGGUFMetadataModifierFrontend(unittest.TestCase):
             capture_output=True, text=True
         )
 
-    @patch('frontend.cli.subprocess.run')
-    def test_export_metadata(self, mock_run):
-        mock_run.return_value = MagicMock(returncode=0)
+    def test_export_metadata(self):
+        write_gguf(self.gguf_file, [("test_key", 4, "test_value")])
         result = self.cli.export_metadata(self.gguf_file, self.json_file)
         self.assertTrue(result)
-        mock_run.assert_called_once_with(
-            ["gguf_metadata_modifier", "export", self.gguf_file, self.json_file],
-            capture_output=True, text=True
-        )
+        with open(self.json_file) as f:
+            self.assertEqual(json.load(f), [{"key": "test_key", "value": "test_value", "value_type": "4"}])
 
-    @patch('frontend.cli.subprocess.run')
-    def test_import_metadata(self, mock_run):
-        mock_run.return_value = MagicMock(returncode=0)
+    def test_import_metadata(self):
+        write_gguf(self.gguf_file, [("test_key", 4, "old_value"), ("stale_key", 2, 1)])
+        with open(self.json_file, 'w') as f:
+            json.dump([{"key": "test_key", "value": "new_value", "value_type": "4"}], f)
         result = self.cli.import_metadata(self.gguf_file, self.json_file)
         self.assertTrue(result)
-        mock_run.assert_called_once_with(
-            ["gguf_metadata_modifier", "import", self.gguf_file, self.json_file],
-            capture_output=True, text=True
-        )
+        self.assertEqual(read_metadata(self.gguf_file), [{"key": "test_key", "value": "new_value", "value_type": "4"}])
 
-    @patch('frontend.cli.subprocess.run')
-    def test_search_metadata(self, mock_run):
-        mock_output = json.dumps([
-            {"key": "test_key1", "value": "test_value1", "type": "string"},
-            {"key": "test_key2", "value": 42, "type": "int"}
+    def test_search_metadata(self):
+        write_gguf(self.gguf_file, [
+            ("test_key1", 4, "test_value1"),
+            ("test_key2", 2, 42),
+            ("other_key", 1, True),
         ])
-        mock_run.return_value = MagicMock(returncode=0, stdout=mock_output)
         result = self.cli.search_metadata(self.gguf_file, "test")
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0]["key"], "test_key1")
         self.assertEqual(result[1]["value"], 42)
-        mock_run.assert_called_once_with(
-            ["gguf_metadata_modifier", "search", self.gguf_file, "test"],
-            capture_output=True, text=True
-        )
 
     @patch('sys.stdout', new_callable=StringIO)
-    @patch('frontend.cli.subprocess.run')
-    def test_process_file_with_config(self, mock_run, mock_stdout):
-        mock_run.return_value = MagicMock(returncode=0)
+    def test_process_file_with_config(self, mock_stdout):
+        write_gguf(self.gguf_file, [
+            ("model_name", 4, "Old Model"),
+            ("unused_param", 2, 7),
+        ], trailer=b"TENSOR DATA")
         user_config = {
             "metadata_to_modify": [
                 {"key": "model_name", "value": "Test Model", "type": "string"}
@@ -96,15 +90,17 @@ class TestGGUFMetadataModifierFrontend(unittest.TestCase):
             ],
             "metadata_to_remove": ["unused_param"]
         }
-        self.cli.process_file_with_config(self.gguf_file, user_config)
-        
-        self.assertEqual(mock_run.call_count, 3)
-        modify_call, add_call, remove_call = mock_run.call_args_list
-        
-        self.assertEqual(modify_call[0][0], ["gguf_metadata_modifier", "modify", self.gguf_file, "model_name", "Test Model", "string"])
-        self.assertEqual(add_call[0][0], ["gguf_metadata_modifier", "modify", self.gguf_file, "custom_param", "0.5", "float"])
-        self.assertEqual(remove_call[0][0], ["gguf_metadata_modifier", "remove", self.gguf_file, "unused_param"])
-        
+        with patch('frontend.writer.write_metadata', wraps=write_metadata) as mock_write:
+            self.assertTrue(self.cli.process_file_with_config(self.gguf_file, user_config))
+        mock_write.assert_called_once()
+
+        self.assertEqual(read_metadata(self.gguf_file), [
+            {"key": "model_name", "value": "Test Model", "value_type": "4"},
+            {"key": "custom_param", "value": 0.5, "value_type": "3"},
+        ])
+        with open(self.gguf_file, 'rb') as f:
+            self.assertTrue(f.read().endswith(b"TENSOR DATA"))
+
         self.assertIn("Processing complete", mock_stdout.getvalue())
 
     @patch('frontend.cli.subprocess.run')
@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+import os
+from frontend.index import Clause, MetadataIndex, parse_query
+from test_reader import write_gguf
+
+
+def model_entries(architecture, context_length, name):
+    return [
+        ("general.architecture", 4, architecture),
+        ("general.name", 4, name),
+        (f"{architecture}.context_length", 2, context_length),
+        ("general.quantized", 1, True),
+    ]
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.files = {
+            "small": os.path.join(root, "small.gguf"),
+            "long": os.path.join(root, "long.gguf"),
+            "mistral": os.path.join(root, "mistral.gguf"),
+        }
+        write_gguf(self.files["small"], model_entries("llama", 4096, "Llama Small"))
+        write_gguf(self.files["long"], model_entries("llama", 32768, "Llama Long"))
+        write_gguf(self.files["mistral"], model_entries("mistral", 32768, "Mistral 7B"))
+        self.index = MetadataIndex(os.path.join(root, "index.sqlite"))
+        self.index.update(self.files.values())
+
+    def tearDown(self):
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query("a.b == llama and c>=3 AND d"), [
+            Clause("a.b", "==", "llama"), Clause("c", ">=", 3), Clause("d"),
+        ])
+        self.assertEqual(parse_query("general.name =~ '^Llama L'"), [Clause("general.name", "=~", "^Llama L")])
+        with self.assertRaises(ValueError):
+            parse_query("a == ")
+
+    def test_value_queries(self):
+        self.assertEqual(
+            self.index.query("general.architecture == llama and *.context_length >= 32768"),
+            [self.files["long"]],
+        )
+        self.assertEqual(self.index.query("general.quantized == true and llama.context_length < 5000"),
+                         [self.files["small"]])
+        self.assertEqual(self.index.query("general.name =~ '7B$'"), [self.files["mistral"]])
+
+    def test_key_queries(self):
+        self.assertEqual(self.index.query("mistral.*"), [self.files["mistral"]])
+        self.assertEqual(self.index.query("/^llama\\./"), sorted([self.files["small"], self.files["long"]]))
+
+    def test_incremental_update(self):
+        self.assertEqual(self.index.update(self.files.values()), (0, 0))
+        write_gguf(self.files["small"], model_entries("llama", 65536, "Llama Small v2"))
+        os.utime(self.files["small"], ns=(1, 1))
+        os.remove(self.files["mistral"])
+        self.assertEqual(self.index.update([self.files["small"], self.files["long"]]), (1, 1))
+        self.assertEqual(self.index.query("*.context_length >= 32768"),
+                         sorted([self.files["small"], self.files["long"]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import os
+import json
+from unittest.mock import patch
+from frontend import jsonio
+from frontend.reader import read_metadata
+from frontend.writer import encode_header
+
+
+class TestJsonIO(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        self.tokens = [f"tok_{i}" for i in range(10000)]
+        with open(self.gguf_file, 'wb') as f:
+            f.write(encode_header([
+                ("general.name", 4, "model"),
+                ("general.layers", 2, 32),
+                ("tokenizer.ggml.tokens", 5, self.tokens),
+                ("tokenizer.ggml.scores", 5, [i / 4 for i in range(10000)]),
+            ]) + b"TENSOR DATA")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_export_matches_read_metadata(self):
+        for name in ("out.json", "out.ndjson"):
+            self.assertEqual(jsonio.export_metadata(self.gguf_file, self.path(name)), 4)
+            with open(self.path(name)) as f:
+                if name.endswith(".ndjson"):
+                    exported = [json.loads(line) for line in f]
+                else:
+                    exported = json.load(f)
+            expected = [dict(item, value=item["value"].tolist() if item["value_type"] == "5" else item["value"])
+                        for item in read_metadata(self.gguf_file)]
+            self.assertEqual(exported, expected)
+
+    def test_chunked_array_parsing(self):
+        export_path = self.path("out.json")
+        jsonio.export_metadata(self.gguf_file, export_path)
+        with patch.object(jsonio, 'READ_CHUNK', 7):
+            entries = list(jsonio.iter_entries(export_path))
+        self.assertEqual([key for key, _, _ in entries][-2:], ["tokenizer.ggml.tokens", "tokenizer.ggml.scores"])
+        self.assertEqual(entries[2][1], self.tokens)
+
+    def test_round_trip_does_not_rewrite(self):
+        for name in ("out.json", "out.ndjson"):
+            jsonio.export_metadata(self.gguf_file, self.path(name))
+            with patch('frontend.writer.write_metadata') as mock_write:
+                self.assertEqual(jsonio.import_metadata(self.gguf_file, self.path(name)), (0, 0))
+            mock_write.assert_not_called()
+
+    def test_import_applies_only_differences(self):
+        export_path = self.path("out.ndjson")
+        jsonio.export_metadata(self.gguf_file, export_path)
+        with open(export_path) as f:
+            entries = [json.loads(line) for line in f]
+        entries[0]["value"] = "renamed"
+        del entries[1]
+        entries.append({"key": "general.new", "value": True, "value_type": "bool"})
+        with open(export_path, 'w') as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+        self.assertEqual(jsonio.import_metadata(self.gguf_file, export_path), (2, 1))
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.gguf_file)}
+        self.assertEqual(list(metadata), ["general.name", "tokenizer.ggml.tokens", "tokenizer.ggml.scores", "general.new"])
+        self.assertEqual(metadata["general.name"], "renamed")
+        self.assertEqual(metadata["tokenizer.ggml.tokens"].tolist(), self.tokens)
+        with open(self.gguf_file, 'rb') as f:
+            self.assertTrue(f.read().endswith(b"TENSOR DATA"))
+
+    def test_malformed_import(self):
+        export_path = self.path("bad.json")
+        with open(export_path, 'w') as f:
+            f.write('[{"key": "a", "value": 1, "value_type": "2"}, {"key": ')
+        with self.assertRaises(ValueError):
+            jsonio.import_metadata(self.gguf_file, export_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
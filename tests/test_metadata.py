@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import os
+from frontend.metadata import MetadataTable
+from frontend.reader import read_metadata
+from frontend.writer import MetadataTransaction
+from test_reader import write_gguf, SAMPLE_ENTRIES
+
+
+class TestMetadataTable(unittest.TestCase):
+
+    def test_behaves_like_an_ordered_dict(self):
+        table = MetadataTable.from_items([("a", 1, 2), ("b", "x", 4), ("c", 3.5, 3)])
+        self.assertEqual(list(table), ["a", "b", "c"])
+        self.assertEqual(table["b"], (4, "x"))
+        self.assertIsNone(table.get("missing"))
+        table["a"] = (2, 10)
+        table["d"] = (1, True)
+        del table["b"]
+        self.assertEqual(table.pop("missing", None), None)
+        self.assertNotIn("b", table)
+        self.assertEqual(len(table), 3)
+        # Updates keep their place; re-added keys go to the end, as with dict
+        table["b"] = (4, "y")
+        self.assertEqual(list(table.iter_entries()), [("a", 2, 10), ("c", 3, 3.5), ("d", 1, True), ("b", 4, "y")])
+        self.assertEqual(dict(table.items()), {"a": (2, 10), "c": (3, 3.5), "d": (1, True), "b": (4, "y")})
+
+    def test_compacts_after_many_deletes(self):
+        table = MetadataTable((f"key.{i}", (2, i)) for i in range(1000))
+        for i in range(0, 1000, 3):
+            table[f"key.{i}"] = (2, -i)
+        for i in range(1000):
+            if i % 3:
+                del table[f"key.{i}"]
+        self.assertLess(len(table._keys), 1000)
+        self.assertEqual(list(table.items()), [(f"key.{i}", (2, -i)) for i in range(0, 1000, 3)])
+
+    def test_snapshots_are_copy_on_write(self):
+        table = MetadataTable.from_items([("a", 1, 2), ("b", "x", 4)])
+        snapshot = table.snapshot()
+        self.assertIs(snapshot._values, table._values)
+        self.assertEqual(table.diff(snapshot), {})
+        table["a"] = (2, 2)
+        table["c"] = (4, "new")
+        del table["b"]
+        self.assertEqual(dict(snapshot.items()), {"a": (2, 1), "b": (4, "x")})
+        self.assertEqual(table.diff(snapshot), {"a": (2, 2), "c": (4, "new"), "b": None})
+        # Setting a value back to what it was is no change
+        table["a"] = (2, 1)
+        self.assertEqual(table.diff(snapshot), {"c": (4, "new"), "b": None})
+
+
+class TestTransactionChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_batch_edits_and_changes(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        for i in range(500):
+            transaction.set(f"batch.{i}", i, "int")
+        for i in range(0, 500, 2):
+            transaction.remove(f"batch.{i}")
+        transaction.remove("general.name")
+        changes = transaction.changes()
+        self.assertEqual(len(changes), 251)
+        self.assertIsNone(changes["general.name"])
+        self.assertTrue(transaction.commit())
+        self.assertEqual(transaction.changes(), {})
+
+        keys = [item["key"] for item in read_metadata(self.gguf_file)]
+        self.assertNotIn("general.name", keys)
+        self.assertEqual(keys[-250:], [f"batch.{i}" for i in range(1, 500, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import os
+import subprocess
+import sys
+from io import StringIO
+from unittest.mock import patch
+from frontend import output
+from frontend.config import Config, parse_config
+from frontend.cli import CLI
+from frontend.main import load_user_config, parse_arguments, run
+from frontend.output import PlainConsole, PlainTable
+from frontend.utils import load_default_config, save_config
+from test_reader import write_gguf, SAMPLE_ENTRIES
+from test_writer import write_model
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@patch('sys.stdout', new_callable=StringIO)
+class TestPlainConsole(unittest.TestCase):
+
+    def test_strips_only_package_markup(self, mock_stdout):
+        PlainConsole().print("[bold green]Done:[/bold green] [INST] [bos] [red]x")
+        self.assertEqual(mock_stdout.getvalue(), "Done: [INST] [bos] x\n")
+
+    def test_print_json(self, mock_stdout):
+        PlainConsole().print_json(data=[{"key": "a", "value": "é"}])
+        self.assertEqual(mock_stdout.getvalue(), '[\n  {\n    "key": "a",\n    "value": "é"\n  }\n]\n')
+
+    def test_tables_are_aligned_text(self, mock_stdout):
+        table = PlainTable("Sizes")
+        table.add_column("Name")
+        table.add_column("Bytes", justify="right")
+        table.add_row("[red]tok_embd", "1,024")
+        table.add_row("out", "8")
+        PlainConsole().print(table)
+        self.assertEqual(mock_stdout.getvalue(), "Sizes\nName      Bytes\n--------  -----\ntok_embd  1,024\nout           8\n")
+
+    def test_plain_mode_switches_the_shared_console(self, mock_stdout):
+        output.set_plain(True)
+        self.addCleanup(output.set_plain, False)
+        output.console.print("[green]ok")
+        self.assertEqual(mock_stdout.getvalue(), "ok\n")
+        with output.progress() as progress:
+            progress.update(progress.add_task("x", total=None), advance=1)
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_plain_search_never_imports_rich(self):
+        script = ("import sys; sys.argv = ['GE', '--plain', '-s', 'general', sys.argv[1]]\n"
+                  "from frontend.main import main\nmain()\n"
+                  "print('rich' in sys.modules or any(m.startswith('rich.') for m in sys.modules))")
+        completed = subprocess.run([sys.executable, "-c", script, self.gguf_file], cwd=ROOT, capture_output=True,
+                                   text=True, env=dict(os.environ, HOME=self.temp_dir.name))
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("Key: general.name", completed.stdout)
+        self.assertEqual(completed.stdout.splitlines()[-1], "False")
+
+    def test_plain_tables_never_import_rich(self):
+        write_model(self.gguf_file, [("general.name", 4, "model")], [("blk.0.weight", b"\1" * 64)])
+        for args in (["-t"], ["--dry-run"], ["--profile", "-t"]):
+            script = (f"import sys; sys.argv = ['GE', '--plain', *{args!r}, sys.argv[1]]\n"
+                      "from frontend.main import main\nmain()\n"
+                      "print('rich' in sys.modules or any(m.startswith('rich.') for m in sys.modules))")
+            completed = subprocess.run([sys.executable, "-c", script, self.gguf_file], cwd=ROOT, capture_output=True,
+                                       text=True, env=dict(os.environ, HOME=self.temp_dir.name))
+            self.assertEqual(completed.returncode, 0, completed.stderr)
+            self.assertNotIn("─", completed.stdout)
+            self.assertEqual(completed.stdout.splitlines()[-1], "False", args)
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_closes_the_cli(self, mock_stdout):
+        missing = os.path.join(self.temp_dir.name, "missing.gguf")
+        with patch.dict(os.environ, HOME=self.temp_dir.name), patch.object(CLI, "close") as close:
+            with patch('sys.argv', ['GE', '--plain', '-s', 'general', self.gguf_file]):
+                run(parse_arguments())
+            self.assertEqual(close.call_count, 1)
+            with patch('sys.argv', ['GE', '--plain', missing]), patch('logging.exception'):
+                with self.assertRaises(SystemExit):
+                    run(parse_arguments())
+            self.assertEqual(close.call_count, 2)
+
+    def test_config_file_is_parsed_once_with_its_comments(self):
+        config_path = os.path.join(self.temp_dir.name, "config.json")
+        save_config(config_path, load_default_config())
+        with open(config_path) as f:
+            self.assertIn("//", f.read())
+        with patch("frontend.config.parse_config", wraps=parse_config) as parse:
+            config = Config(config_path)
+            user_config = load_user_config(config)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(user_config["metadata_to_modify"][0]["key"], "model_name")
+        self.assertEqual(config.user_config.metadata_to_modify[0].key, "model_name")
+
+
+if __name__ == '__main__':
+    unittest.main()
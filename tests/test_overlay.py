@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import os
+import json
+import stat
+from io import StringIO
+from unittest.mock import patch
+from frontend.bulk import run_bulk
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.overlay import Overlay, overlay_path, read_merged_metadata
+from frontend.reader import read_metadata
+from test_writer import write_model
+
+ENTRIES = [("general.name", 4, "model"), ("general.layers", 2, 32), ("general.unused", 1, True)]
+
+
+class TestOverlay(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.models = os.path.join(self.temp_dir.name, "models")
+        os.mkdir(self.models)
+        self.gguf_file = os.path.join(self.models, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, [("a", b"\1" * 64)])
+        with open(self.gguf_file, 'rb') as f:
+            self.original = f.read()
+        self.config = Config(os.path.join(self.temp_dir.name, "config.json"))
+        self.config.user_config.overlay_mode = True
+        self.cli = CLI(self.config)
+
+    def tearDown(self):
+        self.cli.close()
+        os.chmod(self.models, stat.S_IRWXU)
+        self.temp_dir.cleanup()
+
+    def model_bytes(self):
+        with open(self.gguf_file, 'rb') as f:
+            return f.read()
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_edits_leave_model_untouched(self, mock_stdout):
+        with patch('frontend.cli.subprocess.run') as mock_run:
+            self.assertTrue(self.cli.modify_metadata(self.gguf_file, "general.name", "renamed", "string"))
+            self.assertTrue(self.cli.remove_metadata(self.gguf_file, "general.unused"))
+        mock_run.assert_not_called()
+        self.assertTrue(self.cli.process_file_with_config(self.gguf_file, {
+            "metadata_to_add": [{"key": "general.new", "value": "7", "type": "int"}],
+        }))
+        self.assertEqual(self.model_bytes(), self.original)
+        self.assertTrue(os.path.exists(overlay_path(self.gguf_file)))
+
+        expected = [
+            {"key": "general.name", "value": "renamed", "value_type": "4"},
+            {"key": "general.layers", "value": 32, "value_type": "2"},
+            {"key": "general.new", "value": 7, "value_type": "2"},
+        ]
+        self.assertEqual(self.cli.search_metadata(self.gguf_file, "general"), expected)
+        export_path = os.path.join(self.temp_dir.name, "export.json")
+        self.assertTrue(self.cli.export_metadata(self.gguf_file, export_path))
+        with open(export_path) as f:
+            self.assertEqual(json.load(f), expected)
+
+        self.assertTrue(self.cli.compact(self.gguf_file))
+        self.assertFalse(os.path.exists(overlay_path(self.gguf_file)))
+        self.assertEqual(read_metadata(self.gguf_file), expected)
+        with open(self.gguf_file, 'rb') as f:
+            self.assertTrue(f.read().endswith(b"\1" * 64))
+
+    def test_import_records_differences(self):
+        import_path = os.path.join(self.temp_dir.name, "import.json")
+        with open(import_path, 'w') as f:
+            json.dump([
+                {"key": "general.name", "value": "model", "value_type": "4"},
+                {"key": "general.layers", "value": 40, "value_type": "2"},
+            ], f)
+        self.assertTrue(self.cli.import_metadata(self.gguf_file, import_path))
+        self.assertEqual(self.model_bytes(), self.original)
+        overlay = Overlay(self.gguf_file)
+        self.assertEqual(overlay.edits, {"general.layers": (2, 40), "general.unused": None})
+
+    def test_read_only_model_with_overlay_dir(self):
+        overlay_dir = os.path.join(self.temp_dir.name, "overlays")
+        os.mkdir(overlay_dir)
+        os.chmod(self.models, stat.S_IRUSR | stat.S_IXUSR)
+        results = run_bulk([self.gguf_file], "apply", {
+            "user_config": {"metadata_to_modify": [{"key": "general.layers", "value": "64", "type": "int"}]},
+            "overlay": True, "overlay_dir": overlay_dir,
+        }, workers=1)
+        self.assertTrue(results[0].ok, results[0].error)
+        self.assertEqual(results[0].result, "recorded in overlay")
+        self.assertEqual(os.listdir(self.models), ["model.gguf"])
+        self.assertEqual(len(os.listdir(overlay_dir)), 1)
+        merged = {item["key"]: item["value"] for item in read_merged_metadata(self.gguf_file, overlay_dir)}
+        self.assertEqual(merged["general.layers"], 64)
+
+    def test_overlay_paths(self):
+        self.assertEqual(overlay_path("/m/a.gguf"), "/m/a.gguf.overlay.json")
+        first = overlay_path("/m/a.gguf", "/o")
+        self.assertTrue(first.startswith("/o/a.gguf."))
+        self.assertNotEqual(first, overlay_path("/n/a.gguf", "/o"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import tempfile
+import os
+from io import StringIO
+from unittest.mock import patch
+from frontend import profiling
+from frontend.bulk import apply_user_config, run_bulk
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.plan import compile_plan, config_hash, estimate
+from frontend.reader import read_metadata
+from test_writer import write_model
+
+ENTRIES = [("general.name", 4, "model"), ("general.layers", 2, 32), ("general.unused", 1, True)]
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, [("a", b"\1" * 64)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def model_bytes(self):
+        with open(self.gguf_file, 'rb') as f:
+            return f.read()
+
+    def test_coalesces_operations(self):
+        plan = compile_plan({
+            "metadata_to_modify": [
+                {"key": "general.name", "value": "first", "type": "string"},
+                {"key": "general.name", "value": "second", "type": "string"},
+                {"key": "general.unused", "value": False, "type": "bool"},
+            ],
+            "metadata_to_remove": ["general.unused"],
+        })
+        self.assertEqual(plan.requested, 4)
+        self.assertEqual(plan.edits, {"general.name": (4, "second"), "general.unused": None})
+
+    def test_type_errors_reported_up_front(self):
+        plan = compile_plan({"metadata_to_modify": [
+            {"key": "general.layers", "value": "many", "type": "int"},
+            {"key": "general.name", "value": "x", "type": "nonsense"},
+        ]})
+        self.assertEqual(len(plan.errors), 2)
+        with self.assertRaises(ValueError):
+            apply_user_config(self.gguf_file, {"metadata_to_modify": [
+                {"key": "general.layers", "value": "many", "type": "int"},
+            ]})
+        self.assertEqual(read_metadata(self.gguf_file)[1]["value"], 32)
+
+    def test_int_rejects_fractions_and_bools(self):
+        plan = compile_plan({"metadata_to_modify": [
+            {"key": "general.layers", "value": 3.7, "type": "int"},
+            {"key": "general.context", "value": True, "type": "int"},
+            {"key": "general.heads", "value": 8.0, "type": "int"},
+        ]})
+        self.assertEqual([error.split(":")[0] for error in plan.errors], ["general.layers", "general.context"])
+        self.assertEqual(plan.edits, {"general.heads": (2, 8)})
+
+    def test_cached_by_config_hash(self):
+        user_config = {"metadata_to_remove": ["general.unused"]}
+        self.assertIs(compile_plan(user_config), compile_plan(dict(user_config)))
+        self.assertNotEqual(config_hash(user_config), config_hash({"metadata_to_remove": ["general.name"]}))
+        # Settings outside the edit lists don't change the plan
+        self.assertEqual(config_hash(user_config), config_hash(dict(user_config, debug=True)))
+
+    def test_no_ops_do_not_write(self):
+        before = self.model_bytes()
+        user_config = {
+            "metadata_to_modify": [{"key": "general.layers", "value": 32, "type": "int"}],
+            "metadata_to_remove": ["general.missing"],
+        }
+        result = estimate(self.gguf_file, compile_plan(user_config))
+        self.assertEqual((result["no_ops"], result["bytes_written"]), (2, 0))
+        with profiling.profiling() as profiler:
+            self.assertFalse(apply_user_config(self.gguf_file, user_config))
+        self.assertNotIn("file.write", profiler.totals())
+        self.assertEqual(self.model_bytes(), before)
+
+    def check_estimate(self, user_config, in_place, slack=0):
+        result = estimate(self.gguf_file, compile_plan(user_config), slack)
+        before = self.model_bytes()
+        with profiling.profiling() as profiler:
+            apply_user_config(self.gguf_file, user_config, slack)
+        self.assertEqual(result["in_place"], in_place)
+        self.assertEqual(result["bytes_written"], profiler.counters["bytes_written"])
+        self.assertNotEqual(self.model_bytes(), before)
+
+    def test_estimate_matches_rewrite(self):
+        self.check_estimate({"metadata_to_add": [{"key": "general.extra", "value": "x" * 40, "type": "string"}]},
+                            in_place=False, slack=256)
+
+    def test_estimate_matches_in_place_patch(self):
+        apply_user_config(self.gguf_file, {"metadata_to_remove": ["general.unused"]}, slack=256)
+        self.check_estimate({"metadata_to_modify": [{"key": "general.name", "value": "renamed", "type": "string"}]},
+                            in_place=True)
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_cli_dry_run_leaves_file_alone(self, mock_stdout):
+        before = self.model_bytes()
+        cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+        try:
+            result = cli.dry_run(self.gguf_file, {"metadata_to_remove": ["general.unused", "general.missing"]})
+        finally:
+            cli.close()
+        self.assertEqual((result["removes"], result["no_ops"]), (1, 1))
+        self.assertEqual(self.model_bytes(), before)
+        self.assertIn("Bytes written", mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_cli_rejects_invalid_config_before_writing(self, mock_stdout):
+        before = self.model_bytes()
+        cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+        try:
+            self.assertFalse(cli.process_file_with_config(self.gguf_file, {
+                "metadata_to_modify": [{"key": "general.name", "value": "ok", "type": "string"},
+                                       {"key": "general.layers", "value": "many", "type": "int"}],
+            }))
+        finally:
+            cli.close()
+        self.assertEqual(self.model_bytes(), before)
+        self.assertIn("general.layers", mock_stdout.getvalue())
+
+    def test_bulk_plan_operation(self):
+        user_config = {"metadata_to_remove": ["general.unused"]}
+        results = run_bulk([self.gguf_file], "plan", {"user_config": user_config, "plan": compile_plan(user_config)},
+                           workers=1)
+        self.assertTrue(results[0].ok, results[0].error)
+        self.assertEqual(results[0].result["removes"], 1)
+        self.assertFalse(results[0].result["in_place"])
+
+
+if __name__ == '__main__':
+    unittest.main()
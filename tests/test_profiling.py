@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import os
+import json
+from io import StringIO
+from unittest.mock import patch
+from frontend import profiling
+from frontend.bulk import run_bulk
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.profiling import Profiler
+from test_writer import write_model
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled_spans_are_free(self):
+        self.assertIsNone(profiling.get_profiler())
+        self.assertIs(profiling.span("anything"), profiling.span("else"))
+        profiling.count("bytes_read", 10)
+
+    def test_spans_counters_and_hooks(self):
+        seen = []
+        with profiling.profiling() as profiler:
+            profiler.add_hook(seen.append)
+            with profiling.span("outer", file="a"):
+                with profiling.span("inner"):
+                    pass
+            profiling.count("rewrites")
+            profiling.count("rewrites", 2)
+        self.assertIsNone(profiling.get_profiler())
+        self.assertEqual([span.name for span in seen], ["inner", "outer"])
+        self.assertEqual(seen[1].args, {"file": "a"})
+        self.assertEqual(profiler.counters, {"rewrites": 3})
+        self.assertEqual(profiler.totals()["outer"]["count"], 1)
+
+        trace = profiler.to_chrome_trace()["traceEvents"]
+        self.assertEqual({event["ph"] for event in trace}, {"X", "C"})
+        merged = Profiler()
+        merged.merge(json.loads(json.dumps(profiler.to_json())))
+        self.assertEqual(len(merged.spans), 2)
+        self.assertEqual(merged.counters, {"rewrites": 3})
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, [("general.name", 4, "model"), ("general.layers", 2, 32)],
+                    [("a", b"\1" * 64), ("b", b"\2" * 128)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_process_file_records_phases(self, mock_stdout):
+        with profiling.profiling() as profiler:
+            cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+            cli.process_file_with_config(self.gguf_file, {
+                "metadata_to_modify": [{"key": "general.name", "value": "a much longer name", "type": "string"}],
+                "metadata_to_remove": ["general.layers"],
+            })
+            cli.close()
+        totals = profiler.totals()
+        for name in ("config.load", "header.parse", "apply.set", "apply.remove", "plan.compile", "file.write"):
+            self.assertIn(name, totals)
+        self.assertEqual(profiler.counters["rewrites"], 1)
+        self.assertEqual(profiler.counters["bytes_written"], os.path.getsize(self.gguf_file))
+
+    def test_bulk_workers_report_spans(self):
+        with profiling.profiling() as profiler:
+            results = run_bulk([self.gguf_file], "search", {"search_key": "general"}, workers=1)
+        self.assertTrue(results[0].ok)
+        self.assertIsNone(results[0].profile)
+        self.assertEqual(profiler.totals()["bulk.file"]["count"], 1)
+        self.assertIn("query.scan", profiler.totals())
+        self.assertNotEqual(profiler.spans[0].pid, os.getpid())
+
+
+if __name__ == '__main__':
+    unittest.main()
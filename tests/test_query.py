@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import os
+import struct
+from unittest.mock import patch
+from frontend.index import parse_query
+from frontend.query import MetadataQuery, search_metadata
+from frontend.reader import GGUFReader
+from frontend.writer import encode_header
+
+ENTRIES = [
+    ("general.architecture", 4, "llama"),
+    ("general.name", 4, "Tiny Llama chat"),
+    ("llama.context_length", 2, 4096),
+    ("llama.rope.freq_base", 3, 10000.0),
+    ("general.quantized", 1, True),
+    ("tokenizer.ggml.tokens", 5, [f"tok{i}" for i in range(2000)]),
+    ("tokenizer.ggml.scores", 5, [0.5] * 2000),
+    ("tokenizer.ggml.model", 4, "llama"),
+]
+
+
+class TestMetadataQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        with open(self.gguf_file, 'wb') as f:
+            f.write(encode_header(ENTRIES))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def keys(self, query):
+        return [item["key"] for item in MetadataQuery.parse(query).search(self.gguf_file)]
+
+    def test_key_patterns(self):
+        self.assertEqual(self.keys("general.name"), ["general.name"])
+        self.assertEqual(self.keys("tokenizer.*"),
+                         ["tokenizer.ggml.tokens", "tokenizer.ggml.scores", "tokenizer.ggml.model"])
+        self.assertEqual(self.keys("/^llama\\./"), ["llama.context_length", "llama.rope.freq_base"])
+
+    def test_value_predicates(self):
+        self.assertEqual(self.keys("llama.context_length >= 4096"), ["llama.context_length"])
+        self.assertEqual(self.keys("llama.context_length > 4096"), [])
+        self.assertEqual(self.keys("*.model == llama"), ["tokenizer.ggml.model"])
+        self.assertEqual(self.keys("general.name contains Llama"), ["general.name"])
+        self.assertEqual(self.keys("general.* =~ ^ll"), ["general.architecture"])
+        self.assertEqual(self.keys("general.quantized == true"), ["general.quantized"])
+        # Strings never compare with numbers
+        self.assertEqual(self.keys("general.name > 5"), [])
+
+    def test_type_filters(self):
+        self.assertEqual(self.keys("* is array"), ["tokenizer.ggml.tokens", "tokenizer.ggml.scores"])
+        self.assertEqual(self.keys("llama.* is float"), ["llama.rope.freq_base"])
+        with self.assertRaises(ValueError):
+            parse_query("* is tensor")
+
+    def test_results_summarize_arrays(self):
+        [item] = MetadataQuery.parse("tokenizer.ggml.tokens").search(self.gguf_file)
+        self.assertEqual(item, {"key": "tokenizer.ggml.tokens", "value_type": "5",
+                                "value": {"element_type": "string", "length": 2000}})
+
+    def test_plain_word_matches_within_keys(self):
+        self.assertEqual([item["key"] for item in search_metadata(self.gguf_file, "ggml.to")],
+                         ["tokenizer.ggml.tokens"])
+
+    def test_unmatched_values_are_skipped(self):
+        decoded = []
+        read_value = GGUFReader._read_value
+
+        def recording_read_value(reader, value_type, offset):
+            decoded.append(value_type)
+            return read_value(reader, value_type, offset)
+
+        with patch.object(GGUFReader, "_read_value", recording_read_value):
+            self.keys("tokenizer.ggml.model == llama")
+        self.assertEqual(decoded, [4])
+
+    def test_stops_once_exact_keys_are_found(self):
+        # Claim an extra entry whose bytes are garbage: reading that far would fail
+        with open(self.gguf_file, 'r+b') as f:
+            f.seek(16)
+            f.write(struct.pack("<Q", len(ENTRIES) + 1))
+            f.seek(0, os.SEEK_END)
+            f.write(b"\xff" * 8)
+        query = MetadataQuery.parse("general.name and llama.context_length >= 2048")
+        self.assertEqual(len(query.search(self.gguf_file)), 2)
+        self.assertTrue(query.matches(self.gguf_file))
+        with self.assertRaises(ValueError):
+            MetadataQuery.parse("general.*").search(self.gguf_file)
+
+    def test_matches_requires_every_clause(self):
+        self.assertTrue(MetadataQuery.parse("general.architecture == llama and * is array").matches(self.gguf_file))
+        self.assertFalse(MetadataQuery.parse("general.architecture == llama and missing.key").matches(self.gguf_file))
+
+    def test_search_requires_every_clause(self):
+        self.assertEqual(self.keys("general.architecture == llama and llama.context_length >= 2048"),
+                         ["general.architecture", "llama.context_length"])
+        self.assertEqual(self.keys("general.architecture == llama and llama.context_length >= 99999"), [])
+        self.assertEqual(search_metadata(self.gguf_file, "general.architecture == llama and missing.key"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import tempfile
+import os
+import struct
+from unittest.mock import patch
+from frontend.reader import GGUFArray, GGUFReader, read_metadata
+from frontend.writer import MetadataTransaction, encode_header
+
+
+def write_gguf(path, entries, version=1, tensor_count=0, trailer=b""):
+    """Write a GGUF file laid out the way GGUFFile::save does."""
+    out = bytearray(b"GGUF")
+    out += struct.pack("<IQQ", version, tensor_count, len(entries))
+    for key, value_type, value in entries:
+        encoded_key = key.encode('utf-8')
+        out += struct.pack("<Q", len(encoded_key)) + encoded_key
+        out += struct.pack("<I", value_type)
+        if value_type == 1:
+            out += struct.pack("<B", value)
+        elif value_type == 2:
+            out += struct.pack("<q", value)
+        elif value_type == 3:
+            out += struct.pack("<d", value)
+        elif value_type == 4:
+            encoded = value.encode('utf-8')
+            out += struct.pack("<Q", len(encoded)) + encoded
+    out += trailer
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+SAMPLE_ENTRIES = [
+    ("general.name", 4, "test model"),
+    ("general.layers", 2, 32),
+    ("general.rope_scale", 3, 0.5),
+    ("general.quantized", 1, True),
+    ("general.unused", 0, None),
+]
+
+
+class TestGGUFReader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "test.gguf")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_metadata(self):
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+        metadata = read_metadata(self.gguf_file)
+        self.assertEqual([item["key"] for item in metadata], [e[0] for e in SAMPLE_ENTRIES])
+        self.assertEqual(metadata[0], {"key": "general.name", "value": "test model", "value_type": "4"})
+        self.assertEqual(metadata[1]["value"], 32)
+        self.assertEqual(metadata[2]["value"], 0.5)
+        self.assertIs(metadata[3]["value"], True)
+        self.assertIsNone(metadata[4]["value"])
+
+    def test_header_fields(self):
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES, version=3, tensor_count=7, trailer=b"\0" * 16)
+        with GGUFReader(self.gguf_file) as reader:
+            self.assertEqual(reader.version, 3)
+            self.assertEqual(reader.tensor_count, 7)
+            self.assertEqual(reader.metadata_count, len(SAMPLE_ENTRIES))
+            self.assertEqual(reader.kv_end, reader.size - 16)
+
+    def test_invalid_magic(self):
+        with open(self.gguf_file, 'wb') as f:
+            f.write(b"This is not a GGUF file")
+        with self.assertRaises(ValueError):
+            read_metadata(self.gguf_file)
+
+    def test_empty_file(self):
+        open(self.gguf_file, 'wb').close()
+        with self.assertRaises(ValueError):
+            read_metadata(self.gguf_file)
+
+    def test_truncated_file(self):
+        write_gguf(self.gguf_file, SAMPLE_ENTRIES)
+        with open(self.gguf_file, 'r+b') as f:
+            f.truncate(os.path.getsize(self.gguf_file) - 4)
+        with self.assertRaises(ValueError):
+            read_metadata(self.gguf_file)
+
+
+class TestLazyArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "vocab.gguf")
+        self.tokens = [f"tok_{i}" for i in range(10000)]
+        with open(self.gguf_file, 'wb') as f:
+            f.write(encode_header([
+                ("general.name", 4, "vocab"),
+                ("tokenizer.ggml.tokens", 5, self.tokens),
+                ("tokenizer.ggml.scores", 5, [i / 2 for i in range(10000)]),
+                ("tokenizer.ggml.token_type", 5, list(range(10000))),
+                ("tokenizer.flags", 5, [True, False]),
+                ("general.empty", 5, []),
+            ]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_numeric_arrays_are_memoryviews(self):
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.gguf_file)}
+        scores = metadata["tokenizer.ggml.scores"]
+        self.assertEqual(len(scores), 10000)
+        self.assertIsInstance(scores.numbers, memoryview)
+        self.assertEqual(scores.numbers.format, 'd')
+        self.assertEqual(scores[3], 1.5)
+        self.assertEqual(metadata["tokenizer.ggml.token_type"].numbers[-1], 9999)
+        self.assertEqual(metadata["tokenizer.flags"].tolist(), [True, False])
+        self.assertEqual(metadata["general.empty"].tolist(), [])
+
+    def test_string_arrays_decode_on_demand(self):
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.gguf_file)}
+        tokens = metadata["tokenizer.ggml.tokens"]
+        self.assertEqual(repr(tokens), "<array string[10000]>")
+        self.assertIsNone(tokens._string_offsets)
+        self.assertEqual(tokens[5000], "tok_5000")
+        self.assertEqual(tokens[-1], "tok_9999")
+        self.assertEqual(tokens[1:3], ["tok_1", "tok_2"])
+        self.assertEqual(tokens.tolist(), self.tokens)
+
+    def test_unrelated_edit_keeps_arrays_undecoded(self):
+        with patch.object(GGUFArray, '_string_at', side_effect=AssertionError("decoded")), \
+                patch.object(GGUFArray, '__iter__', side_effect=AssertionError("decoded")):
+            transaction = MetadataTransaction(self.gguf_file)
+            transaction.set("general.name", "renamed", "string")
+            transaction.commit()
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.gguf_file)}
+        self.assertEqual(metadata["general.name"], "renamed")
+        self.assertEqual(metadata["tokenizer.ggml.tokens"].tolist(), self.tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
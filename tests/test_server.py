@@ -0,0 +1,162 @@
+import unittest
+import tempfile
+import os
+import json
+import socket
+import threading
+import http.client
+from unittest.mock import patch
+from frontend import server
+from frontend.server import HeaderCache, make_server, parse_address
+from frontend.writer import MetadataTransaction
+from test_writer import write_model
+
+ENTRIES = [("general.architecture", 4, "llama"), ("llama.context_length", 2, 4096),
+           ("tokenizer.chat_template", 4, "{{ messages }}")]
+TENSORS = [("a", b"\0" * 64), ("b", b"\1" * 32)]
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestHeaderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, TENSORS)
+        self.cache = HeaderCache(max_entries=2, workers=2)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_hit_until_file_changes(self):
+        header = self.cache.get(self.gguf_file)
+        self.assertIs(self.cache.get(self.gguf_file), header)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("llama.context_length", 8192, "int")
+        transaction.commit()
+        items = {key: value for key, value, _ in self.cache.get(self.gguf_file).items}
+        self.assertEqual(items["llama.context_length"], 8192)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_least_recently_used_is_evicted(self):
+        paths = [self.gguf_file]
+        for name in ("b.gguf", "c.gguf"):
+            paths.append(os.path.join(self.temp_dir.name, name))
+            write_model(paths[-1], ENTRIES, TENSORS)
+        for path in paths:
+            self.cache.get(path)
+        self.cache.get(paths[2])
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.cache.get(paths[0])
+        self.assertEqual(self.cache.stats()["misses"], 4)
+
+    def test_concurrent_lookups_share_one_parse(self):
+        parse = server._parse
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_parse(path, identity):
+            calls.append(path)
+            started.set()
+            release.wait(5)
+            return parse(path, identity)
+
+        with patch.object(server, "_parse", slow_parse):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(self.cache.get(self.gguf_file)))
+                       for _ in range(4)]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            # Let the waiters reach the pending parse before it finishes
+            while self.cache.stats()["coalesced"] < 3:
+                threading.Event().wait(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_failed_parse_is_not_cached(self):
+        path = os.path.join(self.temp_dir.name, "bad.gguf")
+        with open(path, 'wb') as f:
+            f.write(b"nope" * 8)
+        with self.assertRaises(ValueError):
+            self.cache.get(path)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        write_model(self.gguf_file, ENTRIES, TENSORS)
+        self.cache = HeaderCache()
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def start(self, address):
+        httpd = make_server(address, self.cache)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join(5)
+        self.addCleanup(stop)
+        return httpd
+
+    def get(self, connection, path):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_http_endpoints(self):
+        httpd = self.start("127.0.0.1:0")
+        connection = http.client.HTTPConnection(*httpd.server_address)
+        self.addCleanup(connection.close)
+        status, body = self.get(connection, f"/search?path={self.gguf_file}&q=context_length")
+        self.assertEqual((status, [item["key"] for item in body]), (200, ["llama.context_length"]))
+        status, body = self.get(connection, f"/metadata?path={self.gguf_file}")
+        self.assertEqual(body[0], {"key": "general.architecture", "value": "llama", "value_type": "4"})
+        status, body = self.get(connection, f"/tensors?path={self.gguf_file}")
+        self.assertEqual(body["tensor_count"], 2)
+        self.assertEqual(self.get(connection, "/stats")[1]["hits"], 2)
+        self.assertEqual(self.get(connection, "/search?q=x")[0], 400)
+        self.assertEqual(self.get(connection, "/metadata?path=/missing.gguf")[0], 404)
+        self.assertEqual(self.get(connection, "/nothing")[0], 404)
+
+    def test_unix_socket(self):
+        socket_path = os.path.join(self.temp_dir.name, "gguf.sock")
+        self.start(f"unix:{socket_path}")
+        connection = _UnixConnection(socket_path)
+        self.addCleanup(connection.close)
+        status, body = self.get(connection, f"/search?path={self.gguf_file}&q=tokenizer.chat_template")
+        self.assertEqual(body[0]["value"], "{{ messages }}")
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("unix:/tmp/x.sock"), (socket.AF_UNIX, "/tmp/x.sock"))
+        self.assertEqual(parse_address("8080"), (socket.AF_INET, ("127.0.0.1", 8080)))
+        with self.assertRaises(ValueError):
+            parse_address("localhost:http")
+
+
+if __name__ == '__main__':
+    unittest.main()
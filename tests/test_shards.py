@@ -0,0 +1,187 @@
+import unittest
+import tempfile
+import os
+from io import StringIO
+from unittest.mock import patch
+from frontend.bulk import run_bulk
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.query import search_metadata
+from frontend.reader import read_metadata
+from frontend.shards import ShardSet, first_shards, shard_paths
+from frontend.utils import validate_gguf_file
+from frontend.writer import MetadataTransaction, recover, write_metadata
+from test_writer import write_model
+
+SHARD_COUNT = 3
+
+
+def metadata(path):
+    return {item["key"]: item["value"] for item in read_metadata(path)}
+
+
+class TestShardSet(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(SHARD_COUNT):
+            path = os.path.join(self.temp_dir.name, f"model-{i + 1:05d}-of-{SHARD_COUNT:05d}.gguf")
+            entries = [("split.no", 2, i), ("split.count", 2, SHARD_COUNT)]
+            if i == 0:
+                # Model metadata lives in the first shard, as gguf-split writes it
+                entries += [("general.name", 4, "model"), ("general.layers", 2, 32)]
+            write_model(path, entries, [(f"blk.{i}.weight", bytes([i]) * 64), (f"blk.{i}.bias", b"\1" * 16)])
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_detects_set(self):
+        self.assertEqual(shard_paths(self.paths[1]), self.paths)
+        self.assertIsNone(shard_paths(os.path.join(self.temp_dir.name, "model.gguf")))
+        self.assertEqual(first_shards(self.paths + ["other.gguf"]), [self.paths[0], "other.gguf"])
+        os.remove(self.paths[2])
+        with self.assertRaises(ValueError):
+            shard_paths(self.paths[0])
+        self.assertFalse(validate_gguf_file(self.paths[0]))
+
+    def test_merged_metadata_and_tensors(self):
+        shards = ShardSet.open(self.paths[2])
+        merged = {item["key"]: item["value"] for item in shards.metadata()}
+        self.assertEqual(merged["general.name"], "model")
+        # Per-shard keys come from the first shard
+        self.assertEqual(merged["split.no"], 0)
+        self.assertEqual(shards.carriers("split.count"), self.paths)
+        summary = shards.tensor_summary()
+        self.assertEqual(summary["tensor_count"], 2 * SHARD_COUNT)
+        self.assertEqual(summary["total_bytes"], SHARD_COUNT * 80)
+        self.assertEqual(summary["shard_count"], SHARD_COUNT)
+        self.assertEqual(summary["problems"], [])
+
+    def test_apply_touches_only_carrying_shards(self):
+        before = [os.stat(path).st_mtime_ns for path in self.paths]
+        rewritten = ShardSet(self.paths).apply({
+            "metadata_to_modify": [{"key": "general.name", "value": "renamed", "type": "string"}],
+            "metadata_to_add": [{"key": "general.extra", "value": "x", "type": "string"}],
+            "metadata_to_remove": ["general.missing"],
+        }, verify=True)
+        self.assertEqual(rewritten, self.paths[:1])
+        self.assertEqual(metadata(self.paths[0])["general.name"], "renamed")
+        self.assertEqual(metadata(self.paths[0])["general.extra"], "x")
+        self.assertEqual([os.stat(path).st_mtime_ns for path in self.paths[1:]], before[1:])
+
+    def test_keys_on_every_shard_are_edited_everywhere(self):
+        for path in self.paths:
+            transaction = MetadataTransaction(path)
+            transaction.set("general.license", "mit", "string")
+            transaction.commit()
+        ShardSet(self.paths).apply({"metadata_to_modify": [{"key": "general.license", "value": "apache",
+                                                            "type": "string"}]})
+        self.assertEqual([metadata(path)["general.license"] for path in self.paths], ["apache"] * SHARD_COUNT)
+
+    def test_failed_shard_leaves_the_whole_set_unchanged(self):
+        for path in self.paths:
+            transaction = MetadataTransaction(path)
+            transaction.set("general.license", "mit", "string")
+            transaction.commit()
+        before = [open(path, 'rb').read() for path in self.paths]
+        real_write = write_metadata
+
+        def fail_last_shard(path, *args, **kwargs):
+            if path == self.paths[-1]:
+                raise OSError("disk full")
+            return real_write(path, *args, **kwargs)
+
+        with patch('frontend.shards.write_metadata', side_effect=fail_last_shard):
+            with self.assertRaisesRegex(RuntimeError, "disk full"):
+                ShardSet(self.paths).apply({"metadata_to_modify": [{"key": "general.license", "value": "apache",
+                                                                    "type": "string"}]})
+        self.assertEqual([open(path, 'rb').read() for path in self.paths], before)
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), sorted(map(os.path.basename, self.paths)))
+
+    def license_with_slack(self):
+        for path in self.paths:
+            transaction = MetadataTransaction(path)
+            transaction.set("general.license", "mit", "string")
+            transaction.commit(slack=256)
+        return {"metadata_to_modify": [{"key": "general.license", "value": "apache", "type": "string"}]}
+
+    def test_edits_that_fit_patch_shard_headers_in_place(self):
+        user_config = self.license_with_slack()
+        inodes = [os.stat(path).st_ino for path in self.paths]
+        with patch('frontend.writer.tempfile.mkstemp') as mock_mkstemp, \
+                patch('frontend.shards.tempfile.mkstemp') as mock_stage:
+            self.assertEqual(ShardSet(self.paths).apply(user_config, slack=256, verify=True), self.paths)
+        mock_mkstemp.assert_not_called()
+        mock_stage.assert_not_called()
+        self.assertEqual([os.stat(path).st_ino for path in self.paths], inodes)
+        self.assertEqual([metadata(path)["general.license"] for path in self.paths], ["apache"] * SHARD_COUNT)
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), sorted(map(os.path.basename, self.paths)))
+
+    def test_failed_patch_rolls_back_patched_shards(self):
+        user_config = self.license_with_slack()
+        before = [open(path, 'rb').read() for path in self.paths]
+        real_write = write_metadata
+
+        def fail_last_shard(path, *args, **kwargs):
+            if path == self.paths[-1]:
+                raise OSError("disk full")
+            return real_write(path, *args, **kwargs)
+
+        with patch('frontend.shards.write_metadata', side_effect=fail_last_shard):
+            with self.assertRaisesRegex(RuntimeError, "disk full"):
+                ShardSet(self.paths).apply(user_config, slack=256)
+        self.assertEqual([open(path, 'rb').read() for path in self.paths], before)
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), sorted(map(os.path.basename, self.paths)))
+
+    def test_failed_rename_puts_replaced_shards_back(self):
+        user_config = self.license_with_slack()
+        # The first shard's edit no longer fits its header, so it is rewritten and renamed
+        user_config["metadata_to_add"] = [{"key": "general.description", "value": "x" * 1024, "type": "string"}]
+        before = [open(path, 'rb').read() for path in self.paths]
+        real_replace = os.replace
+
+        def fail_rewrite(src, dst):
+            if src.endswith(".gguf.tmp") and dst == self.paths[0]:
+                raise OSError("rename failed")
+            real_replace(src, dst)
+
+        with patch('frontend.shards.recover', wraps=recover) as mock_recover, \
+                patch('os.replace', side_effect=fail_rewrite):
+            with self.assertRaisesRegex(RuntimeError, "rename failed"):
+                ShardSet(self.paths).apply(user_config, slack=256)
+        self.assertEqual(mock_recover.call_count, SHARD_COUNT - 1)
+        self.assertEqual([open(path, 'rb').read() for path in self.paths], before)
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), sorted(map(os.path.basename, self.paths)))
+
+    def test_split_keys_and_bad_configs_write_nothing(self):
+        before = [os.stat(path).st_mtime_ns for path in self.paths]
+        with self.assertRaises(ValueError):
+            ShardSet(self.paths).apply({"metadata_to_remove": ["split.count"]})
+        with self.assertRaises(ValueError):
+            ShardSet(self.paths).apply({"metadata_to_modify": [{"key": "general.layers", "value": "x",
+                                                                "type": "int"}]})
+        self.assertEqual([os.stat(path).st_mtime_ns for path in self.paths], before)
+
+    def test_search_and_bulk_use_the_whole_set(self):
+        self.assertEqual([item["key"] for item in search_metadata(self.paths[2], "general.name")], ["general.name"])
+        user_config = {"metadata_to_add": [{"key": "general.extra", "value": "x", "type": "string"}]}
+        [result] = run_bulk(first_shards(self.paths), "apply", {"user_config": user_config}, workers=1)
+        self.assertEqual(result.result, f"rewritten 1 of {SHARD_COUNT} shards")
+        self.assertNotIn("general.extra", metadata(self.paths[1]))
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_cli_edits_the_set(self, mock_stdout):
+        cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+        self.addCleanup(cli.close)
+        self.assertTrue(validate_gguf_file(self.paths[1]))
+        self.assertTrue(cli.modify_metadata(self.paths[1], "general.layers", "40", "int"))
+        self.assertEqual(metadata(self.paths[0])["general.layers"], 40)
+        self.assertTrue(cli.remove_metadata(self.paths[2], "general.layers"))
+        self.assertNotIn("general.layers", metadata(self.paths[0]))
+        self.assertEqual(cli.tensor_summary(self.paths[0])["tensor_count"], 2 * SHARD_COUNT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import tempfile
+import json
+import os
+from io import StringIO
+from unittest.mock import patch
+from frontend.checksum import tensor_checksum
+from frontend.cli import CLI
+from frontend.config import Config
+from frontend.query import search_metadata
+from frontend.reader import GGUFReader, json_default, read_metadata
+from frontend.shards import tensor_summary
+from frontend.stub import extract_stub, read_stub, replay_stub
+from frontend.writer import MetadataTransaction
+from test_writer import write_model
+
+ENTRIES = [("general.name", 4, "model"), ("general.layers", 2, 32), ("general.tags", 5, [1, 2, 3])]
+
+
+def metadata(path):
+    return {item["key"]: item["value"] for item in read_metadata(path)}
+
+
+def dump(path):
+    return json.dumps(read_metadata(path), default=json_default)
+
+
+class TestStub(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model = os.path.join(self.temp_dir.name, "model.gguf")
+        self.stub = os.path.join(self.temp_dir.name, "stub.gguf")
+        self.data = write_model(self.model, ENTRIES, [("blk.0.weight", b"\1" * 4096), ("blk.1.weight", b"\2" * 64)])
+        self.info = extract_stub(self.model, self.stub)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stub_reads_like_the_model(self):
+        with GGUFReader(self.stub) as reader:
+            self.assertEqual(os.path.getsize(self.stub), reader.data_offset)
+        self.assertEqual(self.info.data_size, len(self.data))
+        self.assertEqual(dump(self.stub), dump(self.model))
+        self.assertEqual(read_stub(self.stub), self.info)
+        self.assertIsNone(read_stub(self.model))
+        self.assertEqual(search_metadata(self.stub, "general"), search_metadata(self.model, "general"))
+        summary = tensor_summary(self.stub)
+        self.assertEqual(summary["problems"], [])
+        self.assertEqual(summary, tensor_summary(self.model))
+        self.assertEqual(tensor_checksum(self.stub).root, tensor_checksum(self.model).root)
+        with self.assertRaises(ValueError):
+            extract_stub(self.stub, os.path.join(self.temp_dir.name, "again.gguf"))
+
+    def test_edits_keep_the_stub_record(self):
+        transaction = MetadataTransaction(self.stub)
+        transaction.set("general.name", "renamed", 4)
+        transaction.set("general.new", 7, 2)
+        transaction.commit()
+        self.assertEqual(read_stub(self.stub), self.info)
+        self.assertEqual(metadata(self.stub)["general.name"], "renamed")
+
+    def test_replay_in_place_and_to_output(self):
+        transaction = MetadataTransaction(self.stub)
+        transaction.set("general.name", "renamed", 4)
+        transaction.remove("general.layers")
+        transaction.commit(slack=64)
+
+        output_path = os.path.join(self.temp_dir.name, "out.gguf")
+        self.assertTrue(replay_stub(self.stub, self.model, output_path=output_path))
+        self.assertEqual(metadata(self.model)["general.name"], "model")
+        self.assertEqual(dump(output_path), dump(self.stub))
+        self.assertEqual(tensor_checksum(output_path).root, self.info.checksum)
+
+        checksum = tensor_checksum(self.model)
+        self.assertTrue(replay_stub(self.stub, self.model, checksum=checksum))
+        self.assertEqual(dump(self.model), dump(self.stub))
+        self.assertEqual(tensor_checksum(self.model).root, self.info.checksum)
+        # Replaying again finds nothing to do
+        self.assertFalse(replay_stub(self.stub, self.model))
+
+    def test_replay_refuses_a_changed_model(self):
+        transaction = MetadataTransaction(self.model)
+        transaction.set("general.layers", 40, 2)
+        transaction.commit()
+        with self.assertRaises(ValueError):
+            replay_stub(self.stub, self.model)
+        other = os.path.join(self.temp_dir.name, "other.gguf")
+        write_model(other, ENTRIES, [("blk.0.weight", b"\3" * 64)])
+        with self.assertRaises(ValueError):
+            replay_stub(self.stub, other)
+        with self.assertRaises(ValueError):
+            replay_stub(self.model, self.model)
+
+
+@patch('sys.stdout', new_callable=StringIO)
+class TestStubCLI(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model = os.path.join(self.temp_dir.name, "model.gguf")
+        self.stub = os.path.join(self.temp_dir.name, "stub.gguf")
+        write_model(self.model, ENTRIES, [("blk.0.weight", b"\1" * 256)])
+        self.cli = CLI(Config(os.path.join(self.temp_dir.name, "config.json")))
+        self.addCleanup(self.cli.close)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_extract_edit_replay(self, mock_stdout):
+        self.assertTrue(self.cli.extract_stub(self.model, self.stub))
+        self.assertEqual(self.cli.checksum(self.stub), self.cli.checksum(self.model))
+        self.assertEqual(self.cli.tensor_summary(self.stub)["problems"], [])
+        transaction = MetadataTransaction(self.stub)
+        transaction.set("general.name", "renamed", 4)
+        transaction.commit()
+        self.assertTrue(self.cli.replay_stub(self.model, self.stub))
+        self.assertEqual(metadata(self.model)["general.name"], "renamed")
+        self.assertFalse(self.cli.replay_stub(self.stub, self.model))
+        self.assertIn("Not a header-only stub", mock_stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import tempfile
+import os
+import struct
+from frontend.reader import GGUFReader
+from frontend.tensors import read_tensors
+from frontend.writer import encode_header
+from test_reader import SAMPLE_ENTRIES
+from test_writer import write_model
+
+
+class TestTensorTable(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_descriptors_and_summary(self):
+        write_model(self.gguf_file, SAMPLE_ENTRIES, [("tok_embd", b"\0" * 256), ("output", b"\0" * 64)])
+        table = read_tensors(self.gguf_file)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table[0].name, "tok_embd")
+        self.assertEqual(table[0].shape, (64,))
+        self.assertEqual(table[0].dtype, "F32")
+        self.assertEqual(table.find("output").offset, 256)
+        self.assertIsNone(table.find("missing"))
+        summary = table.summary()
+        self.assertEqual(summary["parameter_count"], 80)
+        self.assertEqual(summary["bytes_by_dtype"], {"F32": 320})
+        self.assertEqual(summary["largest"][0]["name"], "tok_embd")
+        self.assertEqual(summary["problems"], [])
+
+    def test_parsed_lazily(self):
+        write_model(self.gguf_file, SAMPLE_ENTRIES, [("a", b"\0" * 32)])
+        with GGUFReader(self.gguf_file) as reader:
+            self.assertIsNone(reader._tensors)
+            self.assertIs(reader.tensors, reader.tensors)
+
+    def test_validate_reports_bad_offsets(self):
+        info = b""
+        for name, dims, dtype, offset in [("q", (256,), 2, 0), ("k", (64,), 0, 100), ("v", (1000,), 0, 160)]:
+            info += struct.pack("<Q", len(name)) + name.encode()
+            info += struct.pack("<I", len(dims)) + struct.pack(f"<{len(dims)}Q", *dims)
+            info += struct.pack("<IQ", dtype, offset)
+        header = encode_header(SAMPLE_ENTRIES, tensor_count=3) + info
+        with open(self.gguf_file, 'wb') as f:
+            f.write(header + b"\0" * (-len(header) % 32) + b"\0" * 512)
+        problems = read_tensors(self.gguf_file).validate()
+        self.assertTrue(any("k: offset 100 is not aligned" in p for p in problems))
+        self.assertTrue(any("v: data runs past the end" in p for p in problems))
+        self.assertTrue(any("v: overlaps k" in p for p in problems))
+
+    def test_many_tensors(self):
+        tensors = [(f"blk.{i}.attn_q.weight", b"\0" * 32) for i in range(5000)]
+        write_model(self.gguf_file, SAMPLE_ENTRIES, tensors)
+        table = read_tensors(self.gguf_file)
+        self.assertEqual(len(table), 5000)
+        self.assertEqual(table.parameter_count(), 5000 * 8)
+        self.assertEqual(table[-1].name, "blk.4999.attn_q.weight")
+
+
+if __name__ == '__main__':
+    unittest.main()
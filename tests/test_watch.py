@@ -0,0 +1,149 @@
+import unittest
+import tempfile
+import os
+import threading
+import time
+from frontend.reader import read_metadata
+from frontend.watch import Journal, Watcher
+from test_reader import write_gguf, SAMPLE_ENTRIES
+from test_writer import write_model
+
+USER_CONFIG = {"metadata_to_modify": [{"key": "general.name", "value": "watched", "type": "string"}]}
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "models")
+        os.makedirs(os.path.join(self.root, "nested"))
+        self.files = [os.path.join(self.root, "a.gguf"), os.path.join(self.root, "nested", "b.gguf")]
+        for path in self.files:
+            write_gguf(path, SAMPLE_ENTRIES)
+        self.journal = Journal(os.path.join(self.temp_dir.name, "journal.sqlite"))
+
+    def tearDown(self):
+        self.journal.close()
+        self.temp_dir.cleanup()
+
+    def watcher(self, user_config=USER_CONFIG, **kwargs):
+        kwargs.setdefault("settle", 0)
+        kwargs.setdefault("interval", 0.01)
+        kwargs.setdefault("workers", 1)
+        watcher = Watcher([self.root], user_config, self.journal, **kwargs)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def run_once(self, user_config=USER_CONFIG, **kwargs):
+        results = []
+        self.watcher(user_config, **kwargs).run(once=True, on_result=results.append)
+        return sorted(result.path for result in results)
+
+    def name_of(self, path):
+        return next(item["value"] for item in read_metadata(path) if item["key"] == "general.name")
+
+    def test_processes_each_file_once(self):
+        self.assertEqual(self.run_once(), self.files)
+        self.assertEqual([self.name_of(path) for path in self.files], ["watched", "watched"])
+        # Our own rewrites are journaled, so a restart has nothing to do
+        self.assertEqual(self.run_once(), [])
+        self.assertTrue(all(ok for _, _, ok, _ in self.journal.entries()))
+
+    def test_split_model_is_processed_once_as_a_set(self):
+        shards = [os.path.join(self.root, f"split-{i:05d}-of-00003.gguf") for i in (1, 2, 3)]
+        for i, path in enumerate(shards):
+            entries = [("split.no", 2, i), ("split.count", 2, 3)] + ([("general.name", 4, "model")] if i == 0 else [])
+            write_model(path, entries, [(f"blk.{i}.weight", b"\1" * 64)])
+        self.assertEqual(self.run_once(), sorted([shards[0]] + self.files))
+        self.assertEqual(self.name_of(shards[0]), "watched")
+        self.assertEqual(sorted(path for path, _, _, _ in self.journal.entries()), sorted(shards + self.files))
+        # A change to a later shard brings back the whole set, through that shard
+        write_model(shards[2], [("split.no", 2, 2), ("split.count", 2, 3)], [("blk.2.weight", b"\2" * 64)])
+        self.assertEqual(self.run_once(), [shards[2]])
+        # Every shard keeps its own overlay, so each is processed on its own
+        self.assertEqual(self.run_once({"metadata_to_remove": ["general.version"]}, overlay=True),
+                         sorted(shards + self.files))
+
+    def test_only_new_or_changed_files_are_processed(self):
+        self.run_once()
+        write_gguf(self.files[1], SAMPLE_ENTRIES)
+        added = os.path.join(self.root, "nested", "c.gguf")
+        write_gguf(added, SAMPLE_ENTRIES)
+        self.assertEqual(self.run_once(), [self.files[1], added])
+
+    def test_config_change_reprocesses_everything(self):
+        self.run_once()
+        other = {"metadata_to_remove": ["general.version"]}
+        self.assertEqual(self.run_once(other), self.files)
+
+    def test_failures_are_not_retried_until_the_file_changes(self):
+        broken = os.path.join(self.root, "broken.gguf")
+        with open(broken, 'wb') as f:
+            f.write(b"not a model")
+        results = []
+        self.watcher().run(once=True, on_result=results.append)
+        self.assertEqual([r.path for r in results if not r.ok], [broken])
+        self.assertEqual(self.run_once(), [])
+        write_gguf(broken, SAMPLE_ENTRIES)
+        self.assertEqual(self.run_once(), [broken])
+
+    def check_incremental(self, use_inotify):
+        watcher = self.watcher(settle=60, use_inotify=use_inotify)
+        self.assertEqual(watcher.poll(), [])
+        watcher.settle = 0
+        self.assertEqual(watcher.poll(), self.files)
+        # A file appearing in a new subdirectory and a file going away
+        os.makedirs(os.path.join(self.root, "new"))
+        added = os.path.join(self.root, "new", "c.gguf")
+        write_gguf(added, SAMPLE_ENTRIES)
+        os.unlink(self.files[0])
+        if use_inotify:
+            watcher._wait(1.0)
+        self.assertEqual(watcher.poll(), [added])
+        self.assertNotIn(self.files[0], watcher._dir_files[self.root])
+
+    def test_polling_rescans_only_changed_directories(self):
+        self.check_incremental(use_inotify=False)
+
+    def test_inotify(self):
+        watcher = self.watcher()
+        if not watcher.uses_inotify:
+            self.skipTest("inotify not available")
+        self.check_incremental(use_inotify=True)
+
+    def test_debounces_files_still_being_written(self):
+        self.run_once()
+        watcher = self.watcher(settle=0.2, use_inotify=False)
+        self.assertEqual(watcher.poll(), [])
+        growing = os.path.join(self.root, "growing.gguf")
+        with open(growing, 'wb') as f:
+            f.write(b"GG")
+        self.assertEqual(watcher.poll(), [])
+        time.sleep(0.15)
+        with open(growing, 'ab') as f:
+            f.write(b"UF")
+        time.sleep(0.15)
+        # Changed since it was first seen, so the settle clock restarted
+        self.assertEqual(watcher.poll(), [])
+        time.sleep(0.25)
+        self.assertEqual(watcher.poll(), [growing])
+
+    def test_stop_finishes_gracefully(self):
+        watcher = self.watcher(interval=0.05)
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while len(self.journal.entries()) < len(self.files) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        watcher.stop()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(self.journal.entries()), len(self.files))
+
+    def test_rejects_invalid_config(self):
+        with self.assertRaises(ValueError):
+            Watcher([self.root], {"metadata_to_add": [{"key": "x", "value": "y", "type": "int"}]}, self.journal)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import os
+import sys
+from frontend.workers import WorkerPool, WorkerError
+
+FAKE_WORKER = '''#!{python}
+import json, os, sys, time
+marker = {marker!r}
+for line in sys.stdin:
+    request = json.loads(line)
+    command, *args = request["args"]
+    if command == "crash_once" and not os.path.exists(marker):
+        open(marker, "w").close()
+        sys.exit(1)
+    if command == "hang":
+        time.sleep(60)
+    if command == "fail":
+        response = {{"id": request["id"], "ok": False, "error": "boom"}}
+    elif command == "wrong_id":
+        response = {{"id": request["id"] + 1000, "ok": True, "result": []}}
+    else:
+        response = {{"id": request["id"], "ok": True, "result": [os.getpid()] + args}}
+    sys.stdout.write(json.dumps(response) + "\\n")
+    sys.stdout.flush()
+'''
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.binary = os.path.join(self.temp_dir.name, "fake_worker")
+        with open(self.binary, 'w') as f:
+            f.write(FAKE_WORKER.format(python=sys.executable, marker=os.path.join(self.temp_dir.name, "crashed")))
+        os.chmod(self.binary, 0o755)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_workers_stay_warm(self):
+        with WorkerPool(self.binary, size=1, timeout=10) as pool:
+            first = pool.request("echo", "a")
+            second = pool.request("echo", "b")
+        self.assertEqual(first[1:], ["a"])
+        self.assertEqual(second[1:], ["b"])
+        self.assertEqual(first[0], second[0])
+
+    def test_backend_error_is_not_retried(self):
+        with WorkerPool(self.binary, size=1, timeout=10, retry_attempts=3) as pool:
+            with self.assertRaises(WorkerError):
+                pool.request("fail")
+            self.assertEqual(pool.request("echo")[1:], [])
+
+    def test_crashed_worker_is_restarted(self):
+        with WorkerPool(self.binary, size=1, timeout=10, retry_attempts=2) as pool:
+            result = pool.request("crash_once", "x")
+        self.assertEqual(result[1:], ["x"])
+
+    def test_timeout_gives_up_after_retries(self):
+        with WorkerPool(self.binary, size=1, timeout=0.2, retry_attempts=2) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.request("hang")
+            self.assertEqual(pool.request("echo", "ok")[1:], ["ok"])
+
+    def test_mismatched_response_id_is_rejected(self):
+        with WorkerPool(self.binary, size=1, timeout=10, retry_attempts=1) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.request("wrong_id")
+            self.assertEqual(pool.request("echo", "ok")[1:], ["ok"])
+
+    def test_fails_fast_once_no_worker_can_start(self):
+        with WorkerPool(self.binary, size=1, timeout=10, retry_attempts=3) as pool:
+            os.remove(self.binary)
+            with self.assertRaises(RuntimeError):
+                pool.request("crash_once")
+            with self.assertRaises(RuntimeError):
+                pool.request("echo")
+
+
+if __name__ == '__main__':
+    unittest.main()
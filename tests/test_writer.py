@@ -0,0 +1,145 @@
+import unittest
+import tempfile
+import errno
+import os
+import struct
+from unittest.mock import patch
+from frontend.reader import GGUFReader, read_metadata
+from frontend.writer import JOURNAL_SUFFIX, MetadataTransaction, copy_range, encode_header, estimate_write, recover
+from test_reader import SAMPLE_ENTRIES
+
+
+def write_model(path, entries, tensors, alignment=32):
+    """Write a GGUF file with a tensor-info table and aligned tensor data.
+
+    tensors is a list of (name, payload) pairs; each is stored as a 1-D F32 tensor.
+    """
+    info = bytearray()
+    data = bytearray()
+    for name, payload in tensors:
+        encoded = name.encode('utf-8')
+        info += struct.pack("<Q", len(encoded)) + encoded
+        info += struct.pack("<IQIQ", 1, len(payload) // 4, 0, len(data))
+        data += payload
+        data += b"\0" * (-len(data) % alignment)
+    header = encode_header(entries, tensor_count=len(tensors)) + bytes(info)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(b"\0" * (-len(header) % alignment))
+        f.write(data)
+    return bytes(data)
+
+
+class TestMetadataWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gguf_file = os.path.join(self.temp_dir.name, "model.gguf")
+        self.tensors = [("blk.0.weight", bytes(range(64)) * 4), ("blk.1.weight", b"\x7f" * 100)]
+        self.data = write_model(self.gguf_file, SAMPLE_ENTRIES, self.tensors)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_payload_intact(self):
+        with GGUFReader(self.gguf_file) as reader:
+            self.assertEqual(reader.data_offset % 32, 0)
+            self.assertEqual(reader.tensor_count, len(self.tensors))
+            data_offset = reader.data_offset
+        with open(self.gguf_file, 'rb') as f:
+            f.seek(data_offset)
+            self.assertEqual(f.read(), self.data)
+
+    def test_rewrite_keeps_tensor_data_aligned(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "a much longer model name than before", "string")
+        transaction.set("general.new_key", 3, "int")
+        transaction.remove("general.unused")
+        self.assertTrue(transaction.commit())
+
+        metadata = {item["key"]: item["value"] for item in read_metadata(self.gguf_file)}
+        self.assertEqual(metadata["general.name"], "a much longer model name than before")
+        self.assertEqual(metadata["general.new_key"], 3)
+        self.assertNotIn("general.unused", metadata)
+        self.assert_payload_intact()
+
+    def test_unchanged_transaction_does_not_write(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.layers", "32", "int")
+        with patch('frontend.writer.write_metadata') as mock_write:
+            self.assertFalse(transaction.commit())
+        mock_write.assert_not_called()
+
+    def test_slack_allows_in_place_edits(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "x" * 20, "string")
+        transaction.commit(slack=256)
+        inode = os.stat(self.gguf_file).st_ino
+        size = os.path.getsize(self.gguf_file)
+
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "y" * 120, "string")
+        transaction.set("general.extra", 1.5, "float")
+        with patch('frontend.writer.tempfile.mkstemp') as mock_mkstemp:
+            transaction.commit()
+        mock_mkstemp.assert_not_called()
+
+        self.assertEqual(os.stat(self.gguf_file).st_ino, inode)
+        self.assertEqual(os.path.getsize(self.gguf_file), size)
+        metadata = read_metadata(self.gguf_file)
+        self.assertNotIn("gguf_modifier.padding", [item["key"] for item in metadata])
+        self.assertEqual(metadata[0]["value"], "y" * 120)
+        self.assert_payload_intact()
+
+    def test_alignment_change_is_never_patched_in_place(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "x", "string")
+        transaction.commit(slack=4096)
+
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.alignment", 4096, "int")
+        entries = [(key, value_type, value) for key, (value_type, value) in transaction.entries.items()]
+        self.assertFalse(estimate_write(self.gguf_file, entries)[0])
+        transaction.commit()
+        with GGUFReader(self.gguf_file) as reader:
+            self.assertEqual(reader.data_offset % 4096, 0)
+            with open(self.gguf_file, 'rb') as f:
+                f.seek(reader.data_offset)
+                self.assertEqual(f.read(len(self.data)), self.data)
+
+    def test_interrupted_in_place_patch_is_undone(self):
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "x", "string")
+        transaction.commit(slack=256)
+        with open(self.gguf_file, 'rb') as f:
+            before = f.read()
+
+        transaction = MetadataTransaction(self.gguf_file)
+        transaction.set("general.name", "y" * 100, "string")
+        # Power lost after the entries are written but before the fixed header is
+        with patch('frontend.writer.os.fsync', side_effect=[None, None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                transaction.commit()
+        self.assertTrue(os.path.exists(self.gguf_file + JOURNAL_SUFFIX))
+
+        self.assertTrue(recover(self.gguf_file))
+        self.assertFalse(os.path.exists(self.gguf_file + JOURNAL_SUFFIX))
+        with open(self.gguf_file, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse(recover(self.gguf_file))
+
+    def test_copy_range_falls_back_without_kernel_copy(self):
+        unsupported = OSError(errno.EXDEV, "cross-device")
+        target = os.path.join(self.temp_dir.name, "copy")
+        with open(self.gguf_file, 'rb') as src, open(target, 'wb') as dst, \
+                patch('frontend.writer.os.copy_file_range', side_effect=unsupported, create=True), \
+                patch('frontend.writer.os.sendfile', side_effect=unsupported, create=True):
+            copy_range(src.fileno(), dst.fileno(), 4, 100)
+        with open(self.gguf_file, 'rb') as f:
+            expected = f.read()[4:104]
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()